@@ -1,11 +1,19 @@
 import os
+import logging
 from dotenv import load_dotenv
 
 # Load environment variables at startup
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
-print("Loading .env from:", os.path.abspath(env_path))
 load_dotenv(env_path)
 
+# Leveled logging; LOG_LEVEL=DEBUG restores the old verbose "Debug - ..." output
+logging.basicConfig(
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'
+)
+logger = logging.getLogger(__name__)
+logger.debug("Loaded .env from: %s", os.path.abspath(env_path))
+
 from flask import Flask
 from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
@@ -13,9 +21,10 @@ from flask_migrate import Migrate
 from flask_cors import CORS
 from werkzeug.middleware.proxy_fix import ProxyFix
 from oauthlib.oauth2 import WebApplicationClient
+from app.utils.database import RoutingSession, engine_options_for, init_read_replica, normalize_database_url
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 
@@ -46,8 +55,8 @@ def create_app():
         }
     })
     
-    # Print static folder absolute path for debugging
-    print(f"Debug - Static folder absolute path: {os.path.abspath(os.path.join(os.path.dirname(__file__), 'static'))}")
+    # Log static folder absolute path for debugging
+    logger.debug("Static folder absolute path: %s", os.path.abspath(os.path.join(os.path.dirname(__file__), 'static')))
     
     # Environment variables already loaded at startup
     
@@ -55,11 +64,21 @@ def create_app():
     admin_emails_env = os.getenv('ADMIN_EMAILS', '')
     app.config['ADMIN_EMAILS'] = [e.strip().lower() for e in admin_emails_env.split(',') if e.strip()]
 
+    # Password-less /login/test for load testing; refused outright in production
+    app.config['LOGIN_TEST_MODE'] = (
+        os.getenv('LOGIN_TEST_MODE') == '1'
+        and 'production' not in (os.getenv('FLASK_ENV'), os.getenv('ENVIRONMENT'))
+    )
+
     # Configure app
     app.config['GENERATED_FOLDER'] = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'generated')
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or os.urandom(24)
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///app.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(os.getenv('DATABASE_URL', 'sqlite:///app.db'))
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Pool / PRAGMA profile for the configured backend (SQLite WAL or pooled Postgres)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_for(app.config['SQLALCHEMY_DATABASE_URI'])
+    # Optional read replica for read-only views (DATABASE_REPLICA_URL)
+    init_read_replica(app)
     
     # Initialize extensions
     db.init_app(app)
@@ -70,9 +89,9 @@ def create_app():
     # Load OpenAI API key
     api_key = os.environ.get('OPENAI_API_KEY')
     if api_key:
-        print(f"Debug - API Key loaded: {api_key[:10]}...")
+        logger.info("OpenAI API key loaded")
     else:
-        print("WARNING: No OpenAI API key found!")
+        logger.warning("No OpenAI API key found!")
     
     # Configure OAuth client
     client_secrets = {
@@ -105,14 +124,22 @@ def create_app():
     
     # Import models so Alembic can detect them
     from .presentation_log import PresentationLog  # noqa: F401
+    from .generation_stats import GenerationStats  # noqa: F401
+    from .generation_job import GenerationJob  # noqa: F401
+    from .generated_content import GeneratedContent  # noqa: F401
+    from .deck_version import DeckVersion  # noqa: F401
 
     # Register blueprint with URL prefix
     from .routes import bp as main_bp
     app.register_blueprint(main_bp, url_prefix='/')
+
+    # Flask CLI commands (e.g. `flask warm-cache`)
+    from .cli import register_commands
+    register_commands(app)
     
-    # Add debug prints for template loading
-    print(f"Template folder path: {app.template_folder}")
-    print(f"Static folder path: {app.static_folder}")
+    # Debug logging for template loading
+    logger.debug("Template folder path: %s", app.template_folder)
+    logger.debug("Static folder path: %s", app.static_folder)
     
     # Ensure the generated directory exists
     os.makedirs(os.path.join(os.path.dirname(app.root_path), 'generated'), exist_ok=True)
@@ -0,0 +1,343 @@
+import os
+import json
+import math
+import hashlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import click
+
+logger = logging.getLogger(__name__)
+
+# Prompt/response overhead per warmed deck on top of the completion budget (system prompt, title call)
+WARM_OVERHEAD_TOKENS = 600
+
+
+def parse_hours(window: str) -> Optional[Tuple[int, int]]:
+    """Parse an ``start-end`` UTC hour window such as ``1-6`` or ``22-4``; empty means always."""
+    window = (window or '').strip()
+    if not window:
+        return None
+    start, _, end = window.partition('-')
+    return int(start) % 24, int(end or start) % 24
+
+
+def in_window(hour: int, window: Optional[Tuple[int, int]]) -> bool:
+    if window is None:
+        return True
+    start, end = window
+    if start <= end:
+        return start <= hour < end
+    # Wraps past midnight, e.g. 22-4
+    return hour >= start or hour < end
+
+
+def rank_prompts(rows, now: datetime, half_life_days: float, min_count: int = 2) -> List[Dict]:
+    """Rank ``(prompt, num_slides, created_at)`` rows by recency-weighted frequency.
+
+    Prompts are grouped by their normalized form and slide count (the content cache key); each
+    request contributes ``0.5 ** (age_days / half_life_days)``, so a topic asked for ten times this
+    week beats one asked for ten times last quarter. The most recent wording represents the group.
+    """
+    from app.utils.content_cache import normalize_prompt
+    groups: Dict[tuple, Dict] = {}
+    for prompt, num_slides, created_at in rows:
+        normalized = normalize_prompt(prompt)
+        if not normalized or not num_slides:
+            continue
+        age_days = max(0.0, (now - created_at).total_seconds() / 86400.0) if created_at else 0.0
+        group = groups.setdefault((normalized, num_slides), {
+            'prompt': prompt, 'num_slides': num_slides, 'count': 0, 'score': 0.0, 'last_seen': created_at,
+        })
+        group['count'] += 1
+        group['score'] += math.pow(0.5, age_days / half_life_days)
+        if created_at and (group['last_seen'] is None or created_at > group['last_seen']):
+            group['prompt'], group['last_seen'] = prompt, created_at
+    ranked = [g for g in groups.values() if g['count'] >= min_count]
+    ranked.sort(key=lambda g: g['score'], reverse=True)
+    return ranked
+
+
+def warm_content_cache(limit: int, days: int, token_budget_per_run: int, half_life_days: float,
+                       min_count: int, dry_run: bool = False) -> Dict[str, int]:
+    """Pre-generate slide content for the most requested prompts that are not cached yet."""
+    from app.presentation_log import PresentationLog
+    from app.utils.content_cache import content_cache
+    from app.utils.ppt_generator import PPTGenerator
+    from app.utils.token_budget import estimate_tokens, token_budget
+
+    now = datetime.utcnow()
+    rows = (PresentationLog.query
+            .with_entities(PresentationLog.title, PresentationLog.num_slides, PresentationLog.created_at)
+            .filter(PresentationLog.created_at >= now - timedelta(days=days))
+            .all())
+    candidates = rank_prompts(rows, now, half_life_days, min_count)
+    token_budget.seed_from_history()
+
+    result = {'candidates': len(candidates), 'warmed': 0, 'cached': 0, 'failed': 0, 'tokens': 0}
+    # Created on first use and shared, so the API key is verified once per run rather than per prompt
+    client = None
+    for candidate in candidates:
+        if result['warmed'] + result['failed'] >= limit:
+            break
+        prompt, num_slides = candidate['prompt'], candidate['num_slides']
+        if content_cache.contains(prompt, num_slides):
+            result['cached'] += 1
+            continue
+        estimate = token_budget.budget_for(num_slides) + estimate_tokens(prompt) + WARM_OVERHEAD_TOKENS
+        if result['tokens'] + estimate > token_budget_per_run:
+            logger.info("Cache warm-up stopping: token budget %s reached", token_budget_per_run)
+            break
+        if dry_run:
+            click.echo(f"would warm [{candidate['count']}x, score {candidate['score']:.2f}] {num_slides} slides: {prompt[:80]}")
+            result['tokens'] += estimate
+            result['warmed'] += 1
+            continue
+
+        generator = None
+        try:
+            if client is None:
+                client = PPTGenerator().client
+            # No content_cache on the generator: warm-up misses should not show up in the live hit-rate metrics
+            generator = PPTGenerator(client=client)
+            slides = generator.generate_slide_content(prompt, num_slides)
+            title = generator.generate_title(prompt)
+            entry = content_cache.store(prompt, num_slides, slides, generator.model_used)
+            content_cache.set_title(entry, title)
+            result['warmed'] += 1
+        except Exception as e:
+            logger.warning("Cache warm-up failed for %r: %s", prompt[:80], e)
+            result['failed'] += 1
+        if generator is not None:
+            result['tokens'] += generator.usage['prompt_tokens'] + generator.usage['completion_tokens']
+    return result
+
+
+def item_id(item: Dict) -> str:
+    """Stable id of a bulk input item: its own ``id``, else a hash of its fields."""
+    if item.get('id'):
+        return str(item['id'])
+    return hashlib.sha256(json.dumps(item, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def load_manifest(path: str) -> Dict[str, Dict]:
+    """Latest manifest record per item id (later lines win; a torn last line is ignored)."""
+    records = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records[record.get('id')] = record
+    return records
+
+
+def _render_to_file(path: str, title: str, presenter: str, slides: List[Dict], template_style: str) -> int:
+    """Render-pool job (runs in a worker process): render a deck and write it atomically."""
+    from app.utils.ppt_generator import render_deck
+    data = render_deck(title, presenter, slides, template_style)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+class BulkRun:
+    """Generate decks for JSONL items with separate bounds on concurrent LLM calls and renders.
+
+    Every finished item is appended to ``results.jsonl`` in the output directory as soon as it
+    completes, which doubles as the checkpoint: items already recorded as ``ok`` (with their file
+    still present) are skipped when the same command is run again.
+    """
+
+    def __init__(self, app, output_dir: str, llm_concurrency: int, render_concurrency: int,
+                 deck_timeout: float, allow_near: bool):
+        self.app = app
+        self.output_dir = output_dir
+        self.manifest_path = os.path.join(output_dir, 'results.jsonl')
+        self.llm_concurrency = llm_concurrency
+        self.render_concurrency = render_concurrency
+        self.deck_timeout = deck_timeout
+        self.allow_near = allow_near
+        self.stop = threading.Event()
+        self.counts = {'ok': 0, 'failed': 0, 'skipped': 0}
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _record(self, record: Dict) -> None:
+        with self._lock:
+            with open(self.manifest_path, 'a', encoding='utf-8') as fh:
+                fh.write(json.dumps(record) + '\n')
+                fh.flush()
+                os.fsync(fh.fileno())
+            self.counts[record['status']] += 1
+        click.echo(f"[{record['status']}] {record['id']} {record.get('file') or record.get('error', '')}")
+
+    def _generator(self):
+        from app.utils.content_cache import content_cache
+        from app.utils.deadline import Deadline
+        from app.utils.ppt_generator import PPTGenerator
+        with self._lock:
+            if self._client is None:
+                # Verify the API key once; every other deck shares the client
+                self._client = PPTGenerator().client
+        generator = PPTGenerator(client=self._client, deadline=Deadline(self.deck_timeout), content_cache=content_cache)
+        generator.allow_near_duplicates = self.allow_near
+        return generator
+
+    def _generate(self, item: Dict) -> Optional[Dict]:
+        """LLM half of one deck (runs in the LLM pool, inside an app context for the content cache)."""
+        if self.stop.is_set():
+            return None
+        with self.app.app_context():
+            generator = self._generator()
+            prompt = item['prompt']
+            num_slides = int(item.get('num_slides', 5))
+            slides = generator.generate_slide_content(prompt, num_slides)
+            if item.get('title'):
+                title = item['title']
+            elif generator.content_entry is not None and generator.content_entry.presentation_title:
+                title = generator.content_entry.presentation_title
+            else:
+                title = generator.generate_title(prompt)
+                generator.content_cache.set_title(generator.content_entry, title)
+            return {
+                'title': title,
+                'slides': slides,
+                'content_source': generator.content_source,
+                'tokens': generator.usage['prompt_tokens'] + generator.usage['completion_tokens'],
+                'cost_usd': round(generator.cost_usd, 6),
+            }
+
+    def run(self, items: List[Dict]) -> Dict[str, int]:
+        from app.utils.ppt_generator import DEFAULT_TEMPLATE_STYLE, sanitize_filename
+        from app.utils.rate_limiter import RateLimitTimeout
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        done = load_manifest(self.manifest_path)
+        pending = []
+        for item in items:
+            key = item_id(item)
+            previous = done.get(key)
+            if previous and previous.get('status') == 'ok' and os.path.exists(os.path.join(self.output_dir, previous['file'])):
+                self.counts['skipped'] += 1
+                continue
+            pending.append((key, item))
+        click.echo(f"{len(pending)} decks to generate, {self.counts['skipped']} already done")
+
+        # Spawned (not forked) render workers: forking a process with live LLM threads is unsafe
+        render_pool = ProcessPoolExecutor(self.render_concurrency, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            with ThreadPoolExecutor(self.llm_concurrency) as llm_pool:
+                futures = {llm_pool.submit(self._generate, item): (key, item) for key, item in pending}
+                for future in as_completed(futures):
+                    key, item = futures[future]
+                    try:
+                        content = future.result()
+                    except RateLimitTimeout as e:
+                        # Out of OpenAI capacity: stop starting decks; a later run resumes from the manifest
+                        if not self.stop.is_set():
+                            click.echo(f"Rate limited ({e}); stopping after in-flight decks finish")
+                        self.stop.set()
+                        continue
+                    except Exception as e:
+                        self._record({'id': key, 'status': 'failed', 'prompt': item.get('prompt'), 'error': str(e)[:500]})
+                        continue
+                    if content is None:
+                        continue
+                    filename = f"{sanitize_filename(item['prompt'], 40)}_{key[:8]}.pptx"
+                    render = render_pool.submit(
+                        _render_to_file, os.path.join(self.output_dir, filename), content['title'],
+                        item.get('presenter') or '', content['slides'], item.get('template_style') or DEFAULT_TEMPLATE_STYLE
+                    )
+                    render.add_done_callback(self._rendered(key, item, filename, content))
+        finally:
+            render_pool.shutdown(wait=True)
+        return dict(self.counts, stopped=int(self.stop.is_set()))
+
+    def _rendered(self, key: str, item: Dict, filename: str, content: Dict):
+        def callback(future):
+            record = {
+                'id': key, 'prompt': item.get('prompt'), 'title': content['title'],
+                'num_slides': len(content['slides']), 'content_source': content['content_source'],
+                'tokens': content['tokens'], 'cost_usd': content['cost_usd'],
+            }
+            error = future.exception()
+            if error is None:
+                record.update(status='ok', file=filename, size_bytes=future.result())
+            else:
+                record.update(status='failed', error=str(error)[:500])
+            self._record(record)
+        return callback
+
+
+def register_commands(app) -> None:
+    @app.cli.command('warm-cache')
+    @click.option('--limit', default=int(os.getenv('WARM_CACHE_LIMIT', 50)), show_default=True,
+                  help='Maximum number of prompts to generate this run.')
+    @click.option('--days', default=int(os.getenv('WARM_CACHE_LOOKBACK_DAYS', 30)), show_default=True,
+                  help='How far back to look in presentation_logs.')
+    @click.option('--token-budget', default=int(os.getenv('WARM_CACHE_TOKEN_BUDGET', 100000)), show_default=True,
+                  help='OpenAI tokens this run may spend.')
+    @click.option('--half-life-days', default=float(os.getenv('WARM_CACHE_HALF_LIFE_DAYS', 7)), show_default=True,
+                  help='Age at which a past request counts half as much.')
+    @click.option('--min-count', default=int(os.getenv('WARM_CACHE_MIN_COUNT', 2)), show_default=True,
+                  help='Only warm prompts requested at least this often.')
+    @click.option('--hours', default=os.getenv('WARM_CACHE_HOURS', '1-6'), show_default=True,
+                  help="Off-peak UTC hour window (e.g. '22-4'); empty to allow any time.")
+    @click.option('--force', is_flag=True, help='Run even outside the off-peak window.')
+    @click.option('--dry-run', is_flag=True, help='List what would be generated without calling OpenAI.')
+    def warm_cache(limit, days, token_budget, half_life_days, min_count, hours, force, dry_run):
+        """Pre-generate slide content for popular past prompts into the content cache."""
+        if not force and not in_window(datetime.utcnow().hour, parse_hours(hours)):
+            click.echo(f"Outside the off-peak window ({hours} UTC); use --force to run anyway.")
+            return
+        result = warm_content_cache(limit, days, token_budget, half_life_days, min_count, dry_run=dry_run)
+        click.echo(
+            f"{result['candidates']} popular prompts: {result['warmed']} warmed, {result['cached']} already cached, "
+            f"{result['failed']} failed, ~{result['tokens']} tokens used"
+        )
+
+    @app.cli.command('generate-bulk')
+    @click.argument('input_file', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--output-dir', default=None,
+                  help='Where decks and results.jsonl go (default: generated/bulk/<input name>).')
+    @click.option('--llm-concurrency', default=int(os.getenv('BULK_LLM_CONCURRENCY', 4)), show_default=True,
+                  help='Decks whose content is generated at the same time.')
+    @click.option('--render-concurrency', default=int(os.getenv('BULK_RENDER_CONCURRENCY', 2)), show_default=True,
+                  help='Render worker processes.')
+    @click.option('--deck-timeout', default=float(os.getenv('BULK_DECK_TIMEOUT_SECONDS', 300)), show_default=True,
+                  help='Seconds a deck may spend on content, including waiting for rate limiter capacity.')
+    @click.option('--reuse-similar', is_flag=True, help='Also reuse cached content of near-duplicate prompts.')
+    def generate_bulk(input_file, output_dir, llm_concurrency, render_concurrency, deck_timeout, reuse_similar):
+        """Generate a deck per JSONL line ({"prompt", "num_slides", "template_style", "presenter", "title", "id"}).
+
+        Re-running the same command resumes: decks already in the results manifest are skipped.
+        """
+        items = []
+        with open(input_file, encoding='utf-8') as fh:
+            for number, line in enumerate(fh, start=1):
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if not isinstance(item, dict) or not item.get('prompt'):
+                    raise click.BadParameter(f"line {number} needs a prompt", param_hint='input_file')
+                items.append(item)
+        if output_dir is None:
+            output_dir = os.path.join(os.path.dirname(app.root_path), 'generated', 'bulk',
+                                      os.path.splitext(os.path.basename(input_file))[0])
+        run = BulkRun(app, output_dir, max(1, llm_concurrency), max(1, render_concurrency), deck_timeout, reuse_similar)
+        result = run.run(items)
+        click.echo(
+            f"{result['ok']} generated, {result['failed']} failed, {result['skipped']} skipped; "
+            f"manifest: {run.manifest_path}"
+        )
+        if result['stopped'] or result['failed']:
+            raise SystemExit(1)
@@ -0,0 +1,68 @@
+import json
+from datetime import datetime
+from typing import List
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.utils.part_store import get_part_store
+
+
+class DeckVersion(db.Model):
+    """One saved state of a generated deck, as a manifest of content-addressed parts (see PartStore)"""
+
+    __tablename__ = 'deck_versions'
+    __table_args__ = (db.UniqueConstraint('log_id', 'version', name='uq_deck_versions_log_version'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    log_id = db.Column(db.Integer, db.ForeignKey('presentation_logs.id'), nullable=False, index=True)
+    version = db.Column(db.Integer, nullable=False)
+    # What produced this version, e.g. 'generated', 'restyle: Vintage', 'slide 3 regenerated'
+    note = db.Column(db.String(200))
+    template_style = db.Column(db.String(50))
+    # JSON list of [zip entry name, sha256] in zip order
+    manifest_json = db.Column(db.Text, nullable=False)
+    # Bytes this version added to the part store (0 when every part already existed)
+    new_bytes = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Times record() re-reads the latest version after losing the number to a concurrent writer
+    RECORD_ATTEMPTS = 5
+
+    @property
+    def manifest(self) -> List[List[str]]:
+        return json.loads(self.manifest_json)
+
+    @classmethod
+    def record(cls, log, pptx_path: str, note: str, template_style: str = None) -> 'DeckVersion':
+        """Store the parts of ``pptx_path`` and add it as the next version of ``log`` (caller commits)."""
+        manifest, new_bytes = get_part_store().snapshot(pptx_path)
+        for attempt in range(cls.RECORD_ATTEMPTS):
+            latest = db.session.query(db.func.max(cls.version)).filter(cls.log_id == log.id).scalar() or 0
+            version = cls(
+                log_id=log.id,
+                version=latest + 1,
+                note=note[:200],
+                template_style=template_style or log.template_style,
+                manifest_json=json.dumps(manifest),
+                new_bytes=new_bytes,
+            )
+            try:
+                # Flushed in a savepoint, so a clash on (log_id, version) surfaces here rather than at the
+                # caller's commit, and rolling it back leaves the caller's other changes in place
+                with db.session.begin_nested():
+                    db.session.add(version)
+            except IntegrityError:
+                # A concurrent slide regeneration or image upgrade took this number first
+                if attempt == cls.RECORD_ATTEMPTS - 1:
+                    raise
+                continue
+            return version
+
+    def to_dict(self) -> dict:
+        return {
+            'version': self.version,
+            'note': self.note,
+            'template_style': self.template_style,
+            'parts': len(self.manifest),
+            'new_bytes': self.new_bytes,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
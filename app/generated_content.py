@@ -0,0 +1,29 @@
+import json
+from datetime import datetime
+from typing import Dict, List
+from app import db
+
+
+class GeneratedContent(db.Model):
+    """Structured slide content produced by the LLM for a prompt, reusable across decks"""
+
+    __tablename__ = 'generated_content'
+
+    id = db.Column(db.Integer, primary_key=True)
+    prompt = db.Column(db.Text, nullable=False)
+    # Lower-cased, stop-word-free prompt (see content_cache.normalize_prompt) and its hash for exact lookups
+    normalized_prompt = db.Column(db.Text, nullable=False)
+    prompt_hash = db.Column(db.String(64), nullable=False, index=True)
+    num_slides = db.Column(db.Integer, nullable=False)
+    slides_json = db.Column(db.Text, nullable=False)
+    # MinHash signature of the normalized prompt for the near-duplicate LSH index
+    signature = db.Column(db.LargeBinary)
+    presentation_title = db.Column(db.String(200))
+    model = db.Column(db.String(50))
+    hit_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def slides(self) -> List[Dict]:
+        return json.loads(self.slides_json)
@@ -0,0 +1,98 @@
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+
+class GenerationJob(db.Model):
+    """Claim on a deck generation shared by every request with the same key.
+
+    Two kinds of keys use this table: ``idem:<user>:<Idempotency-Key>`` makes a resubmitted form
+    attach to (or replay) the first submission, and ``deck:<hash of inputs>`` coalesces identical
+    in-flight requests from different users onto one pipeline run. Rows live in the database so
+    coalescing works across gunicorn workers and instances.
+    """
+
+    __tablename__ = 'generation_jobs'
+
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    # How long a finished idempotent submission is replayed instead of regenerated
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', 600))
+    # How long after finishing an identical deck is still handed to late followers
+    COALESCE_WINDOW_SECONDS = int(os.getenv('COALESCE_WINDOW_SECONDS', 30))
+    # A running claim older than this belongs to a dead worker and may be taken over
+    STALE_SECONDS = int(os.getenv('GENERATION_JOB_STALE_SECONDS', 120))
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(200), unique=True, nullable=False, index=True)
+    user_id = db.Column(db.String(100), db.ForeignKey('users.id'))
+    status = db.Column(db.String(20), nullable=False, default=RUNNING)
+    filename = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def _reusable(self, reuse_seconds: int) -> bool:
+        age = (datetime.utcnow() - (self.updated_at or datetime.utcnow())).total_seconds()
+        if self.status == self.RUNNING:
+            return age < self.STALE_SECONDS
+        return self.status == self.DONE and age < reuse_seconds
+
+    @classmethod
+    def claim(cls, key: str, reuse_seconds: int, user_id: Optional[str] = None) -> Tuple['GenerationJob', bool]:
+        """Return ``(job, is_leader)``. The leader runs the pipeline; everyone else waits on or reuses ``job``."""
+        job = cls.query.filter_by(key=key).populate_existing().first()
+        if job is not None:
+            if job._reusable(reuse_seconds):
+                return job, False
+            # Failed, expired or abandoned: take the claim over
+            job.status, job.filename, job.error = cls.RUNNING, None, None
+            job.user_id = user_id
+            job.updated_at = datetime.utcnow()
+            db.session.commit()
+            return job, True
+
+        job = cls(key=key, user_id=user_id, status=cls.RUNNING)
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request claimed the key between our read and insert
+            db.session.rollback()
+            return cls.query.filter_by(key=key).populate_existing().first(), False
+        return job, True
+
+    @classmethod
+    def wait(cls, key: str, timeout: float, poll_seconds: float = 0.25) -> Optional['GenerationJob']:
+        """Block until the job for ``key`` leaves the running state; None on timeout or if it vanished."""
+        deadline = time.monotonic() + timeout
+        while True:
+            # End the read transaction so each poll sees the leader's latest commit (SQLite WAL snapshots)
+            db.session.commit()
+            job = cls.query.filter_by(key=key).populate_existing().first()
+            if job is None or job.status != cls.RUNNING:
+                return job
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_seconds)
+
+    def finish(self, filename: str) -> None:
+        self.status, self.filename, self.updated_at = self.DONE, filename, datetime.utcnow()
+        db.session.commit()
+
+    def fail(self, error: str) -> None:
+        self.status, self.error, self.updated_at = self.FAILED, error[:1000], datetime.utcnow()
+        db.session.commit()
+
+    @classmethod
+    def purge_expired(cls) -> int:
+        """Delete rows too old to be replayed or coalesced onto."""
+        cutoff = datetime.utcnow() - timedelta(seconds=max(cls.IDEMPOTENCY_TTL_SECONDS, cls.STALE_SECONDS) * 2)
+        deleted = cls.query.filter(cls.updated_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
@@ -0,0 +1,72 @@
+from datetime import datetime
+from app import db
+
+class GenerationStats(db.Model):
+    """Per-deck performance telemetry for a PresentationLog entry"""
+
+    __tablename__ = 'generation_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    log_id = db.Column(db.Integer, db.ForeignKey('presentation_logs.id'), nullable=False, unique=True, index=True)
+    plan = db.Column(db.String(20), index=True)
+    template_style = db.Column(db.String(50), index=True)
+    num_slides = db.Column(db.Integer)
+    include_images = db.Column(db.Boolean, default=False)
+    model = db.Column(db.String(50))
+
+    # Stage durations in milliseconds
+    total_ms = db.Column(db.Integer)
+    init_ms = db.Column(db.Integer)
+    title_ms = db.Column(db.Integer)
+    content_ms = db.Column(db.Integer)
+    image_ms = db.Column(db.Integer)
+    template_load_ms = db.Column(db.Integer)
+    render_ms = db.Column(db.Integer)
+    save_ms = db.Column(db.Integer)
+
+    prompt_tokens = db.Column(db.Integer, default=0)
+    completion_tokens = db.Column(db.Integer, default=0)
+    # Completion tokens of the slide-writing calls only; seeds the per-slide token budget
+    slide_completion_tokens = db.Column(db.Integer)
+    retry_count = db.Column(db.Integer, default=0)
+    images_requested = db.Column(db.Integer, default=0)
+    images_succeeded = db.Column(db.Integer, default=0)
+    file_size_bytes = db.Column(db.Integer)
+    cost_usd = db.Column(db.Float, default=0.0)
+    # Where the slide content came from: 'llm', or a content cache hit ('exact' / 'near')
+    content_source = db.Column(db.String(10), default='llm', index=True)
+    content_similarity = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    STAGES = ('init', 'title', 'content', 'image', 'template_load', 'render', 'save')
+
+    @classmethod
+    def from_generator(cls, generator, total_seconds: float, file_size_bytes: int, **fields) -> 'GenerationStats':
+        """Build a stats row from a finished PPTGenerator's telemetry counters."""
+        stats = cls(
+            model=generator.model_used,
+            total_ms=int(total_seconds * 1000),
+            prompt_tokens=generator.usage['prompt_tokens'],
+            completion_tokens=generator.usage['completion_tokens'],
+            slide_completion_tokens=generator.slide_completion_tokens or None,
+            retry_count=generator.retry_count,
+            images_requested=generator.images_requested,
+            images_succeeded=generator.images_succeeded,
+            file_size_bytes=file_size_bytes,
+            cost_usd=round(generator.cost_usd, 6),
+            content_source=generator.content_source,
+            content_similarity=generator.content_similarity,
+            **fields
+        )
+        for stage in cls.STAGES:
+            setattr(stats, f'{stage}_ms', int(generator.stage_timings.get(stage, 0.0) * 1000))
+        return stats
+
+
+def percentile(values, pct: float):
+    """Nearest-rank percentile of ``values`` (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(-(-pct * len(ordered) // 100)))  # ceil(pct/100 * n)
+    return ordered[min(rank, len(ordered)) - 1]
@@ -1,4 +1,6 @@
+import json
 from datetime import datetime
+from typing import Dict, List, Optional
 from app import db
 
 class PresentationLog(db.Model):
@@ -11,4 +13,23 @@ class PresentationLog(db.Model):
     title = db.Column(db.String(200))
     num_slides = db.Column(db.Integer)
     units_used = db.Column(db.Integer, default=1)
+    # What was rendered, so the deck can be re-rendered into other templates without the LLM
+    content_id = db.Column(db.Integer, db.ForeignKey('generated_content.id'))
+    presenter = db.Column(db.String(200))
+    template_style = db.Column(db.String(50))
+    filename = db.Column(db.String(255), index=True)
+    # Slides as edited in this deck (single-slide regeneration); the shared content row is never modified
+    slides_json = db.Column(db.Text)
+    # Progressive delivery: 'pending' while images are added to the text-only deck, then 'ready' or 'failed'
+    image_status = db.Column(db.String(20))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Performance telemetry for this generation (see GenerationStats)
+    stats = db.relationship('GenerationStats', backref='log', uselist=False, lazy=True)
+    content = db.relationship('GeneratedContent', lazy=True)
+
+    @property
+    def slides(self) -> Optional[List[Dict]]:
+        """Content slides currently in this deck, or None if none were stored"""
+        if self.slides_json:
+            return json.loads(self.slides_json)
+        return self.content.slides if self.content is not None else None
@@ -1,22 +1,39 @@
 import os
 import json
+import logging
 import requests
 import secrets
+import hashlib
+import hmac
+import time
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from functools import wraps
 from flask import Blueprint, request, render_template, send_from_directory, jsonify, url_for, redirect, current_app, flash, session
 import requests
 from flask_login import login_required, login_user, logout_user, current_user
-from app.utils.ppt_generator import PPTGenerator
+from app.utils.ppt_generator import DEFAULT_TEMPLATE_STYLE, PPTGenerator, normalize_slides, render_deck, sanitize_filename
+from app.utils.pptx_patch import patch_slide, slide_has_image
+from app.utils.part_store import get_part_store
+from app.utils.image_upgrade import PENDING, effective_status, schedule_image_upgrade
+from app.utils.image_providers import DALLE, LOCAL, provider_for_plan
 from app.models import User
 from app.presentation_log import PresentationLog
+from app.generation_stats import GenerationStats, percentile
+from app.generation_job import GenerationJob
+from app.deck_version import DeckVersion
 from app import db
+from app.utils.database import replica_read
+from app.utils.metrics import GENERATION_SECONDS, GENERATIONS_IN_FLIGHT, render_metrics
+from app.utils.deadline import RENDER_RESERVE_SECONDS, Deadline, DeadlineExceeded
+from app.utils.token_budget import token_budget
+from app.utils.content_cache import content_cache
 from datetime import datetime
 
 # Google OAuth 2.0 endpoints
 GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration"
 
 bp = Blueprint("main", __name__)
+logger = logging.getLogger(__name__)
 
 # Template image routes
 @bp.route('/static/images/templates/<template>.jpg')
@@ -28,6 +45,22 @@ def serve_template_image(template):
 GENERATED_FOLDER = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'generated'))
 os.makedirs(GENERATED_FOLDER, exist_ok=True)
 
+# Bearer tokens for /api/render, as comma-separated token:user_id pairs
+RENDER_API_KEYS = dict(
+    pair.strip().split(':', 1) for pair in os.getenv('RENDER_API_KEYS', '').split(',') if ':' in pair
+)
+
+# A request whose coalesced leader failed only generates on its own with at least this much of its deadline left
+COALESCE_FALLBACK_MIN_SECONDS = float(os.getenv('COALESCE_FALLBACK_MIN_SECONDS', 10))
+
+# Image decks are delivered text-first unless a request sends "progressive": false
+PROGRESSIVE_IMAGES = os.getenv('PROGRESSIVE_IMAGES', '1') == '1'
+
+# Plans whose requests reuse content generated earlier for the identical prompt
+EXACT_REUSE_PLANS = {p.strip() for p in os.getenv('EXACT_REUSE_PLANS', 'free').split(',') if p.strip()}
+# Plans whose requests may reuse content generated for a similar (not just identical) prompt
+NEAR_DUPLICATE_PLANS = {p.strip() for p in os.getenv('NEAR_DUPLICATE_PLANS', 'free').split(',') if p.strip()}
+
 # ====================
 # Download token serializer (signed, timed)
 # ====================
@@ -189,6 +222,20 @@ def sitemap_xml():
     xml_lines.append("</urlset>")
     return Response("\n".join(xml_lines), mimetype='application/xml')
 
+# ------------------
+# Prometheus metrics
+# ------------------
+
+@bp.route('/metrics')
+def metrics():
+    """Expose generation latency histograms, token counters and in-flight gauges for Prometheus."""
+    from flask import Response
+    expected = os.getenv('METRICS_TOKEN')
+    if expected and request.headers.get('Authorization') != f"Bearer {expected}":
+        return Response('Unauthorized', status=401)
+    body, content_type = render_metrics()
+    return Response(body, mimetype=content_type)
+
 @bp.route("/login")
 def login():
     if current_user.is_authenticated:
@@ -208,7 +255,7 @@ def login():
     if request.host.startswith('localhost') or request.host.startswith('127.0.0.1'):
         os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
     
-    print(f"Debug - Login redirect URI: {redirect_uri}")
+    logger.debug("Login redirect URI: %s", redirect_uri)
     
     request_uri = client.prepare_request_uri(
         authorization_endpoint,
@@ -234,7 +281,7 @@ def callback():
         if request.host.startswith('localhost') or request.host.startswith('127.0.0.1'):
             os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
         
-        print(f"Debug - Callback redirect URI: {redirect_uri}")
+        logger.debug("Callback redirect URI: %s", redirect_uri)
 
         # Prepare the token request
         client = current_app.config['OAUTH_CLIENT']
@@ -259,11 +306,8 @@ def callback():
         token_payload["client_id"] = client_secrets["web"]["client_id"]
         token_payload["client_secret"] = client_secrets["web"]["client_secret"]
 
-        # --- Debug: Token Request ---
-        print("\n--- GOOGLE OAUTH TOKEN REQUEST ---")
-        print("URL:", token_url)
-        print("Payload:", token_payload)
-        print("----------------------------------")
+        # Never log the payload itself: it carries the client secret
+        logger.debug("Google OAuth token request: %s", token_url)
 
         token_response = requests.post(
             token_url,
@@ -274,26 +318,26 @@ def callback():
         # Check if the token request was successful
         if not token_response.ok:
             error_data = token_response.json()
-            print(f"Token Error Response: {error_data}")
+            logger.error("Token Error Response: %s", error_data)
             return f"Error getting token: {error_data.get('error_description', 'Unknown error')}", 400
 
         # Parse the tokens
         token_data = token_response.json()
         if 'error' in token_data:
-            print(f"Token Error: {token_data}")
+            logger.error("Token Error: %s", token_data)
             return f"Error in token response: {token_data.get('error_description', 'Unknown error')}", 400
 
         client.parse_request_body_response(json.dumps(token_data))
 
         # Get user info from Google
-        print("Debug - Getting user info from Google...")
+        logger.debug("Getting user info from Google...")
         userinfo_endpoint = google_provider_cfg["userinfo_endpoint"]
         uri, headers, body = client.add_token(userinfo_endpoint)
-        print(f"Debug - User info request: URI={uri}, Headers={headers}")
+        logger.debug("User info request: URI=%s, Headers=%s", uri, headers)
         
         userinfo_response = requests.get(uri, headers=headers, data=body)
-        print(f"Debug - User info response status: {userinfo_response.status_code}")
-        print(f"Debug - User info response: {userinfo_response.json()}")
+        logger.debug("User info response status: %s", userinfo_response.status_code)
+        logger.debug("User info response: %s", userinfo_response.json())
 
         if userinfo_response.json().get("email_verified"):
             unique_id = userinfo_response.json()["sub"]
@@ -302,7 +346,7 @@ def callback():
             picture = userinfo_response.json()["picture"]
             # Determine if the logged-in user is an admin based on configured admin emails
             is_admin_user = users_email.lower() in current_app.config.get('ADMIN_EMAILS', [])
-            print(f"Debug - Admin status for {users_email}: {is_admin_user}")
+            logger.debug("Admin status for %s: %s", users_email, is_admin_user)
 
             # Create or update user
             user = User.query.get(unique_id)
@@ -322,7 +366,7 @@ def callback():
             return "User email not verified by Google.", 400
             
     except Exception as e:
-        print(f"Error in callback: {str(e)}")
+        logger.error("Error in callback: %s", e)
         return f"Error processing callback: {str(e)}", 400
     
         # Build the token payload including client credentials
@@ -331,11 +375,8 @@ def callback():
         token_payload["client_id"] = client_secrets["web"]["client_id"]
         token_payload["client_secret"] = client_secrets["web"]["client_secret"]
 
-        # --- Debug: Token Request ---
-        print("\n--- GOOGLE OAUTH TOKEN REQUEST ---")
-        print("URL:", token_url)
-        print("Payload:", token_payload)
-        print("----------------------------------")
+        # Never log the payload itself: it carries the client secret
+        logger.debug("Google OAuth token request: %s", token_url)
 
         token_response = requests.post(
             token_url,
@@ -346,13 +387,13 @@ def callback():
         # Check if the token request was successful
         if not token_response.ok:
             error_data = token_response.json()
-            print(f"Token Error Response: {error_data}")
+            logger.error("Token Error Response: %s", error_data)
             return f"Error getting token: {error_data.get('error_description', 'Unknown error')}", 400
 
         # Parse the tokens
         token_data = token_response.json()
         if 'error' in token_data:
-            print(f"Token Error: {token_data}")
+            logger.error("Token Error: %s", token_data)
             return f"Error in token response: {token_data.get('error_description', 'Unknown error')}", 400
 
         client.parse_request_body_response(json.dumps(token_data))
@@ -391,6 +432,32 @@ def callback():
     else:
         return "User email not available or not verified by Google.", 400
 
+@bp.route("/login/test", methods=["POST"])
+def test_login():
+    """Log in a synthetic user without Google OAuth.
+
+    Only available when LOGIN_TEST_MODE is enabled (never in production); used by bench/load_test.py.
+    """
+    if not current_app.config.get('LOGIN_TEST_MODE'):
+        return "Not found", 404
+    data = request.get_json() or {}
+    email = (data.get('email') or '').strip().lower()
+    if not email:
+        return jsonify({'success': False, 'error': 'email is required'}), 400
+
+    user_id = f"test-{email}"
+    user = User.query.get(user_id)
+    if not user:
+        user = User(id_=user_id, name=data.get('name', email.split('@')[0]), email=email, profile_pic=None)
+        db.session.add(user)
+    user.plan = data.get('plan', user.plan)
+    db.session.commit()
+    login_user(user)
+    # Unlimited test sessions skip plan limits so long runs are not capped at a few decks; a session
+    # flag rather than is_admin, which would also open the admin pages and other users' decks
+    session['test_unlimited'] = bool(data.get('unlimited', False))
+    return jsonify({'success': True, 'user_id': user.id})
+
 @bp.route("/logout")
 @login_required
 def logout():
@@ -448,9 +515,43 @@ def generate():
         num_slides = int(data.get("num_slides", 5))
         template_style = data.get("template_style", "Professional")
         include_images = bool(data.get("include_images", False))
-
-        # Initialize PPT generator
+        # DALL·E or local illustrations: the request may choose, otherwise the plan decides
+        image_provider = data.get("image_provider")
+        if image_provider not in (DALLE, LOCAL):
+            image_provider = provider_for_plan(current_user.plan)
+        # Progressive delivery: return the text deck at once and add DALL·E images in the background
+        progressive = include_images and image_provider == DALLE and bool(data.get("progressive", PROGRESSIVE_IMAGES))
+
+        # One budget for the whole request: waiting on another submission spends it too (leaving enough
+        # to still render and respond), so the request never outlives the gunicorn worker timeout
+        deadline = Deadline()
+        generation_start = None
+        outcome = 'error'
+        # Jobs this request leads; they are resolved (done/failed) when it finishes
+        claimed_jobs = []
         try:
+            # A resubmitted form (double click, network retry) carries the same key and attaches to the first submission
+            idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+            if idempotency_key:
+                idem_job, is_first = GenerationJob.claim(
+                    f"idem:{current_user.id}:{idempotency_key[:100]}",
+                    reuse_seconds=GenerationJob.IDEMPOTENCY_TTL_SECONDS,
+                    user_id=current_user.id
+                )
+                if is_first:
+                    claimed_jobs.append(idem_job)
+                else:
+                    if idem_job.status == GenerationJob.RUNNING:
+                        idem_job = GenerationJob.wait(idem_job.key, timeout=max(0.0, deadline.remaining() - RENDER_RESERVE_SECONDS))
+                    if idem_job is not None and idem_job.status == GenerationJob.DONE:
+                        # Already generated and charged for this submission: replay the result
+                        return jsonify({
+                            'success': True,
+                            'filename': idem_job.filename,
+                            'download_url': url_for('main.download_page', filename=idem_job.filename)
+                        })
+                    return jsonify({"error": "This submission is still being processed. Please try again shortly."}), 409
+
             # For pay-per-use, check payment first
             if current_user.plan == 'pay_per_use':
                 if not session.get('payment_verified'):
@@ -462,69 +563,459 @@ def generate():
                 session.pop('payment_verified', None)
             else:
                 # For other plans, check presentation limits
-                # Skip limit check for admins
-                if not current_user.is_admin:
+                # Skip limit check for admins and unlimited test sessions
+                if not current_user.is_admin and not _test_unlimited():
                     plan_limit = User.PLANS[current_user.plan]['limit']
                     if plan_limit and current_user.presentations_count >= plan_limit:
                         return jsonify({
                             'error': f'You have reached your {User.PLANS[current_user.plan]["name"]} plan limit. Please upgrade to continue.'
                         }), 403
 
-            # Initialize PPT generator
-            try:
-                ppt_generator = PPTGenerator()
-            except ValueError as e:
-                return jsonify({"error": str(e)}), 400
-            except Exception as e:
-                return jsonify({"error": f"Error initializing presentation generator: {str(e)}"}), 500
-
-            # Generate slide content
-            try:
-                slides_content = ppt_generator.generate_slide_content(prompt, num_slides)
-            except Exception as e:
-                return jsonify({"error": f"Error generating slide content: {str(e)}"}), 500
-            
-            # Create presentation
-            try:
-                # Use the prompt as both the title and the first slide title
-                filepath = ppt_generator.create_presentation(
-                    title=prompt,  # Use prompt as title instead of the generic title
-                    presenter=presenter,
-                    slides_content=slides_content,
-                    template_style=template_style,
-                    include_images=include_images
-                )
-            except Exception as e:
-                return jsonify({"error": f"Error creating presentation: {str(e)}"}), 500
-            
-            # Increment presentation count and log usage
+            generation_start = time.perf_counter()
+            GENERATIONS_IN_FLIGHT.inc()
+
+            # Identical decks requested at the same time (e.g. a shared classroom link) run the pipeline once
+            deck_key = 'deck:' + hashlib.sha256(
+                json.dumps([prompt, presenter, num_slides, template_style, include_images, image_provider, progressive]).encode('utf-8')
+            ).hexdigest()
+            deck_job, is_leader = GenerationJob.claim(deck_key, reuse_seconds=GenerationJob.COALESCE_WINDOW_SECONDS)
+            shared_filename = None
+            if is_leader:
+                claimed_jobs.append(deck_job)
+            else:
+                if deck_job.status == GenerationJob.RUNNING:
+                    deck_job = GenerationJob.wait(deck_key, timeout=max(0.0, deadline.remaining() - RENDER_RESERVE_SECONDS))
+                if deck_job is not None and deck_job.status == GenerationJob.DONE \
+                        and os.path.exists(os.path.join(GENERATED_FOLDER, deck_job.filename)):
+                    shared_filename = deck_job.filename
+                elif not deadline.allows('independent_generation', COALESCE_FALLBACK_MIN_SECONDS,
+                                         reserve=RENDER_RESERVE_SECONDS):
+                    # The leader failed or is still running and too little time is left to start over
+                    outcome = 'timeout'
+                    return jsonify({"error": "An identical presentation is still being generated. Please try again shortly."}), \
+                        503, {'Retry-After': '5'}
+                else:
+                    # The leader failed: generate independently within what is left of this request's deadline
+                    logger.info("Coalesced generation %s unavailable; generating independently", deck_key[:16])
+
+            ppt_generator = None
+            content_id = None
+            image_status = None
+            if shared_filename:
+                filepath = os.path.join(GENERATED_FOLDER, shared_filename)
+                # Link the content the leader rendered so this user can re-style the deck too
+                leader_log = (PresentationLog.query
+                              .filter(PresentationLog.filename == shared_filename, PresentationLog.content_id.isnot(None))
+                              .order_by(PresentationLog.id.desc())
+                              .first())
+                content_id = leader_log.content_id if leader_log else None
+                image_status = leader_log.image_status if leader_log else None
+            else:
+                # Initialize PPT generator
+                token_budget.seed_from_history()
+                try:
+                    # Every stage (title, content, images, render, save) draws its timeouts from this budget
+                    ppt_generator = PPTGenerator(deadline=deadline, content_cache=content_cache)
+                    ppt_generator.plan = current_user.plan
+                    ppt_generator.image_provider = image_provider
+                    # Earlier content for the same (or a similar) prompt is reused on cheap plans, or when
+                    # asked to; "fresh": true always generates new content
+                    fresh = bool(data.get('fresh'))
+                    ppt_generator.allow_exact_reuse = not fresh and (
+                        current_user.plan in EXACT_REUSE_PLANS or bool(data.get('reuse'))
+                    )
+                    ppt_generator.allow_near_duplicates = not fresh and (
+                        current_user.plan in NEAR_DUPLICATE_PLANS or bool(data.get('reuse_similar'))
+                    )
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+                except Exception as e:
+                    return jsonify({"error": f"Error initializing presentation generator: {str(e)}"}), 500
+
+                # Generate slide content
+                try:
+                    slides_content = ppt_generator.generate_slide_content(prompt, num_slides)
+                except DeadlineExceeded:
+                    outcome = 'timeout'
+                    return jsonify({"error": "Generating your slides took too long. Please try again or request fewer slides."}), 504
+                except Exception as e:
+                    return jsonify({"error": f"Error generating slide content: {str(e)}"}), 500
+
+                # Create presentation
+                try:
+                    # Use the prompt as both the title and the first slide title
+                    filepath = ppt_generator.create_presentation(
+                        title=prompt,  # Use prompt as title instead of the generic title
+                        presenter=presenter,
+                        slides_content=slides_content,
+                        template_style=template_style,
+                        include_images=include_images and not progressive
+                    )
+                except Exception as e:
+                    return jsonify({"error": f"Error creating presentation: {str(e)}"}), 500
+                if progressive:
+                    image_status = PENDING
+                if ppt_generator.content_entry is not None:
+                    content_id = ppt_generator.content_entry.id
+
+            # Increment presentation count and log usage; coalesced requests are charged and logged per user too
             current_user.presentations_count += 1
             # Create presentation log entry
             log_entry = PresentationLog(
                 user_id=current_user.id,
                 title=prompt,
                 num_slides=num_slides,
-                units_used=1
+                units_used=1,
+                content_id=content_id,
+                presenter=presenter,
+                template_style=template_style,
+                filename=os.path.basename(filepath),
+                image_status=image_status
             )
+            if ppt_generator is not None:
+                # Persist per-deck latency, token and image telemetry alongside the log
+                log_entry.stats = GenerationStats.from_generator(
+                    ppt_generator,
+                    total_seconds=time.perf_counter() - generation_start,
+                    file_size_bytes=os.path.getsize(filepath),
+                    plan=current_user.plan,
+                    template_style=template_style,
+                    num_slides=num_slides,
+                    include_images=include_images
+                )
             db.session.add(log_entry)
+            db.session.flush()
+            if ppt_generator is not None and image_status == PENDING:
+                # The background upgrade replaces this file later, so it must not be the title-named file
+                # another user's deck with the same title can also use; coalesced followers share this copy
+                stem, ext = os.path.splitext(filepath)
+                own_path = f"{stem}_{log_entry.id}{ext}"
+                os.replace(filepath, own_path)
+                filepath = own_path
+                log_entry.filename = os.path.basename(filepath)
+            _record_version(log_entry, filepath, 'generated')
             db.session.commit()
+            if ppt_generator is not None and image_status == PENDING:
+                schedule_image_upgrade(current_app._get_current_object(), log_entry.id, ppt_generator.presentation_title,
+                                       slides_content, ppt_generator.client, current_user.plan, image_provider)
 
             # Get filename from path
             filename = os.path.basename(filepath)
-            
+            for job in claimed_jobs:
+                job.finish(filename)
+            claimed_jobs = []
+            try:
+                GenerationJob.purge_expired()
+            except Exception as e:
+                logger.warning("Could not purge expired generation jobs: %s", e)
+            outcome = 'coalesced' if shared_filename else 'ok'
+            if ppt_generator is not None and ppt_generator.skipped_stages:
+                logger.info("Generation for %s skipped %s to meet the deadline", current_user.id, ', '.join(ppt_generator.skipped_stages))
+
             return jsonify({
                 'success': True,
                 'filename': filename,
+                'presentation_id': log_entry.id,
+                'image_status': image_status,
                 'download_url': url_for('main.download_page', filename=filename)
             })
             
         except Exception as e:
             return jsonify({"error": f"Error generating presentation: {str(e)}"}), 500
+        finally:
+            if claimed_jobs:
+                # Release claims so waiting and retried requests stop waiting on this one
+                try:
+                    db.session.rollback()
+                    for job in claimed_jobs:
+                        job.fail(outcome)
+                except Exception as e:
+                    logger.warning("Could not release generation job claims: %s", e)
+            if generation_start is not None:
+                GENERATIONS_IN_FLIGHT.dec()
+                GENERATION_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - generation_start)
 
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 
+def _test_unlimited() -> bool:
+    """Whether this is an unlimited /login/test session (honoured only while LOGIN_TEST_MODE is on)."""
+    return bool(current_app.config.get('LOGIN_TEST_MODE') and session.get('test_unlimited'))
+
+
+def _record_version(log, filepath: str, note: str, template_style: str = None) -> None:
+    """Add ``filepath`` as the next DeckVersion of ``log``; versioning never fails the request."""
+    try:
+        DeckVersion.record(log, filepath, note, template_style)
+    except Exception as e:
+        logger.warning("Could not record deck version for presentation %s: %s", log.id, e)
+
+
+def _owned_log(log_id: int):
+    """The caller's PresentationLog ``log_id`` (admins may access any), or None."""
+    log = PresentationLog.query.get(log_id)
+    if log is None or (log.user_id != current_user.id and not current_user.is_admin):
+        return None
+    return log
+
+
+@bp.route("/presentations/<int:log_id>/restyle", methods=["POST"])
+@login_required
+def restyle_presentation(log_id):
+    """Re-render a generated deck's stored content into one or more other templates without calling the LLM."""
+    log = _owned_log(log_id)
+    if log is None:
+        return jsonify({"error": "Presentation not found"}), 404
+    slides_content = log.slides
+    if slides_content is None:
+        return jsonify({"error": "This presentation has no stored content to re-style; please generate it again."}), 409
+
+    data = request.get_json() or {}
+    styles = data.get("template_styles") or [data.get("template_style")]
+    styles = [s for s in dict.fromkeys(styles) if s]
+    if not styles:
+        return jsonify({"error": "Missing template_style or template_styles"}), 400
+
+    renderer = PPTGenerator(offline=True)
+    unknown = [s for s in styles if not renderer.has_template(s)]
+    if unknown:
+        return jsonify({"error": f"Unknown template style: {', '.join(unknown)}"}), 400
+
+    # Decoded once and rendered into every requested template
+    presentation_title = (log.content.presentation_title if log.content else None) or log.title
+    results = []
+    try:
+        for style in styles:
+            filepath = renderer.render_presentation(
+                presentation_title=presentation_title,
+                presenter=log.presenter or current_user.name,
+                slides_content=slides_content,
+                template_style=style,
+                # The log id keeps same-prompt decks of different logs (and users) from overwriting each other
+                filename=f"{sanitize_filename(log.title or presentation_title)}_{sanitize_filename(style)}_{log.id}.pptx"
+            )
+            filename = os.path.basename(filepath)
+            _record_version(log, filepath, f"restyle: {style}", template_style=style)
+            results.append({
+                'template_style': style,
+                'filename': filename,
+                'download_url': url_for('main.download_page', filename=filename)
+            })
+    except Exception as e:
+        logger.error("Re-style of presentation %s failed: %s", log_id, e)
+        return jsonify({"error": f"Error creating presentation: {str(e)}"}), 500
+
+    db.session.commit()
+    return jsonify({'success': True, 'presentations': results})
+
+
+@bp.route("/presentations/<int:log_id>/slides/<int:slide_number>/regenerate", methods=["POST"])
+@login_required
+def regenerate_slide(log_id, slide_number):
+    """Rewrite one content slide (1-based, title slide excluded) and patch it into the saved deck in place."""
+    log = _owned_log(log_id)
+    if log is None:
+        return jsonify({"error": "Presentation not found"}), 404
+    slides_content = log.slides
+    if slides_content is None or not log.filename or not os.path.exists(os.path.join(GENERATED_FOLDER, log.filename)):
+        return jsonify({"error": "This presentation can no longer be edited; please generate it again."}), 409
+    if effective_status(log) == PENDING:
+        # The image upgrade would replace the file and drop this edit
+        return jsonify({"error": "Images are still being added to this presentation. Please try again shortly."}), 409
+    if not 1 <= slide_number <= len(slides_content):
+        return jsonify({"error": f"slide_number must be between 1 and {len(slides_content)}"}), 400
+    data = request.get_json(silent=True) or {}
+    instructions = (data.get("instructions") or "").strip()[:500] or None
+
+    # One edit per deck at a time; a concurrent edit would patch a stale copy
+    job, is_leader = GenerationJob.claim(f"slide:{log.id}", reuse_seconds=0, user_id=current_user.id)
+    if not is_leader:
+        return jsonify({"error": "Another edit of this presentation is in progress. Please try again shortly."}), 409
+    try:
+        generator = PPTGenerator(deadline=Deadline())
+        generator.plan = current_user.plan
+        index = slide_number - 1
+        slide = generator.regenerate_slide(log.title, slides_content, index, instructions)
+        slides_content[index] = slide
+
+        # Decks can be shared with coalesced requests, so the first edit moves this log to its own copy
+        own_filename = f"{os.path.splitext(log.filename)[0]}_{log.id}.pptx"
+        if log.filename.endswith(f"_{log.id}.pptx"):
+            own_filename = log.filename
+        source = os.path.join(GENERATED_FOLDER, log.filename)
+        target = os.path.join(GENERATED_FOLDER, own_filename)
+        template_style = log.template_style or DEFAULT_TEMPLATE_STYLE
+        # Deck position: the title slide comes first. A slide that showed a picture gets a new one for its new content
+        had_image = slide_has_image(source, slide_number)
+        slide_xml, slide_rels, media = generator.render_slide_parts(slide, template_style, slide_number,
+                                                                    include_image=had_image)
+        try:
+            patch_slide(source, slide_number, slide_xml, slide_rels, output_path=target, media=media)
+        except ValueError as e:
+            logger.info("Slide patch not possible (%s); re-rendering presentation %s", e, log.id)
+            generator.render_presentation(
+                presentation_title=(log.content.presentation_title if log.content else None) or log.title,
+                presenter=log.presenter or current_user.name,
+                slides_content=slides_content,
+                template_style=template_style,
+                include_images=had_image,
+                filename=own_filename
+            )
+
+        log.filename = own_filename
+        log.slides_json = json.dumps(slides_content)
+        _record_version(log, target, f"slide {slide_number} regenerated")
+        db.session.commit()
+        job.finish(own_filename)
+    except DeadlineExceeded:
+        job.fail('timeout')
+        return jsonify({"error": "Regenerating the slide took too long. Please try again."}), 504
+    except Exception as e:
+        db.session.rollback()
+        job.fail(str(e))
+        logger.error("Slide regeneration for presentation %s failed: %s", log_id, e)
+        return jsonify({"error": f"Error regenerating slide: {str(e)}"}), 500
+
+    return jsonify({
+        'success': True,
+        'slide': slide,
+        'filename': own_filename,
+        'download_url': url_for('main.download_page', filename=own_filename),
+        'tokens': generator.usage
+    })
+
+
+@bp.route("/presentations/<int:log_id>/status")
+@login_required
+def presentation_status(log_id):
+    """Progressive delivery status polled by the download page."""
+    log = _owned_log(log_id)
+    if log is None:
+        return jsonify({"error": "Presentation not found"}), 404
+    return jsonify({'presentation_id': log.id, 'image_status': effective_status(log)})
+
+
+@bp.route("/presentations/<int:log_id>/versions")
+@login_required
+@replica_read
+def list_versions(log_id):
+    """List the saved versions of a deck, oldest first."""
+    log = _owned_log(log_id)
+    if log is None:
+        return jsonify({"error": "Presentation not found"}), 404
+    versions = DeckVersion.query.filter_by(log_id=log.id).order_by(DeckVersion.version).all()
+    return jsonify({
+        'presentation_id': log.id,
+        'versions': [
+            dict(v.to_dict(), download_url=url_for('main.download_version', log_id=log.id, version=v.version))
+            for v in versions
+        ]
+    })
+
+
+@bp.route("/presentations/<int:log_id>/versions/<int:version>/download")
+@login_required
+def download_version(log_id, version):
+    """Assemble a saved version from the part store and stream it as a .pptx."""
+    from flask import Response, stream_with_context
+    log = _owned_log(log_id)
+    if log is None:
+        return jsonify({"error": "Presentation not found"}), 404
+    deck_version = DeckVersion.query.filter_by(log_id=log.id, version=version).first()
+    if deck_version is None:
+        return jsonify({"error": "Version not found"}), 404
+    manifest = deck_version.manifest
+    store = get_part_store()
+    missing = store.missing(manifest)
+    if missing:
+        logger.error("Version %s of presentation %s is missing %s parts", version, log.id, len(missing))
+        return jsonify({"error": "This version is no longer available"}), 410
+
+    stem = os.path.splitext(log.filename or f"{sanitize_filename(log.title or '')}.pptx")[0]
+    response = Response(
+        stream_with_context(store.stream(manifest)),
+        mimetype='application/vnd.openxmlformats-officedocument.presentationml.presentation'
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{stem}_v{version}.pptx"'
+    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+    return response
+
+
+def _api_user():
+    """User for an API call: a ``Bearer`` token from RENDER_API_KEYS, else the logged-in session user."""
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        token = auth[len('Bearer '):].strip()
+        for key, user_id in RENDER_API_KEYS.items():
+            if hmac.compare_digest(key, token):
+                return User.query.get(user_id)
+        return None
+    return current_user if current_user.is_authenticated else None
+
+
+@bp.route("/api/render", methods=["POST"])
+def api_render():
+    """Render caller-supplied slides into a template and return the .pptx; no LLM call and no log row."""
+    user = _api_user()
+    if user is None:
+        return jsonify({"error": "Authentication required"}), 401
+
+    data = request.get_json(silent=True) or {}
+    title = (data.get("title") or "").strip()
+    if not title:
+        return jsonify({"error": "Missing required field: title"}), 400
+    try:
+        slides = normalize_slides(data.get("slides"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Quota accounting is the only database write: one conditional UPDATE
+    if not user.is_admin:
+        if user.plan == 'pay_per_use':
+            return jsonify({"error": "Payment required", "payment_required": True}), 402
+        quota = User.query.filter(User.id == user.id)
+        plan_limit = User.PLANS.get(user.plan, {}).get('limit')
+        if plan_limit:
+            quota = quota.filter(User.presentations_count < plan_limit)
+        charged = quota.update({User.presentations_count: User.presentations_count + 1}, synchronize_session=False)
+        db.session.commit()
+        if not charged:
+            return jsonify({"error": f"You have reached your {User.PLANS[user.plan]['name']} plan limit."}), 403
+
+    try:
+        pptx = render_deck(
+            title=title,
+            presenter=data.get("presenter") or user.name,
+            slides=slides,
+            template_style=data.get("template_style") or DEFAULT_TEMPLATE_STYLE
+        )
+    except ValueError as e:
+        _refund_unit(user)
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        _refund_unit(user)
+        logger.error("Render API failed for %s: %s", user.id, e)
+        return jsonify({"error": f"Error creating presentation: {str(e)}"}), 500
+
+    from flask import send_file
+    from io import BytesIO
+    return send_file(
+        BytesIO(pptx),
+        mimetype='application/vnd.openxmlformats-officedocument.presentationml.presentation',
+        as_attachment=True,
+        download_name=f"{sanitize_filename(title)}.pptx"
+    )
+
+
+def _refund_unit(user) -> None:
+    if user.is_admin or user.plan == 'pay_per_use':
+        return
+    User.query.filter(User.id == user.id, User.presentations_count > 0) \
+        .update({User.presentations_count: User.presentations_count - 1}, synchronize_session=False)
+    db.session.commit()
+
+
 @bp.route("/download/page/<filename>")
 @login_required
 def download_page(filename):
@@ -535,11 +1026,20 @@ def download_page(filename):
     # Generate a signed download token (valid for 1 hour)
     serializer = _get_serializer()
     token = serializer.dumps(filename)
+
+    # Decks delivered text-first report when their image version replaces the file
+    log = (PresentationLog.query
+           .filter_by(user_id=current_user.id, filename=filename)
+           .order_by(PresentationLog.id.desc())
+           .first())
+    image_status = effective_status(log) if log else None
     
     return render_template('download.html',
                            user=current_user,
                            download_url=url_for('main.download_file', token=token),
-                           remaining_presentations=remaining)
+                           remaining_presentations=remaining,
+                           image_status=image_status,
+                           status_url=url_for('main.presentation_status', log_id=log.id) if log else None)
 
 @bp.route("/download/file/<token>")
 @login_required
@@ -562,7 +1062,7 @@ def download_file(token):
                 db.session.commit()
         except Exception as e:
             # Log any issues but don't block the response
-            print(f"Error refunding presentation unit: {str(e)}")
+            logger.error("Error refunding presentation unit: %s", e)
         return error_msg, 400
     
 
@@ -578,12 +1078,12 @@ def download_file(token):
 @login_required
 def switch_plan(plan_type):
     try:
-        print(f"Debug - Switch plan request received for plan: {plan_type}")
+        logger.debug("Switch plan request received for plan: %s", plan_type)
         
         # Validate plan type (including pay_per_use)
         valid_plans = list(User.PLANS.keys()) + ['pay_per_use']
         if plan_type not in valid_plans:
-            print(f"Debug - Invalid plan type: {plan_type}")
+            logger.debug("Invalid plan type: %s", plan_type)
             return jsonify({
                 'success': False,
                 'error': 'Invalid plan type'
@@ -591,14 +1091,14 @@ def switch_plan(plan_type):
 
         # For paid plans (pro and creator), initialize payment
         if plan_type in ['pro', 'creator']:
-            print(f"Debug - Initializing payment for paid plan: {plan_type}")
+            logger.debug("Initializing payment for paid plan: %s", plan_type)
             
             # Get plan details
             plan = User.PLANS[plan_type]
             amount = plan['price']
             plan_id = plan.get('plan_id')
             
-            print(f"Debug - Plan details: amount={amount}, plan_id={plan_id}")
+            logger.debug("Plan details: amount=%s, plan_id=%s", amount, plan_id)
 
             # Initialize Paystack payment
             url = "https://api.paystack.co/transaction/initialize"
@@ -608,7 +1108,7 @@ def switch_plan(plan_type):
             }
             
             callback_url = url_for('main.payment_callback', _external=True, _scheme='http')
-            print(f"Debug - Callback URL: {callback_url}")
+            logger.debug("Callback URL: %s", callback_url)
             
             data = {
                 "email": current_user.email,
@@ -622,28 +1122,28 @@ def switch_plan(plan_type):
                 }
             }
             
-            print(f"Debug - Payment request data: {data}")
+            logger.debug("Payment request data: %s", data)
             response = requests.post(url, headers=headers, json=data)
-            print(f"Debug - Paystack response status: {response.status_code}")
+            logger.debug("Paystack response status: %s", response.status_code)
             
             if response.status_code == 200:
                 result = response.json()
-                print(f"Debug - Paystack response: {result}")
+                logger.debug("Paystack response: %s", result)
                 
                 if result.get('status'):
                     # Store payment reference in session
                     session['payment_reference'] = result['data']['reference']
                     payment_url = result['data']['authorization_url']
-                    print(f"Debug - Payment initialized, redirecting to: {payment_url}")
+                    logger.debug("Payment initialized, redirecting to: %s", payment_url)
                     
                     return jsonify({
                         'success': False,  # Set to false to ensure frontend redirects
                         'payment_url': payment_url
                     })
                 else:
-                    print(f"Debug - Payment initialization failed: {result}")
+                    logger.warning("Payment initialization failed: %s", result)
             else:
-                print(f"Debug - Payment request failed: {response.text}")
+                logger.warning("Payment request failed: %s", response.text)
 
             return jsonify({
                 'success': False,
@@ -651,7 +1151,7 @@ def switch_plan(plan_type):
             }), 400
 
         # For free plan or pay-per-use, switch immediately
-        print(f"Debug - Switching to {plan_type} plan immediately")
+        logger.debug("Switching to %s plan immediately", plan_type)
         if plan_type in ['free', 'pay_per_use']:
             # Store the old plan and count in case we need to revert
             old_plan = current_user.plan
@@ -674,7 +1174,7 @@ def switch_plan(plan_type):
         })
         
     except Exception as e:
-        print(f"Debug - Error in switch_plan: {str(e)}")
+        logger.error("Error in switch_plan: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -743,6 +1243,7 @@ def initialize_payment():
 # ------------------
 @bp.route('/dashboard')
 @login_required
+@replica_read
 def dashboard():
     plan_info = User.PLANS.get(current_user.plan)
     used = current_user.presentations_count
@@ -755,6 +1256,7 @@ def dashboard():
 # ------------------
 @bp.route('/admin')
 @admin_required
+@replica_read
 def admin_dashboard_page():
     # HTML template fetches usage via JS
     return render_template('admin/dashboard.html', user=current_user)
@@ -764,6 +1266,7 @@ def admin_dashboard_page():
 # ------------------
 @bp.route('/admin/usage')
 @admin_required
+@replica_read
 def admin_usage():
     # Aggregate usage by user
     from sqlalchemy import func
@@ -790,6 +1293,102 @@ def admin_usage():
     ]
     return jsonify({"usage": usage_data})
 
+@bp.route('/admin/latency')
+@admin_required
+@replica_read
+def admin_latency():
+    """Report p50/p95/p99 generation latency and cost grouped by plan, template or slide count."""
+    from datetime import timedelta
+    group_by = request.args.get('group_by', 'plan')
+    columns = {
+        'plan': GenerationStats.plan,
+        'template': GenerationStats.template_style,
+        'slides': GenerationStats.num_slides,
+    }
+    if group_by not in columns:
+        return jsonify({'error': f"group_by must be one of {', '.join(columns)}"}), 400
+    days = request.args.get('days', 30, type=int)
+    since = datetime.utcnow() - timedelta(days=days)
+
+    rows = (
+        db.session.query(
+            columns[group_by].label('group'),
+            GenerationStats.total_ms,
+            GenerationStats.content_ms,
+            GenerationStats.image_ms,
+            GenerationStats.cost_usd,
+            GenerationStats.retry_count,
+        )
+        .filter(GenerationStats.created_at >= since)
+        .all()
+    )
+
+    groups = {}
+    for row in rows:
+        groups.setdefault(row.group, []).append(row)
+
+    report = []
+    for group, items in groups.items():
+        totals = [r.total_ms for r in items if r.total_ms is not None]
+        costs = [r.cost_usd or 0.0 for r in items]
+        report.append({
+            group_by: group,
+            'count': len(items),
+            'p50_ms': percentile(totals, 50),
+            'p95_ms': percentile(totals, 95),
+            'p99_ms': percentile(totals, 99),
+            'content_p95_ms': percentile([r.content_ms for r in items if r.content_ms is not None], 95),
+            'image_p95_ms': percentile([r.image_ms for r in items if r.image_ms], 95),
+            'avg_cost_usd': round(sum(costs) / len(costs), 5),
+            'p95_cost_usd': percentile(costs, 95),
+            'total_cost_usd': round(sum(costs), 4),
+            'retry_rate': round(sum(1 for r in items if r.retry_count) / len(items), 3),
+        })
+    report.sort(key=lambda r: (r[group_by] is None, r[group_by]))
+    return jsonify({'group_by': group_by, 'days': days, 'latency': report})
+
+@bp.route('/admin/content-cache')
+@admin_required
+@replica_read
+def admin_content_cache():
+    """Report how often slide content was reused (exact / near-duplicate) instead of generated, per plan."""
+    from datetime import timedelta
+    from sqlalchemy import func
+    from app.generated_content import GeneratedContent
+    days = request.args.get('days', 7, type=int)
+    since = datetime.utcnow() - timedelta(days=days)
+
+    rows = (
+        db.session.query(
+            GenerationStats.plan,
+            GenerationStats.content_source,
+            func.count(GenerationStats.id),
+            func.avg(GenerationStats.content_similarity),
+        )
+        .filter(GenerationStats.created_at >= since)
+        .group_by(GenerationStats.plan, GenerationStats.content_source)
+        .all()
+    )
+
+    plans = {}
+    for plan, source, count, avg_similarity in rows:
+        entry = plans.setdefault(plan, {'plan': plan, 'total': 0, 'llm': 0, 'exact': 0, 'near': 0})
+        entry[source or 'llm'] += count
+        entry['total'] += count
+        if source == 'near' and avg_similarity is not None:
+            entry['avg_near_similarity'] = round(avg_similarity, 3)
+    for entry in plans.values():
+        entry['hit_rate'] = round((entry['exact'] + entry['near']) / entry['total'], 3) if entry['total'] else 0.0
+
+    return jsonify({
+        'days': days,
+        'threshold': content_cache.threshold,
+        'exact_reuse_plans': sorted(EXACT_REUSE_PLANS),
+        'near_duplicate_plans': sorted(NEAR_DUPLICATE_PLANS),
+        'entries': GeneratedContent.query.count(),
+        'plans': sorted(plans.values(), key=lambda e: (e['plan'] is None, e['plan'])),
+    })
+
 @bp.route('/admin/award_units', methods=['POST'])
 @admin_required
 def admin_award_units():
@@ -809,8 +1408,8 @@ def admin_award_units():
 @login_required
 def payment_callback():
     reference = request.args.get('reference')
-    print(f"Debug - Payment callback received with reference: {reference}")
-    print(f"Debug - Session reference: {session.get('payment_reference')}")
+    logger.debug("Payment callback received with reference: %s", reference)
+    logger.debug("Session reference: %s", session.get('payment_reference'))
     
     if not reference or reference != session.get('payment_reference'):
         flash('Invalid payment reference', 'error')
@@ -822,27 +1421,27 @@ def payment_callback():
         headers = {
             "Authorization": f"Bearer {os.getenv('PAYSTACK_SECRET_KEY')}"
         }
-        print(f"Debug - Verifying payment with Paystack")
+        logger.debug("Verifying payment with Paystack")
         response = requests.get(url, headers=headers)
         
         if response.status_code == 200:
             result = response.json()
-            print(f"Debug - Paystack response: {result}")
+            logger.debug("Paystack response: %s", result)
             
             if result['status'] and result['data']['status'] == 'success':
                 # Get metadata from payment
                 metadata = result['data'].get('metadata', {})
                 plan_type = metadata.get('plan')
-                print(f"Debug - Plan type from metadata: {plan_type}")
+                logger.debug("Plan type from metadata: %s", plan_type)
 
                 if plan_type in ['pro', 'creator']:
                     # Update user's subscription plan
-                    print(f"Debug - Updating user plan from {current_user.plan} to {plan_type}")
+                    logger.debug("Updating user plan from %s to %s", current_user.plan, plan_type)
                     current_user.plan = plan_type
                     current_user.presentations_count = 0  # Reset count on plan change
                     current_user.last_reset = datetime.utcnow()  # Reset the monthly counter
                     db.session.commit()
-                    print(f"Debug - Plan updated in database and counters reset")
+                    logger.debug("Plan updated in database and counters reset")
                     flash(f'Payment successful! Your plan has been upgraded to {plan_type}.', 'success')
                     
                     # Clear the previous plan info from session
@@ -858,9 +1457,9 @@ def payment_callback():
                 session.pop('payment_reference', None)
                 return redirect(url_for('main.generate'))
             else:
-                print(f"Debug - Payment not successful: {result}")
+                logger.debug("Payment not successful: %s", result)
         else:
-            print(f"Debug - Paystack verification failed with status code: {response.status_code}")
+            logger.warning("Paystack verification failed with status code: %s", response.status_code)
         
         # Revert to previous plan if payment failed
         if 'previous_plan' in session:
@@ -879,7 +1478,7 @@ def payment_callback():
         return redirect(url_for('main.generate'))
         
     except Exception as e:
-        print(f"Debug - Error in payment callback: {str(e)}")
+        logger.error("Error in payment callback: %s", e)
         flash('Error verifying payment', 'error')
         return redirect(url_for('main.generate'))
 
@@ -0,0 +1,240 @@
+import os
+import re
+import json
+import time
+import zlib
+import random
+import hashlib
+import logging
+import threading
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from app.utils.metrics import CONTENT_CACHE_LOOKUPS, CONTENT_CACHE_SIMILARITY
+
+logger = logging.getLogger(__name__)
+
+# Words that change a prompt's wording but not the deck it should produce
+STOP_WORDS = {
+    'a', 'an', 'the', 'of', 'on', 'about', 'and', 'to', 'for', 'in', 'with', 'into', 'its', 'their',
+    'presentation', 'slides', 'slide', 'deck', 'introduction', 'intro', 'overview', 'please', 'create', 'make',
+}
+
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+_MERSENNE_PRIME = (1 << 61) - 1
+# Fixed seed so signatures persisted by one process are comparable in every other
+_rng = random.Random(1729)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lower-case, drop punctuation and stop words, collapse whitespace."""
+    tokens = re.findall(r'[a-z0-9]+', (prompt or '').lower())
+    return ' '.join(t for t in tokens if t not in STOP_WORDS)
+
+
+def prompt_hash(normalized: str, num_slides: int) -> str:
+    return hashlib.sha256(f"{num_slides}:{normalized}".encode('utf-8')).hexdigest()
+
+
+def shingles(normalized: str) -> Set[str]:
+    """Word tokens plus per-word character trigrams (robust to added words, reordering and typos)."""
+    tokens = normalized.split()
+    result = set(tokens)
+    for token in tokens:
+        marked = f"#{token}#"
+        result.update(marked[i:i + 3] for i in range(len(marked) - 2))
+    return result
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(shingle_set: Set[str]) -> array:
+    """64-permutation MinHash signature of a shingle set."""
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in shingle_set] or [0]
+    return array('Q', (min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS))
+
+
+class ContentCache:
+    """Exact and near-duplicate lookup of previously generated slide content.
+
+    Exact hits match the normalized prompt and slide count. Near duplicates come from an
+    in-memory MinHash LSH index (16 bands x 4 rows) over every process's stored generations;
+    LSH candidates are verified with the exact Jaccard similarity of their prompt shingles
+    before being returned. The index loads lazily, picks up rows written by other workers
+    every ``refresh_seconds`` and drops entries once they expire or exceed ``max_entries``.
+    """
+
+    def __init__(self):
+        self.threshold = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.6))
+        self.ttl_days = int(os.getenv('CONTENT_CACHE_TTL_DAYS', 30))
+        self.max_entries = int(os.getenv('CONTENT_CACHE_MAX_ENTRIES', 20000))
+        self.refresh_seconds = float(os.getenv('CONTENT_CACHE_REFRESH_SECONDS', 30))
+        self._buckets: Dict[tuple, Set[int]] = defaultdict(set)
+        self._entries: Dict[int, tuple] = {}  # id -> (num_slides, shingles, created_at, bucket keys)
+        self._last_id = 0
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    # Index maintenance -------------------------------------------------
+    def _index(self, entry_id: int, num_slides: int, normalized: str, signature: array, created_at) -> None:
+        keys = [(num_slides, band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])) for band in range(LSH_BANDS)]
+        self._entries[entry_id] = (num_slides, shingles(normalized), created_at, keys)
+        for key in keys:
+            self._buckets[key].add(entry_id)
+
+    def _drop(self, entry_id: int) -> None:
+        _, _, _, keys = self._entries.pop(entry_id)
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the oldest ones beyond ``max_entries`` (caller holds the lock)."""
+        cutoff = datetime.utcnow() - timedelta(days=self.ttl_days)
+        for entry_id in [i for i, entry in self._entries.items() if entry[2] and entry[2] < cutoff]:
+            self._drop(entry_id)
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            for entry_id in sorted(self._entries)[:overflow]:
+                self._drop(entry_id)
+
+    def _refresh(self) -> None:
+        """Load rows added since the last refresh (by any worker) into the LSH index."""
+        from app.generated_content import GeneratedContent
+        if time.monotonic() - self._last_refresh < self.refresh_seconds:
+            return
+        self._last_refresh = time.monotonic()
+        cutoff = datetime.utcnow() - timedelta(days=self.ttl_days)
+        rows = (GeneratedContent.query
+                .with_entities(GeneratedContent.id, GeneratedContent.num_slides, GeneratedContent.normalized_prompt,
+                               GeneratedContent.signature, GeneratedContent.created_at)
+                .filter(GeneratedContent.id > self._last_id, GeneratedContent.created_at >= cutoff)
+                .order_by(GeneratedContent.id.desc())
+                .limit(self.max_entries)
+                .all())
+        with self._lock:
+            for entry_id, num_slides, normalized, signature, created_at in rows:
+                sig = array('Q')
+                if signature:
+                    sig.frombytes(signature)
+                else:
+                    sig = minhash(shingles(normalized))
+                self._index(entry_id, num_slides, normalized, sig, created_at)
+            # Only advanced here: rows this process stored itself may be newer than other workers' unseen rows
+            if rows:
+                self._last_id = max(self._last_id, rows[0][0])
+            self._evict()
+        if rows:
+            logger.debug("Content cache index: +%s entries (%s total)", len(rows), len(self._entries))
+
+    def _near_candidates(self, num_slides: int, query_shingles: Set[str]) -> Optional[tuple]:
+        signature = minhash(query_shingles)
+        cutoff = datetime.utcnow() - timedelta(days=self.ttl_days)
+        candidates = set()
+        with self._lock:
+            for band in range(LSH_BANDS):
+                candidates |= self._buckets.get((num_slides, band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])), set())
+            best = None
+            for entry_id in candidates:
+                _, entry_shingles, created_at, _ = self._entries[entry_id]
+                if created_at and created_at < cutoff:
+                    continue
+                similarity = jaccard(query_shingles, entry_shingles)
+                if best is None or similarity > best[1]:
+                    best = (entry_id, similarity)
+        return best
+
+    def _exact(self, normalized: str, num_slides: int):
+        from app.generated_content import GeneratedContent
+        cutoff = datetime.utcnow() - timedelta(days=self.ttl_days)
+        return (GeneratedContent.query
+                .filter_by(prompt_hash=prompt_hash(normalized, num_slides))
+                .filter(GeneratedContent.created_at >= cutoff)
+                .order_by(GeneratedContent.id.desc())
+                .first())
+
+    # Public API --------------------------------------------------------
+    def contains(self, prompt: str, num_slides: int) -> bool:
+        """Whether an exact, unexpired entry exists (without counting a lookup or a hit)."""
+        return self._exact(normalize_prompt(prompt), num_slides) is not None
+
+    def lookup(self, prompt: str, num_slides: int, allow_near: bool = False, allow_exact: bool = True):
+        """Return ``(GeneratedContent, similarity)`` for a reusable prior generation, or None.
+
+        Near-duplicate reuse implies exact reuse; with neither allowed nothing is looked up.
+        """
+        from app.generated_content import GeneratedContent
+        if not (allow_exact or allow_near):
+            return None
+        normalized = normalize_prompt(prompt)
+        entry = self._exact(normalized, num_slides)
+        if entry is not None:
+            CONTENT_CACHE_LOOKUPS.labels(result='exact').inc()
+            return self._hit(entry, 1.0)
+
+        if allow_near and normalized:
+            self._refresh()
+            best = self._near_candidates(num_slides, shingles(normalized))
+            if best is not None and best[1] >= self.threshold:
+                entry = GeneratedContent.query.get(best[0])
+                if entry is not None:
+                    CONTENT_CACHE_LOOKUPS.labels(result='near').inc()
+                    CONTENT_CACHE_SIMILARITY.observe(best[1])
+                    logger.info("Near-duplicate prompt %r reused content of %r (similarity %.2f)",
+                                prompt[:80], entry.prompt[:80], best[1])
+                    return self._hit(entry, best[1])
+
+        CONTENT_CACHE_LOOKUPS.labels(result='miss').inc()
+        return None
+
+    def _hit(self, entry, similarity: float):
+        from app import db
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_used_at = datetime.utcnow()
+        db.session.commit()
+        return entry, similarity
+
+    def store(self, prompt: str, num_slides: int, slides: List[Dict], model: Optional[str] = None):
+        """Persist freshly generated slides and add them to this process's index."""
+        from app import db
+        from app.generated_content import GeneratedContent
+        normalized = normalize_prompt(prompt)
+        signature = minhash(shingles(normalized))
+        entry = GeneratedContent(
+            prompt=prompt,
+            normalized_prompt=normalized,
+            prompt_hash=prompt_hash(normalized, num_slides),
+            num_slides=num_slides,
+            slides_json=json.dumps(slides),
+            signature=signature.tobytes(),
+            model=model,
+        )
+        db.session.add(entry)
+        db.session.commit()
+        with self._lock:
+            self._index(entry.id, num_slides, normalized, signature, entry.created_at)
+            if len(self._entries) > self.max_entries:
+                self._evict()
+        return entry
+
+    def set_title(self, entry, title: str) -> None:
+        from app import db
+        if entry is not None and not entry.presentation_title:
+            entry.presentation_title = title[:200]
+            db.session.commit()
+
+
+# One index per process, shared by all requests
+content_cache = ContentCache()
@@ -0,0 +1,161 @@
+import os
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import NullPool, StaticPool
+
+# Bind key under which the optional read replica engine is registered
+REPLICA_BIND_KEY = 'replica'
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_database_url(url: str) -> str:
+    """Rewrite legacy ``postgres://`` URLs (as issued by Render/Heroku) to the scheme SQLAlchemy 2 expects."""
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def engine_options_for(url: str) -> dict:
+    """Return ``SQLALCHEMY_ENGINE_OPTIONS`` tuned for the database behind ``url``.
+
+    SQLite gets a busy timeout and a pool suited to multi-process gunicorn
+    deployments (the WAL/synchronous PRAGMAs are applied per connection by
+    ``_set_sqlite_pragmas``). Postgres gets a sized, pre-pinged, recycled pool.
+    """
+    backend = make_url(url).get_backend_name()
+
+    if backend == "sqlite":
+        busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 15000))
+        connect_args = {
+            # sqlite3 waits this long for a lock before raising "database is locked"
+            "timeout": busy_timeout_ms / 1000.0,
+            # Connections are handed between threads by the pool
+            "check_same_thread": False,
+        }
+        database = make_url(url).database
+        if not database or database == ":memory:":
+            # A single shared connection, otherwise every checkout sees an empty database
+            return {"poolclass": StaticPool, "connect_args": connect_args}
+        # SQLite connections are cheap to open and hold no server-side state, so do not
+        # keep idle handles (and their locks) around in each gunicorn worker.
+        return {"poolclass": NullPool, "connect_args": connect_args}
+
+    if backend == "postgresql":
+        return {
+            "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+            "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+            # Recycle before typical server/proxy idle timeouts drop the connection
+            "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+            "pool_pre_ping": True,
+        }
+
+    return {"pool_pre_ping": True}
+
+
+@event.listens_for(Engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Switch every new SQLite connection to WAL with a busy timeout.
+
+    WAL lets readers proceed while a single writer commits, and
+    ``synchronous=NORMAL`` is durable across application crashes in WAL mode
+    while avoiding an fsync on every commit.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 15000))
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+    finally:
+        cursor.close()
+
+
+# ------------------
+# Read-replica routing
+# ------------------
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica bind during read-only requests.
+
+    Writes (flushes) always go to the primary. Once a request has written, or
+    when the user wrote within ``REPLICA_READ_YOUR_WRITES_SECONDS``, reads stay
+    on the primary too so users never see their own changes disappear.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _replica_reads_allowed():
+            replica = self._db.engines.get(REPLICA_BIND_KEY)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _pin_to_primary_after_write(session, flush_context):
+    """Keep the rest of this request, and the user's next few requests, on the primary."""
+    if not has_request_context() or not _replica_configured():
+        return
+    g._db_wrote = True
+    window = current_app.config.get('REPLICA_READ_YOUR_WRITES_SECONDS', 10)
+    flask_session['_primary_until'] = time.time() + window
+
+
+def _replica_configured() -> bool:
+    return REPLICA_BIND_KEY in (current_app.config.get('SQLALCHEMY_BINDS') or {})
+
+
+def _replica_reads_allowed() -> bool:
+    if not has_request_context():
+        return False
+    if not g.get('_db_read_replica') or g.get('_db_wrote') or g.get('_db_force_primary'):
+        return False
+    return flask_session.get('_primary_until', 0) <= time.time()
+
+
+def replica_read(f):
+    """Mark a view as read-only so its queries (including the user loader) may use the replica.
+
+    Apply it directly above the view function, below ``login_required`` and friends.
+    """
+    f._replica_read = True
+    return f
+
+
+@contextmanager
+def use_primary():
+    """Force queries inside the block onto the primary (read-your-writes escape hatch)."""
+    previous = g.get('_db_force_primary', False)
+    g._db_force_primary = True
+    try:
+        yield
+    finally:
+        g._db_force_primary = previous
+
+
+def _route_reads():
+    view = current_app.view_functions.get(request.endpoint)
+    g._db_read_replica = bool(getattr(view, '_replica_read', False))
+
+
+def init_read_replica(app) -> None:
+    """Register ``DATABASE_REPLICA_URL`` (if set) as a bind and enable per-request read routing."""
+    replica_url = os.getenv('DATABASE_REPLICA_URL')
+    app.config['REPLICA_READ_YOUR_WRITES_SECONDS'] = int(os.getenv('REPLICA_READ_YOUR_WRITES_SECONDS', 10))
+    if not replica_url:
+        return
+    replica_url = normalize_database_url(replica_url)
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[REPLICA_BIND_KEY] = {'url': replica_url, **engine_options_for(replica_url)}
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.before_request(_route_reads)
+    logger.info("Read replica enabled: %s", make_url(replica_url).render_as_string(hide_password=True))
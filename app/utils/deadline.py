@@ -0,0 +1,50 @@
+import os
+import time
+import logging
+from typing import Optional
+
+from app.utils.metrics import DEADLINE_SKIPS
+
+logger = logging.getLogger(__name__)
+
+# Keep below the gunicorn worker timeout (gunicorn.conf.py) so a late deck is still returned, not killed
+DEFAULT_DEADLINE_SECONDS = float(os.getenv('GENERATION_DEADLINE_SECONDS', 25))
+# Time held back for building and saving the .pptx once content is in
+RENDER_RESERVE_SECONDS = float(os.getenv('DEADLINE_RENDER_RESERVE_SECONDS', 3))
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a required stage cannot start or finish within the request deadline."""
+
+
+class Deadline:
+    """Wall-clock budget for one generation request that every stage draws its timeouts from."""
+
+    def __init__(self, seconds: float = DEFAULT_DEADLINE_SECONDS):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None, reserve: float = 0.0) -> float:
+        """Timeout for the next call: what is left after ``reserve``, at most ``cap``.
+
+        Raises ``DeadlineExceeded`` when nothing is left, so callers never start a call that
+        is already doomed.
+        """
+        left = self.remaining() - reserve
+        if left <= 0:
+            raise DeadlineExceeded(f"Generation deadline of {self.seconds:.0f}s exceeded")
+        return min(left, cap) if cap is not None else left
+
+    def allows(self, stage: str, needed: float, reserve: float = 0.0) -> bool:
+        """Whether an optional ``stage`` expected to take ``needed`` seconds still fits; counts skips."""
+        if self.remaining() - reserve >= needed:
+            return True
+        DEADLINE_SKIPS.labels(stage=stage).inc()
+        logger.info("Skipping %s: %.1fs left of %.0fs deadline", stage, self.remaining(), self.seconds)
+        return False
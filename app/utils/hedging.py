@@ -0,0 +1,191 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+from app.utils.metrics import HEDGED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Share of a plan's chat calls that may be duplicated; plans not listed never hedge
+DEFAULT_PLAN_BUDGETS = 'free:0,pay_per_use:0.05,creator:0.05,pro:0.1'
+
+
+def _parse_budgets(spec: str) -> Dict[str, float]:
+    budgets = {}
+    for item in (spec or '').split(','):
+        if ':' in item:
+            plan, ratio = item.split(':', 1)
+            try:
+                budgets[plan.strip()] = max(0.0, float(ratio))
+            except ValueError:
+                logger.warning("Ignoring invalid hedge budget %r", item)
+    return budgets
+
+
+class LatencyTracker:
+    """Rolling per-key latency samples; the hedge threshold is their configured percentile."""
+
+    def __init__(self, percentile: float, window: int, min_samples: int):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def threshold(self, key: str) -> Optional[float]:
+        """Seconds after which a call for ``key`` counts as slow, or None while still learning."""
+        with self._lock:
+            samples = sorted(self._samples[key])
+        if len(samples) < self.min_samples:
+            return None
+        return samples[max(1, math.ceil(self.percentile / 100.0 * len(samples))) - 1]
+
+
+class HedgeBudget:
+    """Caps hedges to a share of each plan's recent calls (rolling window of ``window`` calls)."""
+
+    def __init__(self, ratios: Dict[str, float], window: int = 200):
+        self.ratios = ratios
+        self._history = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def allows(self, plan: Optional[str]) -> bool:
+        ratio = self.ratios.get(plan or '', 0.0)
+        if ratio <= 0:
+            return False
+        with self._lock:
+            history = self._history[plan]
+            # Small windows still get at least ratio * 20 hedges so new processes can hedge
+            return sum(history) < ratio * max(len(history), 20)
+
+    def record(self, plan: Optional[str], hedged: bool) -> None:
+        with self._lock:
+            self._history[plan].append(1 if hedged else 0)
+
+
+def _new_http_client():
+    # Built lazily with the HTTP library the installed openai SDK uses (httpx, or httpx2 in newer
+    # releases), so importing this module never requires either and with_options() accepts it
+    import openai
+    if hasattr(openai, 'DefaultHttpxClient'):
+        return openai.DefaultHttpxClient()
+    import httpx
+    return httpx.Client(timeout=httpx.Timeout(600.0, connect=10.0))
+
+
+class _HttpClientPool:
+    """Idle HTTP clients handed out one per attempt, so a losing attempt can be cancelled by
+    closing its client without disturbing other requests, while winners keep connections warm."""
+
+    def __init__(self, max_idle: int = 8):
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return _new_http_client()
+
+    def put(self, client) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(client)
+                return
+        client.close()
+
+
+class Hedger:
+    """Sends a duplicate request when the first one outlives the rolling p95 and keeps the faster.
+
+    ``send(client)`` performs the call with the given OpenAI client. The loser is cancelled by
+    closing its dedicated HTTP client; its thread ends with a connection error that is ignored.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('HEDGE_ENABLED', '0') == '1'
+        self.latency = LatencyTracker(
+            percentile=float(os.getenv('HEDGE_PERCENTILE', 95)),
+            window=int(os.getenv('HEDGE_WINDOW', 200)),
+            min_samples=int(os.getenv('HEDGE_MIN_SAMPLES', 30)),
+        )
+        self.budget = HedgeBudget(_parse_budgets(os.getenv('HEDGE_PLAN_BUDGETS', DEFAULT_PLAN_BUDGETS)))
+        self._clients = _HttpClientPool()
+        self._executor = ThreadPoolExecutor(max_workers=int(os.getenv('HEDGE_MAX_THREADS', 32)),
+                                            thread_name_prefix='hedge')
+
+    def applies_to(self, client, plan: Optional[str]) -> bool:
+        # Injected stand-in clients (benchmarks) cannot be re-bound to a new HTTP client
+        return self.enabled and plan is not None and hasattr(client, 'with_options') \
+            and self.budget.ratios.get(plan, 0.0) > 0
+
+    def _attempt(self, send: Callable, client, key: str):
+        http_client = self._clients.get()
+        start = time.perf_counter()
+        future = self._executor.submit(send, client.with_options(http_client=http_client))
+        future.http_client = http_client
+        future.started = start
+        future.add_done_callback(
+            lambda f: None if f.cancelled() or f.exception() else self.latency.observe(key, time.perf_counter() - start)
+        )
+        return future
+
+    def call(self, send: Callable, client, key: str, plan: Optional[str],
+             before_hedge: Optional[Callable[[], bool]] = None):
+        """Run ``send`` with hedging for latency bucket ``key`` on behalf of ``plan``."""
+        threshold = self.latency.threshold(key)
+        primary = self._attempt(send, client, key)
+        done, _ = wait([primary], timeout=threshold)
+        if done or threshold is None:
+            return self._finish(primary, None, plan, hedged=False)
+
+        if not self.budget.allows(plan) or (before_hedge is not None and not before_hedge()):
+            HEDGED_REQUESTS.labels(result='skipped').inc()
+            return self._finish(primary, None, plan, hedged=False)
+
+        logger.debug("Hedging %s after %.2fs (threshold %.2fs)", key, time.perf_counter() - primary.started, threshold)
+        hedge = self._attempt(send, client, key)
+        return self._finish(primary, hedge, plan, hedged=True)
+
+    def _finish(self, primary, hedge, plan, hedged: bool):
+        self.budget.record(plan, hedged)
+        pending = [f for f in (primary, hedge) if f is not None]
+        first_error = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                if future.exception() is not None:
+                    first_error = first_error or future.exception()
+                    future.http_client.close()
+                    continue
+                # Winner: cancel whatever is still running and keep this connection pool
+                for loser in pending:
+                    loser.http_client.close()
+                self._clients.put(future.http_client)
+                if hedge is not None:
+                    HEDGED_REQUESTS.labels(result='hedge_won' if future is hedge else 'primary_won').inc()
+                return future.result()
+        raise first_error
+
+
+_hedger: Optional[Hedger] = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger() -> Hedger:
+    global _hedger
+    if _hedger is None:
+        with _hedger_lock:
+            if _hedger is None:
+                _hedger = Hedger()
+    return _hedger
@@ -0,0 +1,366 @@
+import os
+import re
+import abc
+import math
+import base64
+import random
+import hashlib
+import logging
+import zipfile
+import threading
+import xml.etree.ElementTree as ET
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+import requests
+from PIL import Image, ImageDraw, ImageFilter
+
+from app.utils.metrics import OPENAI_REQUESTS
+from app.utils.model_catalog import image_cost
+from app.utils.rate_limiter import IMAGE_REQUESTS, get_rate_limiter, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+DALLE = 'dalle'
+LOCAL = 'local'
+
+# Plan -> provider; override with IMAGE_PROVIDER_PLANS, e.g. "free:local,pro:dalle,creator:dalle"
+DEFAULT_PLAN_PROVIDERS = {'free': LOCAL}
+
+# Used when a template has no readable theme
+DEFAULT_THEME = {
+    'dark': (33, 37, 41),
+    'light': (248, 249, 250),
+    'accents': [(0, 123, 255), (111, 66, 193), (32, 201, 151), (253, 126, 20), (232, 62, 140), (23, 162, 184)],
+}
+
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+
+class ImageProvider(abc.ABC):
+    """Produces PNG bytes for a slide illustration of ``size`` pixels.
+
+    ``generator`` is the calling PPTGenerator (client, deadline, rate limits and cost telemetry);
+    ``theme`` holds the template's colours (see ``template_theme``).
+    """
+
+    name = ''
+    # Expected seconds per image, used for deadline decisions before the first image is timed
+    expected_seconds = 1.0
+
+    @abc.abstractmethod
+    def generate(self, generator, prompt: str, size: Tuple[int, int], theme: Dict) -> bytes:
+        """PNG bytes for ``prompt``; raises on failure."""
+
+
+class DalleImageProvider(ImageProvider):
+    """DALL·E 3 through the shared rate limiter, bounded by the generator's deadline."""
+
+    name = DALLE
+    expected_seconds = float(os.getenv('DEADLINE_IMAGE_SECONDS', 15))
+
+    def generate(self, generator, prompt: str, size: Tuple[int, int], theme: Dict) -> bytes:
+        from app.utils.deadline import RENDER_RESERVE_SECONDS
+        if generator.client is None:
+            raise RuntimeError("no OpenAI client")
+        limiter = get_rate_limiter()
+        deadline = generator.deadline
+        attempt = 0
+        while True:
+            if limiter:
+                limiter.acquire({IMAGE_REQUESTS: 1}, timeout=deadline.remaining() if deadline else None)
+            timeout = generator.OPENAI_TIMEOUT_SECONDS
+            if deadline is not None:
+                timeout = deadline.timeout(cap=timeout, reserve=RENDER_RESERVE_SECONDS)
+            try:
+                response = generator.client.images.generate(
+                    model="dall-e-3",
+                    prompt=prompt,
+                    n=1,
+                    size=self._dalle_size(size),
+                    timeout=timeout
+                )
+                break
+            except Exception as e:
+                backoff = retry_after_seconds(e)
+                outcome = 'error' if backoff is None else 'rate_limited'
+                OPENAI_REQUESTS.labels(endpoint='images', model='dall-e-3', outcome=outcome).inc()
+                if backoff is None or not limiter or attempt >= generator.RATE_LIMIT_RETRIES:
+                    raise
+                limiter.penalize(IMAGE_REQUESTS, backoff)
+                attempt += 1
+        OPENAI_REQUESTS.labels(endpoint='images', model='dall-e-3', outcome='ok').inc()
+        generator.cost_usd += image_cost('dall-e-3')
+        image = response.data[0]
+        if getattr(image, 'b64_json', None):
+            return base64.b64decode(image.b64_json)
+        timeout = generator.IMAGE_DOWNLOAD_TIMEOUT_SECONDS
+        if deadline is not None:
+            timeout = deadline.timeout(cap=timeout, reserve=RENDER_RESERVE_SECONDS)
+        download = requests.get(image.url, timeout=timeout)
+        download.raise_for_status()
+        return download.content
+
+    @staticmethod
+    def _dalle_size(size: Tuple[int, int]) -> str:
+        # DALL·E 3 only offers square, landscape and portrait sizes; pick the closest aspect
+        width, height = size
+        if width > height * 1.3:
+            return "1792x1024"
+        if height > width * 1.3:
+            return "1024x1792"
+        return "1024x1024"
+
+
+# Keyword -> motif drawn by LocalArtProvider
+MOTIF_KEYWORDS = {
+    'bars': ('growth', 'sales', 'revenue', 'finance', 'market', 'economy', 'statistics', 'data', 'metrics',
+             'performance', 'results', 'budget', 'profit', 'chart', 'analysis'),
+    'network': ('network', 'team', 'people', 'community', 'social', 'connect', 'collaboration', 'internet',
+                'system', 'partners', 'stakeholders', 'communication', 'ai', 'machine', 'learning'),
+    'rays': ('idea', 'innovation', 'vision', 'strategy', 'future', 'energy', 'solar', 'inspiration', 'creativity',
+             'goal', 'mission', 'opportunity'),
+    'timeline': ('history', 'timeline', 'roadmap', 'process', 'steps', 'plan', 'phases', 'evolution', 'journey',
+                 'milestones', 'schedule', 'agenda'),
+    'globe': ('world', 'global', 'climate', 'earth', 'environment', 'international', 'planet', 'ocean', 'travel',
+              'geography', 'sustainability'),
+    'stack': ('architecture', 'structure', 'layers', 'foundation', 'building', 'framework', 'stack', 'security',
+              'infrastructure', 'organization'),
+}
+
+
+class LocalArtProvider(ImageProvider):
+    """Theme-coloured abstract illustrations drawn with Pillow in milliseconds, no network.
+
+    The prompt picks a keyword motif (bars, network, rays, timeline, globe, stack) over a gradient,
+    or a geometric pattern when no keyword matches; the prompt hash seeds every random choice so a
+    slide always gets the same picture.
+    """
+
+    name = LOCAL
+    expected_seconds = 0.2
+
+    def generate(self, generator, prompt: str, size: Tuple[int, int], theme: Dict) -> bytes:
+        width, height = size
+        rng = random.Random(int(hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16], 16))
+        accents = list(theme.get('accents') or DEFAULT_THEME['accents'])
+        rng.shuffle(accents)
+        image = self._gradient(width, height, accents[0], accents[1 % len(accents)], rng)
+
+        motif = self.motif(prompt)
+        overlay = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(overlay)
+        if motif is None:
+            self._pattern(draw, width, height, accents, theme, rng)
+        else:
+            getattr(self, f"_draw_{motif}")(draw, width, height, accents, theme, rng)
+        image = Image.alpha_composite(image, overlay)
+
+        buffer = BytesIO()
+        image.convert('RGB').save(buffer, format='PNG', compress_level=1)
+        return buffer.getvalue()
+
+    @staticmethod
+    def motif(prompt: str) -> Optional[str]:
+        words = set(re.findall(r'[a-z]+', prompt.lower()))
+        scores = {motif: len(words.intersection(keywords)) for motif, keywords in MOTIF_KEYWORDS.items()}
+        best = max(scores, key=scores.get)
+        return best if scores[best] else None
+
+    # Backgrounds ---------------------------------------------------------
+    @staticmethod
+    def _gradient(width: int, height: int, start, end, rng) -> Image.Image:
+        # Draw a 256-step gradient on a small strip and stretch it: far cheaper than per-pixel work
+        horizontal = rng.random() < 0.5
+        strip = Image.new('RGB', (256, 1))
+        pixels = strip.load()
+        for i in range(256):
+            t = i / 255.0
+            pixels[i, 0] = tuple(int(start[c] + (end[c] - start[c]) * t) for c in range(3))
+        if not horizontal:
+            strip = strip.rotate(90, expand=True)
+        gradient = strip.resize((width, height), Image.BILINEAR).convert('RGBA')
+        # A few large soft circles give the flat gradient some depth (blurred at 1/4 size, then upscaled)
+        small = (max(1, width // 4), max(1, height // 4))
+        glow = Image.new('RGBA', small, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(glow)
+        for _ in range(3):
+            r = int(min(small) * rng.uniform(0.3, 0.6))
+            x, y = rng.randint(0, small[0]), rng.randint(0, small[1])
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=(255, 255, 255, 28))
+        glow = glow.filter(ImageFilter.GaussianBlur(max(1, min(small) // 12))).resize((width, height), Image.BILINEAR)
+        return Image.alpha_composite(gradient, glow)
+
+    @staticmethod
+    def _pattern(draw, width, height, accents, theme, rng) -> None:
+        cell = max(24, min(width, height) // rng.choice((6, 8, 10)))
+        shape = rng.choice(('triangles', 'circles', 'diamonds'))
+        light = theme.get('light') or DEFAULT_THEME['light']
+        for row, y in enumerate(range(0, height + cell, cell)):
+            for col, x in enumerate(range(0, width + cell, cell)):
+                if rng.random() < 0.35:
+                    continue
+                color = rng.choice(accents + [light])
+                fill = color + (rng.randint(60, 170),)
+                if shape == 'circles':
+                    r = cell * rng.uniform(0.2, 0.45)
+                    cx, cy = x + cell / 2, y + cell / 2
+                    draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=fill)
+                elif shape == 'diamonds':
+                    cx, cy, r = x + cell / 2, y + cell / 2, cell * 0.45
+                    draw.polygon([(cx, cy - r), (cx + r, cy), (cx, cy + r), (cx - r, cy)], fill=fill)
+                elif (row + col) % 2:
+                    draw.polygon([(x, y), (x + cell, y), (x, y + cell)], fill=fill)
+                else:
+                    draw.polygon([(x + cell, y), (x + cell, y + cell), (x, y + cell)], fill=fill)
+
+    # Keyword motifs --------------------------------------------------------
+    @staticmethod
+    def _ink(theme, alpha: int = 235):
+        return tuple(theme.get('light') or DEFAULT_THEME['light']) + (alpha,)
+
+    def _draw_bars(self, draw, width, height, accents, theme, rng) -> None:
+        count = rng.randint(4, 7)
+        margin, base = width * 0.12, height * 0.82
+        slot = (width - 2 * margin) / count
+        level = rng.uniform(0.2, 0.35)
+        points = []
+        for i in range(count):
+            level = min(0.95, level + rng.uniform(0.02, 0.18))
+            top = base - (base - height * 0.1) * level
+            x0 = margin + i * slot + slot * 0.15
+            draw.rectangle((x0, top, x0 + slot * 0.7, base), fill=self._ink(theme, 200))
+            points.append((x0 + slot * 0.35, top - height * 0.04))
+        draw.line(points, fill=accents[2 % len(accents)] + (255,), width=max(3, width // 120))
+        draw.line((margin, base, width - margin, base), fill=self._ink(theme), width=max(2, width // 200))
+
+    def _draw_network(self, draw, width, height, accents, theme, rng) -> None:
+        nodes = [(rng.uniform(0.1, 0.9) * width, rng.uniform(0.1, 0.9) * height) for _ in range(rng.randint(7, 12))]
+        line_width = max(2, width // 250)
+        for i, a in enumerate(nodes):
+            nearest = sorted(nodes[:i] + nodes[i + 1:], key=lambda b: math.dist(a, b))[:2]
+            for b in nearest:
+                draw.line((a, b), fill=self._ink(theme, 150), width=line_width)
+        for x, y in nodes:
+            r = min(width, height) * rng.uniform(0.03, 0.06)
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=rng.choice(accents) + (255,), outline=self._ink(theme),
+                         width=line_width)
+
+    def _draw_rays(self, draw, width, height, accents, theme, rng) -> None:
+        cx, cy = width / 2, height * 0.45
+        r = min(width, height) * 0.16
+        for i in range(12):
+            angle = i * math.pi / 6
+            inner, outer = r * 1.35, r * rng.uniform(1.8, 2.3)
+            draw.line((cx + inner * math.cos(angle), cy + inner * math.sin(angle),
+                       cx + outer * math.cos(angle), cy + outer * math.sin(angle)),
+                      fill=self._ink(theme, 210), width=max(3, width // 100))
+        draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=self._ink(theme, 240))
+        draw.ellipse((cx - r * 0.55, cy - r * 0.55, cx + r * 0.55, cy + r * 0.55), fill=accents[0] + (255,))
+
+    def _draw_timeline(self, draw, width, height, accents, theme, rng) -> None:
+        vertical = height > width * 1.2
+        count = rng.randint(4, 6)
+        line_width = max(3, min(width, height) // 80)
+        if vertical:
+            x = width * 0.3
+            draw.line((x, height * 0.08, x, height * 0.92), fill=self._ink(theme), width=line_width)
+            stops = [(x, height * (0.12 + 0.76 * i / (count - 1))) for i in range(count)]
+        else:
+            y = height * 0.5
+            draw.line((width * 0.06, y, width * 0.94, y), fill=self._ink(theme), width=line_width)
+            stops = [(width * (0.1 + 0.8 * i / (count - 1)), y) for i in range(count)]
+        r = min(width, height) * 0.045
+        for i, (x, y) in enumerate(stops):
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=accents[i % len(accents)] + (255,),
+                         outline=self._ink(theme), width=line_width)
+            bar = r * rng.uniform(2.5, 4.5)
+            if vertical:
+                draw.rounded_rectangle((x + r * 1.8, y - r * 0.5, x + r * 1.8 + bar, y + r * 0.5), r * 0.4,
+                                       fill=self._ink(theme, 170))
+            else:
+                offset = -r * 3 if i % 2 else r * 1.8
+                draw.rounded_rectangle((x - r * 0.5, y + offset, x + r * 0.5, y + offset + r * 1.2), r * 0.3,
+                                       fill=self._ink(theme, 170))
+
+    def _draw_globe(self, draw, width, height, accents, theme, rng) -> None:
+        cx, cy = width / 2, height / 2
+        r = min(width, height) * 0.36
+        line_width = max(2, width // 180)
+        draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=accents[0] + (120,), outline=self._ink(theme), width=line_width)
+        for k in (0.35, 0.7):
+            draw.ellipse((cx - r * k, cy - r, cx + r * k, cy + r), outline=self._ink(theme, 200), width=line_width)
+        for k in (-0.5, 0, 0.5):
+            half = r * math.sqrt(1 - k * k)
+            draw.line((cx - half, cy + k * r, cx + half, cy + k * r), fill=self._ink(theme, 200), width=line_width)
+        orbit = r * 1.25
+        draw.arc((cx - orbit, cy - orbit * 0.45, cx + orbit, cy + orbit * 0.45), 200, 520,
+                 fill=accents[1 % len(accents)] + (255,), width=line_width * 2)
+
+    def _draw_stack(self, draw, width, height, accents, theme, rng) -> None:
+        count = rng.randint(3, 5)
+        layer_h = height * 0.6 / count
+        for i in range(count):
+            inset = width * (0.1 + 0.05 * i)
+            top = height * 0.78 - (i + 1) * layer_h
+            draw.rounded_rectangle((inset, top, width - inset, top + layer_h * 0.8), layer_h * 0.2,
+                                   fill=accents[i % len(accents)] + (230,), outline=self._ink(theme),
+                                   width=max(2, width // 250))
+
+
+_providers = {DALLE: DalleImageProvider(), LOCAL: LocalArtProvider()}
+
+
+def get_image_provider(name: Optional[str]) -> ImageProvider:
+    return _providers.get(name or DALLE, _providers[DALLE])
+
+
+def provider_for_plan(plan: Optional[str]) -> str:
+    """Provider name configured for ``plan`` (DALL·E unless IMAGE_PROVIDER_PLANS says otherwise)."""
+    mapping = dict(DEFAULT_PLAN_PROVIDERS)
+    for pair in os.getenv('IMAGE_PROVIDER_PLANS', '').split(','):
+        if ':' in pair:
+            plan_name, provider = (p.strip() for p in pair.split(':', 1))
+            if provider in _providers:
+                mapping[plan_name] = provider
+    return mapping.get(plan, DALLE)
+
+
+_theme_cache: Dict[str, Dict] = {}
+_theme_lock = threading.Lock()
+
+
+def template_theme(template_path: Optional[str]) -> Dict:
+    """Dark, light and accent colours from a template's theme part (cached per path)."""
+    if not template_path:
+        return DEFAULT_THEME
+    with _theme_lock:
+        cached = _theme_cache.get(template_path)
+    if cached is not None:
+        return cached
+    theme = DEFAULT_THEME
+    try:
+        with zipfile.ZipFile(template_path) as zf:
+            names = sorted(n for n in zf.namelist() if re.match(r'ppt/theme/theme\d+\.xml$', n))
+            scheme = ET.fromstring(zf.read(names[0])).find(f'.//{_A}clrScheme')
+            colors = {}
+            for child in scheme:
+                node = child.find(f'{_A}srgbClr')
+                value = node.get('val') if node is not None else None
+                if value is None:
+                    node = child.find(f'{_A}sysClr')
+                    value = node.get('lastClr') if node is not None else None
+                if value:
+                    colors[child.tag.replace(_A, '')] = tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+        accents = [colors[f'accent{i}'] for i in range(1, 7) if f'accent{i}' in colors]
+        if accents:
+            theme = {
+                'dark': colors.get('dk2') or colors.get('dk1') or DEFAULT_THEME['dark'],
+                'light': colors.get('lt1') or DEFAULT_THEME['light'],
+                'accents': accents,
+            }
+    except Exception as e:
+        logger.debug("Could not read theme colours from %s: %s", template_path, e)
+    with _theme_lock:
+        _theme_cache[template_path] = theme
+    return theme
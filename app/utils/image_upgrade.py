@@ -0,0 +1,100 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.utils.deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+
+# Time budget for adding images to one deck in the background
+IMAGE_UPGRADE_SECONDS = float(os.getenv('IMAGE_UPGRADE_SECONDS', 180))
+# Decks upgraded at once per worker process (each makes one image call per slide)
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('IMAGE_UPGRADE_WORKERS', 2)),
+                               thread_name_prefix='image-upgrade')
+
+
+def effective_status(log) -> str:
+    """``log.image_status``, reporting upgrades abandoned by a restarted worker as failed."""
+    if log.image_status == PENDING and log.created_at \
+            and datetime.utcnow() - log.created_at > timedelta(seconds=IMAGE_UPGRADE_SECONDS * 2):
+        return FAILED
+    return log.image_status
+
+
+def schedule_image_upgrade(app, log_id: int, presentation_title: str, slides_content: List[Dict], client,
+                           plan: str, image_provider: Optional[str] = None) -> None:
+    """Re-render log ``log_id``'s text-only deck with images in the background and swap it in."""
+    _executor.submit(_upgrade, app, log_id, presentation_title, slides_content, client, plan, image_provider)
+
+
+def _upgrade(app, log_id: int, presentation_title: str, slides_content: List[Dict], client, plan: str,
+             image_provider: Optional[str] = None) -> None:
+    from app import db
+    from app.deck_version import DeckVersion
+    from app.presentation_log import PresentationLog
+    from app.utils.ppt_generator import DEFAULT_TEMPLATE_STYLE, PPTGenerator
+
+    with app.app_context():
+        log = PresentationLog.query.get(log_id)
+        if log is None or not log.filename:
+            return
+        status = FAILED
+        generator = PPTGenerator(client=client, deadline=Deadline(IMAGE_UPGRADE_SECONDS))
+        generator.plan = plan
+        generator.image_provider = image_provider
+        stem, ext = os.path.splitext(log.filename)
+        try:
+            tmp_path = generator.render_presentation(
+                presentation_title=presentation_title,
+                presenter=log.presenter or '',
+                slides_content=slides_content,
+                template_style=log.template_style or DEFAULT_TEMPLATE_STYLE,
+                include_images=True,
+                filename=f"{stem}.images{ext}"
+            )
+            if generator.images_succeeded:
+                final_path = os.path.join(os.path.dirname(tmp_path), log.filename)
+                # Readers see either the complete text deck or the complete image deck
+                os.replace(tmp_path, final_path)
+                status = READY
+                try:
+                    DeckVersion.record(log, final_path, 'images added')
+                except Exception as e:
+                    logger.warning("Could not record deck version for presentation %s: %s", log.id, e)
+            else:
+                os.remove(tmp_path)
+        except Exception as e:
+            logger.warning("Image upgrade for presentation %s failed: %s", log_id, e)
+
+        if log.stats is not None:
+            log.stats.images_requested = generator.images_requested
+            log.stats.images_succeeded = generator.images_succeeded
+            log.stats.cost_usd = round((log.stats.cost_usd or 0.0) + generator.cost_usd, 6)
+        # Coalesced requests share this log's deck, so every log waiting on it is resolved
+        PresentationLog.query.filter(PresentationLog.id.in_(_coalesced_log_ids(log)),
+                                     PresentationLog.image_status == PENDING) \
+            .update({PresentationLog.image_status: status}, synchronize_session=False)
+        db.session.commit()
+        logger.info("Image upgrade for presentation %s: %s (%s/%s images)", log_id, status,
+                    generator.images_succeeded, generator.images_requested)
+
+
+def _coalesced_log_ids(log) -> List[int]:
+    """``log`` and the logs of requests coalesced onto its deck.
+
+    Progressive decks are saved as ``<title>_<log id>.pptx`` by the leading request, and followers
+    only ever receive that filename from its generation job, so logs created since ``log`` with
+    the same filename are exactly the ones sharing this upgrade.
+    """
+    from app.presentation_log import PresentationLog
+    rows = (PresentationLog.query
+            .with_entities(PresentationLog.id)
+            .filter(PresentationLog.filename == log.filename, PresentationLog.id >= log.id)
+            .all())
+    return [row[0] for row in rows]
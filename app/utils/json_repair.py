@@ -0,0 +1,220 @@
+import json
+import logging
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = ' \t\r\n'
+_CLOSERS = {'{': '}', '[': ']'}
+_LITERALS = {'true': 'true', 'false': 'false', 'null': 'null', 'True': 'true', 'False': 'false', 'None': 'null'}
+
+
+def strip_code_fences(text: str) -> str:
+    """Remove Markdown code fences (```json ... ```) wrapped around a completion."""
+    stripped = text.strip()
+    if stripped.startswith('```'):
+        newline = stripped.find('\n')
+        stripped = stripped[newline + 1:] if newline != -1 else stripped[3:]
+        fence = stripped.rfind('```')
+        if fence != -1:
+            stripped = stripped[:fence]
+    return stripped.strip()
+
+
+def _closes_string(text: str, pos: int) -> bool:
+    """Decide whether the quote at ``pos`` ends the current string or is a stray quote inside it.
+
+    A quote closes the string when what follows is structural: ``:``, ``}``, ``]``, end of
+    input, a comma that is itself followed by the start of another key/value, or whitespace and
+    then the start of another value (``"a" "b"``: a missing comma, inserted by the caller).
+    """
+    j = pos + 1
+    while j < len(text) and text[j] in _WHITESPACE:
+        j += 1
+    if j >= len(text) or text[j] in ':}]':
+        return True
+    if j > pos + 1 and text[j] in '"{[':
+        return True
+    if text[j] == ',':
+        j += 1
+        while j < len(text) and text[j] in _WHITESPACE:
+            j += 1
+        return j >= len(text) or text[j] in '"{[}]'
+    return False
+
+
+def repair_json(text: str, max_depth: Optional[int] = None) -> Any:
+    """Parse LLM output that is *almost* JSON.
+
+    Handles code fences, leading/trailing prose, trailing commas, missing commas between
+    values, unescaped quotes and raw newlines inside strings, Python literals
+    (``True``/``None``) and output truncated mid-structure. On truncation the text is rolled
+    back to the last complete value and every open container is closed. With ``max_depth``
+    only values completed at that nesting depth or shallower count as complete, so e.g.
+    ``max_depth=2`` on ``{"slides": [...]}`` keeps whole slide objects and drops a
+    half-written one.
+
+    Raises ``ValueError`` when nothing recoverable is found.
+    """
+    if text is None:
+        raise ValueError("empty completion")
+    try:
+        return json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+    text = strip_code_fences(text)
+    starts = [p for p in (text.find('{'), text.find('[')) if p != -1]
+    if not starts:
+        raise ValueError("no JSON object or array found")
+
+    out: List[str] = []
+    frames: List[dict] = []
+    checkpoints: List[tuple] = []
+    truncated = True
+
+    def checkpoint():
+        if max_depth is None or len(frames) <= max_depth:
+            checkpoints.append((len(out), [dict(f) for f in frames]))
+
+    def strip_trailing_comma():
+        while out and out[-1] in _WHITESPACE + ',':
+            out.pop()
+
+    def begin_value():
+        # Insert a comma the model forgot between two values
+        if frames and frames[-1]['after']:
+            out.append(',')
+            frames[-1]['after'] = False
+
+    def end_value():
+        if frames:
+            frame = frames[-1]
+            frame['after'] = True
+            if frame['type'] == '{':
+                frame['expect'] = 'key'
+            checkpoint()
+
+    i = min(starts)
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch in _WHITESPACE:
+            out.append(ch)
+            i += 1
+        elif ch in '{[':
+            begin_value()
+            out.append(ch)
+            frames.append({'type': ch, 'expect': 'key', 'after': False})
+            checkpoint()
+            i += 1
+        elif ch in '}]':
+            strip_trailing_comma()
+            frame = frames.pop()
+            if frame['type'] == '{' and frame['expect'] == 'value':
+                # Key without a value: drop the dangling "key":
+                out.append('null')
+            out.append(_CLOSERS[frame['type']])
+            i += 1
+            if not frames:
+                truncated = False
+                break
+            end_value()
+        elif ch == ',':
+            if frames and frames[-1]['after']:
+                out.append(',')
+                frames[-1]['after'] = False
+            i += 1
+        elif ch == ':':
+            if frames and frames[-1]['type'] == '{':
+                out.append(':')
+                frames[-1]['expect'] = 'value'
+                frames[-1]['after'] = False
+            i += 1
+        elif ch == '"':
+            is_key = bool(frames) and frames[-1]['type'] == '{' and frames[-1]['expect'] == 'key'
+            begin_value()
+            piece = ['"']
+            i += 1
+            closed = False
+            while i < n:
+                c = text[i]
+                if c == '\\':
+                    if i + 1 >= n:
+                        break
+                    piece.append(text[i:i + 2])
+                    i += 2
+                elif c == '"':
+                    if _closes_string(text, i):
+                        piece.append('"')
+                        i += 1
+                        closed = True
+                        break
+                    piece.append('\\"')
+                    i += 1
+                elif c == '\n':
+                    piece.append('\\n')
+                    i += 1
+                elif c in '\r\t':
+                    piece.append('\\t' if c == '\t' else '')
+                    i += 1
+                else:
+                    piece.append(c)
+                    i += 1
+            if not closed:
+                break
+            out.append(''.join(piece))
+            if is_key:
+                frames[-1]['after'] = False
+            else:
+                end_value()
+        else:
+            # Bare literal: number, true/false/null (or their Python spellings)
+            j = i
+            while j < n and text[j] not in _WHITESPACE + ',:}]"':
+                j += 1
+            if j >= n:
+                break  # literal cut off by truncation
+            token = text[i:j]
+            value = _LITERALS.get(token)
+            if value is None:
+                try:
+                    float(token)
+                    value = token
+                except ValueError:
+                    value = None
+            if value is not None and frames:
+                begin_value()
+                out.append(value)
+                end_value()
+            i = j
+
+    if truncated:
+        if not checkpoints:
+            raise ValueError("no complete JSON value before truncation")
+        length, frames = checkpoints[-1]
+        del out[length:]
+        strip_trailing_comma()
+        for frame in reversed(frames):
+            out.append(_CLOSERS[frame['type']])
+
+    return json.loads(''.join(out))
+
+
+def recover_slides(text: str) -> Optional[list]:
+    """Return the ``slides`` array from a (possibly malformed) slide-content completion.
+
+    Only slide objects that were completely written are kept. Returns None when no slides
+    array can be recovered.
+    """
+    try:
+        data = repair_json(text, max_depth=2)
+    except (ValueError, IndexError) as e:
+        logger.debug("JSON repair failed: %s", e)
+        return None
+    if isinstance(data, dict):
+        slides = data.get('slides')
+        return slides if isinstance(slides, list) else None
+    if isinstance(data, list):
+        return data
+    return None
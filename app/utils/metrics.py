@@ -0,0 +1,128 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+logger = logging.getLogger(__name__)
+
+# Generation stages range from sub-second renders to 60s+ content calls
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 45, 60, 90, 120)
+
+STAGE_SECONDS = Histogram(
+    'pptjet_stage_duration_seconds',
+    'Duration of presentation generation pipeline stages',
+    ['stage'],
+    buckets=STAGE_BUCKETS,
+)
+GENERATION_SECONDS = Histogram(
+    'pptjet_generation_duration_seconds',
+    'End-to-end duration of /generate requests',
+    ['outcome'],
+    buckets=STAGE_BUCKETS,
+)
+OPENAI_REQUESTS = Counter(
+    'pptjet_openai_requests_total',
+    'OpenAI API calls by endpoint, model and outcome',
+    ['endpoint', 'model', 'outcome'],
+)
+OPENAI_TOKENS = Counter(
+    'pptjet_openai_tokens_total',
+    'OpenAI tokens consumed',
+    ['model', 'kind'],
+)
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    'pptjet_openai_rate_limit_wait_seconds',
+    'Time OpenAI calls spent queued in the shared rate limiter',
+    ['bucket'],
+    buckets=(0.01, 0.1, 0.5, 1, 2, 5, 10, 20, 30, 60),
+)
+HEDGED_REQUESTS = Counter(
+    'pptjet_hedged_requests_total',
+    'Chat calls that outlived the p95 threshold, by which attempt won (or skipped: over budget/capacity)',
+    ['result'],
+)
+DEADLINE_SKIPS = Counter(
+    'pptjet_deadline_skips_total',
+    'Optional generation stages skipped because the request deadline was running out',
+    ['stage'],
+)
+IMAGES_GENERATED = Counter(
+    'pptjet_images_generated_total',
+    'Slide images by provider and outcome (ok, error, fallback)',
+    ['provider', 'outcome'],
+)
+CONTENT_CACHE_LOOKUPS = Counter(
+    'pptjet_content_cache_lookups_total',
+    'Slide content cache lookups by result (exact, near duplicate or miss)',
+    ['result'],
+)
+CONTENT_CACHE_SIMILARITY = Histogram(
+    'pptjet_content_cache_similarity',
+    'Prompt similarity of near-duplicate content cache hits',
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0),
+)
+COMPLETION_TRUNCATIONS = Counter(
+    'pptjet_completion_truncations_total',
+    'Chat completions cut off at max_tokens (finish_reason=length)',
+    ['model'],
+)
+JSON_REPAIRS = Counter(
+    'pptjet_json_repairs_total',
+    'Malformed slide completions run through the local JSON repair parser',
+    ['outcome'],
+)
+GENERATIONS_IN_FLIGHT = Gauge(
+    'pptjet_generations_in_flight',
+    'Presentation generations currently running',
+    multiprocess_mode='livesum',
+)
+
+
+def observe_stage(stage: str, seconds: float, sink: Optional[Dict[str, float]] = None) -> None:
+    """Record ``seconds`` spent in ``stage`` on the histogram and, if given, accumulate it into ``sink``."""
+    STAGE_SECONDS.labels(stage=stage).observe(seconds)
+    if sink is not None:
+        sink[stage] = sink.get(stage, 0.0) + seconds
+    logger.debug("Stage %s took %.3fs", stage, seconds)
+
+
+@contextmanager
+def timed(stage: str, sink: Optional[Dict[str, float]] = None):
+    """Time the enclosed block as ``stage`` (see ``observe_stage``)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start, sink)
+
+
+def record_openai_usage(model: str, usage) -> None:
+    """Count prompt/completion tokens from an OpenAI ``usage`` object (may be None)."""
+    if usage is None:
+        return
+    OPENAI_TOKENS.labels(model=model, kind='prompt').inc(getattr(usage, 'prompt_tokens', 0) or 0)
+    OPENAI_TOKENS.labels(model=model, kind='completion').inc(getattr(usage, 'completion_tokens', 0) or 0)
+
+
+def render_metrics():
+    """Return ``(body, content_type)`` for the Prometheus scrape endpoint.
+
+    Under gunicorn set ``PROMETHEUS_MULTIPROC_DIR`` so every worker's samples are aggregated.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
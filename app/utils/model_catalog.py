@@ -0,0 +1,33 @@
+# USD prices per 1K tokens (chat) or per image; override when OpenAI pricing changes
+MODEL_PRICES = {
+    'gpt-3.5-turbo': {'prompt': 0.0005, 'completion': 0.0015},
+    'gpt-3.5-turbo-1106': {'prompt': 0.001, 'completion': 0.002},
+    'gpt-4o-mini': {'prompt': 0.00015, 'completion': 0.0006},
+    'dall-e-3': {'image': 0.040},
+}
+
+# What each chat model accepts, so requests it is known to reject are never sent.
+# json_mode: supports response_format={"type": "json_object"}; max_output: completion token cap
+CHAT_MODEL_CAPABILITIES = {
+    'gpt-3.5-turbo': {'json_mode': False, 'context_window': 16385, 'max_output': 4096},
+    'gpt-3.5-turbo-1106': {'json_mode': True, 'context_window': 16385, 'max_output': 4096},
+    'gpt-4o-mini': {'json_mode': True, 'context_window': 128000, 'max_output': 16384},
+}
+
+
+def model_capabilities(model: str) -> dict:
+    """Capabilities of a chat model; unknown models are assumed to be plain 4K-output chat models."""
+    return CHAT_MODEL_CAPABILITIES.get(model, {'json_mode': False, 'context_window': 16385, 'max_output': 4096})
+
+
+def chat_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of a chat completion; unknown models cost 0."""
+    prices = MODEL_PRICES.get(model)
+    if not prices:
+        return 0.0
+    return (prompt_tokens * prices.get('prompt', 0) + completion_tokens * prices.get('completion', 0)) / 1000.0
+
+
+def image_cost(model: str, count: int = 1) -> float:
+    """Estimated USD cost of ``count`` generated images."""
+    return MODEL_PRICES.get(model, {}).get('image', 0.0) * count
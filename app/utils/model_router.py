@@ -0,0 +1,114 @@
+import os
+import json
+import math
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+
+from app.utils.model_catalog import model_capabilities
+
+logger = logging.getLogger(__name__)
+
+# Ordered rules; the first whose plans / slide range match gives the model preference list.
+# Override with MODEL_ROUTES (same JSON shape), e.g.
+# [{"plans": ["pro"], "min_slides": 12, "models": ["gpt-4o-mini", "gpt-3.5-turbo-1106"]}, {"models": [...]}]
+DEFAULT_ROUTES = [
+    {'models': ['gpt-3.5-turbo-1106', 'gpt-3.5-turbo']},
+]
+
+# Health thresholds over the recent window: above these a model is demoted behind healthy ones
+MAX_ERROR_RATE = float(os.getenv('MODEL_MAX_ERROR_RATE', 0.2))
+LATENCY_SLO_SECONDS = float(os.getenv('MODEL_LATENCY_SLO_SECONDS', 0)) or None
+STATS_WINDOW_SECONDS = float(os.getenv('MODEL_STATS_WINDOW_SECONDS', 300))
+MIN_SAMPLES = int(os.getenv('MODEL_STATS_MIN_SAMPLES', 5))
+
+
+def _load_routes() -> List[Dict]:
+    raw = os.getenv('MODEL_ROUTES')
+    if not raw:
+        return DEFAULT_ROUTES
+    try:
+        routes = json.loads(raw)
+        if isinstance(routes, list) and all(isinstance(r, dict) and r.get('models') for r in routes):
+            return routes
+    except json.JSONDecodeError:
+        pass
+    logger.warning("Ignoring invalid MODEL_ROUTES; using the default routing table")
+    return DEFAULT_ROUTES
+
+
+class ModelStats:
+    """Per-process rolling latency and error samples per chat model.
+
+    Samples older than ``window_seconds`` are ignored, so a demoted model that stops getting
+    traffic becomes eligible again once its bad samples age out.
+    """
+
+    def __init__(self, window_seconds: float = STATS_WINDOW_SECONDS, max_samples: int = 200):
+        self.window_seconds = window_seconds
+        self._samples = defaultdict(lambda: deque(maxlen=max_samples))
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self._samples[model].append((time.monotonic(), seconds, ok))
+
+    def summary(self, model: str) -> Optional[Dict[str, float]]:
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            recent = [(s, ok) for ts, s, ok in self._samples[model] if ts >= cutoff]
+        if len(recent) < MIN_SAMPLES:
+            return None
+        latencies = sorted(s for s, ok in recent if ok)
+        p95 = latencies[max(1, math.ceil(0.95 * len(latencies))) - 1] if latencies else None
+        return {
+            'samples': len(recent),
+            'error_rate': sum(1 for _, ok in recent if not ok) / len(recent),
+            'p95_seconds': p95,
+        }
+
+    def healthy(self, model: str) -> bool:
+        summary = self.summary(model)
+        if summary is None:
+            return True
+        if summary['error_rate'] > MAX_ERROR_RATE:
+            return False
+        if LATENCY_SLO_SECONDS and summary['p95_seconds'] and summary['p95_seconds'] > LATENCY_SLO_SECONDS:
+            return False
+        return True
+
+
+model_stats = ModelStats()
+_routes = _load_routes()
+
+
+def route_chat_models(plan: Optional[str], num_slides: Optional[int] = None, output_tokens: int = 0,
+                      prompt_tokens: int = 0) -> List[str]:
+    """Chat models to try for a JSON slide completion, best first.
+
+    The routing rule is chosen by ``plan`` and deck size; models that cannot fit the prompt plus
+    ``output_tokens`` are dropped, and models that are currently erroring or breaching the latency
+    SLO move behind healthy ones (kept only as a last resort).
+    """
+    models = DEFAULT_ROUTES[0]['models']
+    for rule in _routes:
+        if rule.get('plans') and plan not in rule['plans']:
+            continue
+        if num_slides is not None and num_slides < rule.get('min_slides', 0):
+            continue
+        if num_slides is not None and rule.get('max_slides') is not None and num_slides > rule['max_slides']:
+            continue
+        models = rule['models']
+        break
+
+    fitting = [m for m in models
+               if prompt_tokens + output_tokens <= model_capabilities(m)['context_window']]
+    # If nothing fits, let the largest-output candidate try (max_tokens is clamped to its cap)
+    candidates = fitting or sorted(models, key=lambda m: -model_capabilities(m)['max_output'])[:1]
+    healthy = [m for m in candidates if model_stats.healthy(m)]
+    ordered = healthy + [m for m in candidates if m not in healthy]
+    if ordered and ordered[0] != candidates[0]:
+        logger.info("Routing around unhealthy model %s; using %s", candidates[0], ordered[0])
+    return ordered
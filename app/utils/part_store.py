@@ -0,0 +1,101 @@
+import os
+import hashlib
+import logging
+import tempfile
+import zipfile
+from typing import Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Already-compressed media is stored as-is when assembling a deck; deflating it again only costs CPU
+_STORED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.mp4', '.m4a', '.wdp')
+
+
+class _StreamBuffer:
+    """Write-only file object that hands what was written back to a generator."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+class PartStore:
+    """Content-addressed storage of .pptx parts (one file per distinct part, named by its SHA-256).
+
+    A deck version is a manifest of ``[part name, hash]`` pairs in zip order; parts shared between
+    versions (layouts, masters, media, unchanged slides) are stored once.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data: bytes) -> Tuple[str, bool]:
+        """Store ``data``; return ``(hash, newly_written)``."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        # Concurrent writers of the same part produce identical bytes, so the last rename wins harmlessly
+        os.replace(tmp_path, path)
+        return digest, True
+
+    def get(self, digest: str) -> bytes:
+        with open(self.path(digest), 'rb') as fh:
+            return fh.read()
+
+    def snapshot(self, pptx_path: str) -> Tuple[List[List[str]], int]:
+        """Store every part of a .pptx; return its manifest and the bytes newly written."""
+        manifest = []
+        new_bytes = 0
+        with zipfile.ZipFile(pptx_path) as zf:
+            for info in zf.infolist():
+                data = zf.read(info)
+                digest, written = self.put(data)
+                if written:
+                    new_bytes += len(data)
+                manifest.append([info.filename, digest])
+        return manifest, new_bytes
+
+    def missing(self, manifest: List[List[str]]) -> List[str]:
+        return [name for name, digest in manifest if not os.path.exists(self.path(digest))]
+
+    def stream(self, manifest: List[List[str]]) -> Iterator[bytes]:
+        """Assemble the .pptx for ``manifest`` as a zip, yielding it part by part."""
+        buffer = _StreamBuffer()
+        # An unseekable output makes zipfile write data descriptors instead of seeking back
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            for name, digest in manifest:
+                compression = zipfile.ZIP_STORED if name.lower().endswith(_STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+                zf.writestr(name, self.get(digest), compress_type=compression)
+                yield buffer.drain()
+        yield buffer.drain()
+
+
+_store = None
+
+
+def get_part_store() -> PartStore:
+    """Process-wide store rooted at PART_STORE_DIR (default: generated/parts)."""
+    global _store
+    if _store is None:
+        root = os.getenv('PART_STORE_DIR') or os.path.abspath(
+            os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'generated', 'parts'))
+        _store = PartStore(root)
+    return _store
@@ -4,48 +4,135 @@ from pptx.enum.text import PP_ALIGN, MSO_ANCHOR, PP_PARAGRAPH_ALIGNMENT, MSO_AUT
 from pptx.dml.color import RGBColor
 from pptx.enum.dml import MSO_THEME_COLOR
 from pptx.enum.shapes import PP_PLACEHOLDER, MSO_SHAPE
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
 import os
 import json
+import time
+import logging
 from openai import OpenAI
-import requests
 import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from typing import List, Dict, Optional
+from app.utils.deadline import RENDER_RESERVE_SECONDS, Deadline, DeadlineExceeded
+from app.utils.hedging import get_hedger
+from app.utils.image_providers import DALLE, LOCAL, get_image_provider, provider_for_plan, template_theme
+from app.utils.json_repair import recover_slides, repair_json
+from app.utils.metrics import (
+    COMPLETION_TRUNCATIONS, IMAGES_GENERATED, JSON_REPAIRS, OPENAI_REQUESTS, observe_stage, record_openai_usage, timed,
+)
+from app.utils.model_catalog import chat_cost, model_capabilities
+from app.utils.model_router import model_stats, route_chat_models
+from app.utils.rate_limiter import (
+    CHAT_REQUESTS, CHAT_TOKENS, RateLimitTimeout, get_rate_limiter, retry_after_seconds,
+)
+from app.utils.token_budget import estimate_messages_tokens, finish_reason, token_budget
+
+logger = logging.getLogger(__name__)
+
+# Bullet style rules shared by the single-shot and outline-first content prompts
+BULLET_RULES = (
+    "Each bullet has the format \"Point - Elaboration\". The elaboration must directly explain or provide context "
+    "about the point, NOT instruct the audience. Avoid leading verbs like 'Explore', 'Discover', 'Learn how', "
+    "'Understand', etc. Max 20 words. DO NOT use the double quote character (\") inside bullet content; "
+    "use apostrophes (') instead if needed."
+)
+
+# Style used when a caller names none (the template /generate defaults to)
+DEFAULT_TEMPLATE_STYLE = "Professional"
+
+_template_cache: Dict[str, tuple] = {}
+_template_cache_lock = threading.Lock()
+
+
+def _template_bytes(path: str) -> bytes:
+    """Template file contents, read from disk once per process (re-read if the file changes)"""
+    mtime = os.path.getmtime(path)
+    cached = _template_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    with _template_cache_lock:
+        _template_cache[path] = (mtime, data)
+    return data
+
+
+def sanitize_filename(s: str, max_length: int = 50) -> str:
+    """Restrict ``s`` to alphanumerics and single underscores for use as a file name stem"""
+    # Replace any non-alphanumeric chars with underscore
+    safe = ''.join(c if c.isalnum() else '_' for c in s)
+    # Remove repeated underscores
+    while '__' in safe:
+        safe = safe.replace('__', '_')
+    # Trim to max length and remove trailing underscores
+    safe = safe[:max_length].rstrip('_')
+    return safe or 'presentation'  # Fallback if empty
 
 class PPTGenerator:
-    def __init__(self):
-        api_key = os.environ.get('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OpenAI API key not found in environment variables. Please set OPENAI_API_KEY in your .env file.")
-        
-        print(f"Debug - API Key loaded in PPTGenerator: {api_key[:10]}...")
-        
-        try:
-            self.client = OpenAI(api_key=api_key)
-            print("Debug - OpenAI client initialized successfully")
-            
-            # Test the API key with a simple completion request
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "system", "content": "Test message"}],
-                max_tokens=5
-            )
-            print("Debug - OpenAI API key verified successfully")
-            
-        except Exception as e:
-            print(f"Debug - Error with OpenAI setup: {str(e)}")
-            if 'Invalid API key' in str(e):
-                raise ValueError("Invalid OpenAI API key. Please check your .env file.")
-            elif 'Rate limit' in str(e):
-                raise ValueError("OpenAI API rate limit reached. Please try again later.")
-            else:
-                raise ValueError(f"OpenAI API error: {str(e)}")
+    # Decks at least this large are generated outline-first with parallel slide expansion
+    OUTLINE_MIN_SLIDES = int(os.getenv('OUTLINE_MIN_SLIDES', 12))
+    # Slides expanded per completion call, and how many expansion calls may run at once
+    OUTLINE_BATCH_SIZE = int(os.getenv('OUTLINE_BATCH_SIZE', 5))
+    OUTLINE_MAX_CONCURRENCY = int(os.getenv('OUTLINE_MAX_CONCURRENCY', 4))
+    # Times a 429 is waited out through the shared rate limiter before the error surfaces
+    RATE_LIMIT_RETRIES = int(os.getenv('OPENAI_RATE_LIMIT_RETRIES', 2))
+    # Client-wide timeouts; a request deadline tightens them further
+    OPENAI_TIMEOUT_SECONDS = float(os.getenv('OPENAI_TIMEOUT_SECONDS', 60))
+    IMAGE_DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv('IMAGE_DOWNLOAD_TIMEOUT_SECONDS', 30))
+    # Expected durations used to decide whether an optional stage still fits the deadline (images: per provider)
+    TITLE_EXPECTED_SECONDS = float(os.getenv('DEADLINE_TITLE_SECONDS', 3))
+    # Replace failed DALL·E images with a local illustration instead of leaving the slide without one
+    IMAGE_FALLBACK_LOCAL = os.getenv('IMAGE_FALLBACK_LOCAL', '1') == '1'
+    # Longest side of generated images in pixels (the picture area's aspect ratio is kept)
+    IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 1280))
+
+    def __init__(self, client=None, deadline: Optional[Deadline] = None, content_cache=None, offline: bool = False):
+        # Per-generation telemetry: seconds per pipeline stage and OpenAI token usage
+        self.stage_timings: Dict[str, float] = {}
+        self.usage = {'prompt_tokens': 0, 'completion_tokens': 0}
+        # Completion tokens of the slide-writing calls alone (no title or outline), for the token budget
+        self.slide_completion_tokens = 0
+        self.cost_usd = 0.0
+        self.model_used: Optional[str] = None
+        self.retry_count = 0
+        self.images_requested = 0
+        self.images_succeeded = 0
+        # Subscription plan of the requesting user; gates per-plan features such as request hedging
+        self.plan: Optional[str] = None
+        # Size of the deck being generated; model routing rules can depend on it
+        self.num_slides: Optional[int] = None
+        # Request-wide time budget; optional stages are skipped when it runs low
+        self.deadline = deadline
+        self.skipped_stages: List[str] = []
+        # Optional ContentCache: reuse prior generations for the same (or, if allowed, a similar) prompt
+        self.content_cache = content_cache
+        self.allow_exact_reuse = True
+        self.allow_near_duplicates = False
+        self.content_source = 'llm'
+        self.content_similarity: Optional[float] = None
+        self.content_entry = None
+        # Title rendered on the first slide by the last create_presentation call
+        self.presentation_title: Optional[str] = None
+        # Image provider name ('dalle' / 'local'); None picks the plan's provider
+        self.image_provider: Optional[str] = None
+        # Template of the deck being rendered; its theme colours tint local illustrations
+        self.template_path: Optional[str] = None
+        # Outline-first expansion calls _chat from worker threads
+        self._telemetry_lock = threading.Lock()
+
+        if client is not None:
+            # Injected client (e.g. a stub in benchmarks): skip the env lookup and key verification call
+            self.client = client
+        elif offline:
+            # Rendering stored content only (re-style): no OpenAI client and no key verification call
+            self.client = None
+        else:
+            self._init_client()
 
         # Define available template styles
         self.TEMPLATE_STYLES = {
-            "Aesthetic": "Aesthetic.pptx",
-
-
             "Vintage": "Vintage.pptx",
 
             "Creative": "Creative.pptx",
@@ -80,34 +167,190 @@ class PPTGenerator:
             }
         }
         
+    def _init_client(self) -> None:
+        """Create the OpenAI client from OPENAI_API_KEY and verify the key with a tiny completion"""
+        api_key = os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OpenAI API key not found in environment variables. Please set OPENAI_API_KEY in your .env file.")
+        
+        try:
+            with timed('init', self.stage_timings):
+                # OPENAI_BASE_URL points the pipeline at an OpenAI-compatible server (e.g. bench/openai_standin.py)
+                self.client = OpenAI(api_key=api_key, base_url=os.environ.get('OPENAI_BASE_URL') or None,
+                                     timeout=self.OPENAI_TIMEOUT_SECONDS)
+                logger.debug("OpenAI client initialized successfully")
+
+                # Test the API key with a simple completion request
+                response = self._chat(
+                    model="gpt-3.5-turbo",
+                    messages=[{"role": "system", "content": "Test message"}],
+                    max_tokens=5
+                )
+            logger.debug("OpenAI API key verified successfully")
+            
+        except Exception as e:
+            logger.error("Error with OpenAI setup: %s", e)
+            if 'Invalid API key' in str(e):
+                raise ValueError("Invalid OpenAI API key. Please check your .env file.")
+            elif 'Rate limit' in str(e):
+                raise ValueError("OpenAI API rate limit reached. Please try again later.")
+            else:
+                raise ValueError(f"OpenAI API error: {str(e)}")
+
+    def _chat(self, **kwargs):
+        """Call the chat completions API, recording outcome and token usage."""
+        model = kwargs.get('model', 'unknown')
+        limiter = get_rate_limiter()
+        # OpenAI charges max_tokens against TPM up front, so reserve prompt + max_tokens
+        reserved_tokens = estimate_messages_tokens(kwargs.get('messages', [])) + (kwargs.get('max_tokens') or 0)
+        attempt = 0
+        while True:
+            if limiter:
+                limiter.acquire({CHAT_REQUESTS: 1, CHAT_TOKENS: reserved_tokens},
+                                timeout=self.deadline.remaining() if self.deadline else None)
+            if self.deadline is not None:
+                # Leave time to build and save the deck after this call
+                kwargs['timeout'] = self.deadline.timeout(cap=self.OPENAI_TIMEOUT_SECONDS, reserve=RENDER_RESERVE_SECONDS)
+            call_start = time.perf_counter()
+            try:
+                response = self._send_chat(kwargs, limiter, reserved_tokens)
+                model_stats.record(model, time.perf_counter() - call_start, ok=True)
+                break
+            except Exception as e:
+                backoff = retry_after_seconds(e)
+                if backoff is None:
+                    OPENAI_REQUESTS.labels(endpoint='chat', model=model, outcome='error').inc()
+                    model_stats.record(model, time.perf_counter() - call_start, ok=False)
+                    raise
+                OPENAI_REQUESTS.labels(endpoint='chat', model=model, outcome='rate_limited').inc()
+                if not limiter or attempt >= self.RATE_LIMIT_RETRIES:
+                    raise
+                # Slow every worker down, then queue for capacity again
+                limiter.penalize(CHAT_REQUESTS, backoff)
+                attempt += 1
+        OPENAI_REQUESTS.labels(endpoint='chat', model=model, outcome='ok').inc()
+        if finish_reason(response) == 'length':
+            COMPLETION_TRUNCATIONS.labels(model=model).inc()
+            logger.info("Completion truncated at max_tokens=%s (model %s)", kwargs.get('max_tokens'), model)
+        usage = getattr(response, 'usage', None)
+        record_openai_usage(model, usage)
+        if usage is not None:
+            with self._telemetry_lock:
+                self.usage['prompt_tokens'] += usage.prompt_tokens or 0
+                self.usage['completion_tokens'] += usage.completion_tokens or 0
+                self.cost_usd += chat_cost(model, usage.prompt_tokens or 0, usage.completion_tokens or 0)
+        return response
+
+    def _send_chat(self, kwargs: Dict, limiter, reserved_tokens: int):
+        """Issue one chat completion, hedged against slow responses when enabled for this plan"""
+        hedger = get_hedger()
+        if kwargs.get('stream') or not hedger.applies_to(self.client, self.plan):
+            return self.client.chat.completions.create(**kwargs)
+
+        def reserve_hedge() -> bool:
+            # Only duplicate a request when the shared rate limiter has spare capacity right now
+            if not limiter:
+                return True
+            try:
+                limiter.acquire({CHAT_REQUESTS: 1, CHAT_TOKENS: reserved_tokens}, timeout=0)
+                return True
+            except RateLimitTimeout:
+                return False
+
+        # Latency depends mostly on output size, so thresholds are tracked per model and max_tokens band
+        key = f"{kwargs.get('model')}:{(kwargs.get('max_tokens') or 0) // 500}"
+        return hedger.call(lambda client: client.chat.completions.create(**kwargs),
+                           self.client, key, self.plan, reserve_hedge)
+
+    def _complete_json(self, messages: List[Dict], max_tokens: int, temperature: float = 0.7):
+        """Request a JSON completion from the routed model, falling through the route on errors"""
+        prompt_tokens = estimate_messages_tokens(messages)
+        candidates = route_chat_models(self.plan, self.num_slides, max_tokens, prompt_tokens)
+        for position, model in enumerate(candidates):
+            capabilities = model_capabilities(model)
+            kwargs = {
+                'model': model,
+                'messages': messages,
+                'temperature': temperature,
+                'max_tokens': min(max_tokens, capabilities['max_output']),
+            }
+            # Only ask for enforced JSON where the model supports it; the parser copes otherwise
+            if capabilities['json_mode']:
+                kwargs['response_format'] = {"type": "json_object"}
+            try:
+                response = self._chat(**kwargs)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if position == len(candidates) - 1:
+                    raise
+                logger.warning("Chat model %s failed (%s); trying %s", model, e, candidates[position + 1])
+                continue
+            self.model_used = model
+            return response
+
+    def _learn_token_budget(self, response, slides_parsed: int, slides_requested: int, max_tokens: int,
+                            prompt_tokens: int) -> None:
+        """Feed a slide response back into the shared token budget; truncated ones raise it"""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return
+        completion_tokens = usage.completion_tokens or 0
+        with self._telemetry_lock:
+            self.slide_completion_tokens += completion_tokens
+        reason = finish_reason(response)
+        if reason == 'stop':
+            token_budget.observe(completion_tokens, slides_parsed)
+        elif reason == 'length':
+            token_budget.observe_truncated(completion_tokens, slides_parsed, slides_requested, max_tokens, prompt_tokens)
+
     # Image generation helper
-    def _generate_image(self, prompt: str) -> str:
-        """Generate an image using DALL·E 3 and save it locally. Returns the file path or empty string on failure."""
+    def image_provider_name(self) -> str:
+        """Provider for this generation: the explicit ``image_provider``, else the plan's configured one"""
+        return self.image_provider or provider_for_plan(self.plan)
+
+    def _theme(self) -> Dict:
+        return template_theme(self.template_path)
+
+    def _generate_image(self, prompt: str, size: Optional[tuple] = None) -> str:
+        """Generate a ``size`` (pixels) image with the selected provider and save it locally.
+
+        DALL·E failures fall back to a local illustration. Returns the file path or empty string on failure.
+        """
+        self.images_requested += 1
+        provider = get_image_provider(self.image_provider_name())
+        if provider.name == DALLE and self.client is None:
+            provider = get_image_provider(LOCAL)
+        size = size or (1024, 1024)
         try:
-            print(f"Debug - Generating image for prompt: {prompt}")
-            response = self.client.images.generate(
-                model="dall-e-3",
-                prompt=prompt,
-                n=1,
-                size="1024x1024"
-            )
-            image_url = response.data[0].url
-            img_bytes = requests.get(image_url).content
-            images_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'generated', 'images'))
-            os.makedirs(images_dir, exist_ok=True)
-            file_path = os.path.join(images_dir, f"{uuid.uuid4().hex}.png")
-            with open(file_path, "wb") as f:
-                f.write(img_bytes)
-            return file_path
+            with timed('image', self.stage_timings):
+                logger.debug("Generating image (%s) for prompt: %s", provider.name, prompt)
+                try:
+                    img_bytes = provider.generate(self, prompt, size, self._theme())
+                    IMAGES_GENERATED.labels(provider=provider.name, outcome='ok').inc()
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    if provider.name == LOCAL or not self.IMAGE_FALLBACK_LOCAL:
+                        raise
+                    # DALL·E failed: a local illustration still beats an empty picture area
+                    logger.warning("DALL·E image failed (%s); using a local illustration", e)
+                    IMAGES_GENERATED.labels(provider=provider.name, outcome='fallback').inc()
+                    img_bytes = get_image_provider(LOCAL).generate(self, prompt, size, self._theme())
+                images_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'generated', 'images'))
+                os.makedirs(images_dir, exist_ok=True)
+                file_path = os.path.join(images_dir, f"{uuid.uuid4().hex}.png")
+                with open(file_path, "wb") as f:
+                    f.write(img_bytes)
+                self.images_succeeded += 1
+                return file_path
         except Exception as e:
-            print(f"Warning - Image generation failed: {str(e)}")
+            IMAGES_GENERATED.labels(provider=provider.name, outcome='error').inc()
+            logger.warning("Image generation failed: %s", e)
             return ""
 
         # Define available template styles
         self.TEMPLATE_STYLES = {
-            "Aesthetic": "Aesthetic.pptx",
-
-
             "Vintage": "Vintage.pptx",
 
             "Creative": "Creative.pptx",
@@ -142,13 +385,29 @@ class PPTGenerator:
             }
         }
 
-    def get_template_path(self, style: str) -> str:
-        """Get the path to the selected template style"""
-        filename = self.TEMPLATE_STYLES.get(style, "Aesthetic.pptx")  # Default to Professional if style not found
+    def _styles_dir(self) -> str:
         # Get absolute path to the project root directory
         project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-        template_path = os.path.join(project_root, "app", "static", "presentations", "custom_styles", filename)
-        print(f"Debug - Using template path: {template_path}")
+        return os.path.join(project_root, "app", "static", "presentations", "custom_styles")
+
+    def has_template(self, style: str) -> bool:
+        """Whether ``style`` names a template file that exists (get_template_path silently falls back otherwise)"""
+        filename = self.TEMPLATE_STYLES.get(style) or f"{style}.pptx"
+        return os.path.exists(os.path.join(self._styles_dir(), filename))
+
+    def get_template_path(self, style: str) -> str:
+        """Get the path to the selected template style"""
+        styles_dir = self._styles_dir()
+        filename = self.TEMPLATE_STYLES.get(style)
+        if filename is None:
+            # Any template file dropped into custom_styles is addressable by its name
+            if os.path.exists(os.path.join(styles_dir, f"{style}.pptx")):
+                filename = f"{style}.pptx"
+            else:
+                # Unknown style: fall back to the default template
+                filename = self.TEMPLATE_STYLES.get(DEFAULT_TEMPLATE_STYLE) or f"{DEFAULT_TEMPLATE_STYLE}.pptx"
+        template_path = os.path.join(styles_dir, filename)
+        logger.debug("Using template path: %s", template_path)
         return template_path
 
     def _remove_all_slides(self, prs: Presentation) -> None:
@@ -157,6 +416,9 @@ class PPTGenerator:
         slides = list(xml_slides)  # Create a list from iterator
         for slide_id in slides:
             xml_slides.remove(slide_id)
+            # Drop the relationship too, or the sample slide parts are still saved and collide
+            # with the new slides' part names (two ppt/slides/slide1.xml entries)
+            prs.part.drop_rel(slide_id.rId)
 
     def _apply_text_style(self, shape, style_type='body'):
         """Apply text style to a shape (only used if template styles are missing)"""
@@ -193,18 +455,18 @@ class PPTGenerator:
         # First priority: Look for layout named "Title Slide"
         for layout in prs.slide_layouts:
             if layout.name and "Title Slide" in layout.name:
-                print(f"Debug - Found Title Slide layout: {layout.name}")
+                logger.debug("Found Title Slide layout: %s", layout.name)
                 return layout
 
         # Second priority: Check common title slide names
         title_names = ["Title", "Cover", "Cover Page", "Opening"]
         for layout in prs.slide_layouts:
             if any(name.lower() in layout.name.lower() for name in title_names):
-                print(f"Debug - Found title layout by name: {layout.name}")
+                logger.debug("Found title layout by name: %s", layout.name)
                 return layout
 
         # Last resort: Use the first layout (usually the title layout)
-        print(f"Debug - Using first layout as title: {prs.slide_layouts[0].name}")
+        logger.debug("Using first layout as title: %s", prs.slide_layouts[0].name)
         return prs.slide_layouts[0]
 
     def _get_content_layout(self, prs: Presentation) -> any:
@@ -221,50 +483,50 @@ class PPTGenerator:
         # First priority: Look for "Title and Content" layout
         for layout in prs.slide_layouts:
             if layout != title_layout and layout.name and "Title and Content" in layout.name:
-                print(f"Debug - Found Title and Content layout: {layout.name}")
+                logger.debug("Found Title and Content layout: %s", layout.name)
                 return layout
 
         # Second priority: Look for any content-specific layout
         content_names = ["Content", "Text and Content", "Text", "Title and Text", "Section Header", "Two Content"]
         for layout in prs.slide_layouts:
             if layout != title_layout and any(name.lower() in layout.name.lower() for name in content_names):
-                print(f"Debug - Found content layout by name: {layout.name}")
+                logger.debug("Found content layout by name: %s", layout.name)
                 return layout
 
         # Last resort: Use any layout that's not the title layout
         for layout in prs.slide_layouts:
             if layout != title_layout:
-                print(f"Debug - Using alternate layout: {layout.name}")
+                logger.debug("Using alternate layout: %s", layout.name)
                 return layout
 
         # Absolute fallback: Use the second layout if available
         if len(prs.slide_layouts) > 1:
-            print(f"Debug - Using second layout: {prs.slide_layouts[1].name}")
+            logger.debug("Using second layout: %s", prs.slide_layouts[1].name)
             return prs.slide_layouts[1]
 
         # If all else fails, use any non-first layout
         for i, layout in enumerate(prs.slide_layouts):
             if i > 0:
-                print(f"Debug - Using layout {i}: {layout.name}")
+                logger.debug("Using layout %s: %s", i, layout.name)
                 return layout
 
-        print("Warning: Could not find distinct content layout")
+        logger.warning("Could not find distinct content layout")
         return prs.slide_layouts[0]
         # Content names are already defined above
         for name in layout_names:
             layout = self._get_layout_by_name(prs, name)
             if layout:
-                print(f"Debug - Found named content layout: {name}")
+                logger.debug("Found named content layout: %s", name)
                 return layout
         
         # Try to find any layout with at least a title placeholder
         for layout in prs.slide_layouts:
             if has_placeholder_type(layout, 1):  # Has title
-                print(f"Debug - Using layout with title: {layout.name}")
+                logger.debug("Using layout with title: %s", layout.name)
                 return layout
         
         # Final fallback to first layout
-        print(f"Debug - Using fallback first layout: {prs.slide_layouts[0].name}")
+        logger.debug("Using fallback first layout: %s", prs.slide_layouts[0].name)
         return prs.slide_layouts[0]
 
     def _add_title_slide(self, prs: Presentation, title: str, presenter: str):
@@ -347,14 +609,15 @@ class PPTGenerator:
                 # If anything goes wrong, skip deletion to avoid crashing
                 continue
 
-    def _add_content_slide(self, prs: Presentation, title: str, content: str):
-        """Add content slide"""
+    def _add_content_slide(self, prs: Presentation, title: str, content: str, slide_index: Optional[int] = None):
+        """Add content slide; ``slide_index`` is its 0-based deck position (default: where it is added)"""
         layout = self._get_content_layout(prs)
-        print(f"Debug - Using layout: {layout.name} for content slide")
+        logger.debug("Using layout: %s for content slide", layout.name)
         slide = prs.slides.add_slide(layout)
 
-        # Index of the slide (0-based)
-        slide_index = len(prs.slides) - 1
+        # Index of the slide (0-based); picks the bullet icon and column alignment
+        if slide_index is None:
+            slide_index = len(prs.slides) - 1
 
         # ------------------------------------------------------------------
         # Visual enhancement for text-only (free tier) slides: accent side bar
@@ -367,7 +630,7 @@ class PPTGenerator:
             bar.fill.fore_color.transparency = 0.15  # subtle
             bar.line.fill.background()
         except Exception as e:
-            print(f"Debug - Could not add sidebar: {e}")
+            logger.debug("Could not add sidebar: %s", e)
 
         # ------------------------------------------------------------------
         # Horizontal rule under title for visual separation
@@ -382,9 +645,10 @@ class PPTGenerator:
                 rule.fill.fore_color.transparency = 0.85
                 rule.line.fill.background()
             except Exception as e:
-                print(f"Debug - Could not add rule: {e}")
+                logger.debug("Could not add rule: %s", e)
 
-        print(f"Debug - Available placeholders in slide: {[f'{ph.placeholder_format.type}:{ph.placeholder_format.idx}' for ph in slide.placeholders]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Available placeholders in slide: %s", [f'{ph.placeholder_format.type}:{ph.placeholder_format.idx}' for ph in slide.placeholders])
         
         # Add title if title placeholder exists
         if slide.shapes.title:
@@ -392,9 +656,9 @@ class PPTGenerator:
         
         # Find content placeholder using multiple approaches
         content_placeholder = None
-        print("Debug - Searching for content placeholder...")
+        logger.debug("Searching for content placeholder...")
         for shape in slide.placeholders:
-            print(f"Debug - Checking placeholder: type={shape.placeholder_format.type}, idx={shape.placeholder_format.idx}")
+            logger.debug("Checking placeholder: type=%s, idx=%s", shape.placeholder_format.type, shape.placeholder_format.idx)
             # Skip the title placeholder entirely
             if shape == slide.shapes.title:
                 continue
@@ -406,7 +670,7 @@ class PPTGenerator:
 
             if is_body_placeholder or (is_common_content_idx and not is_body_placeholder) or is_empty_text_placeholder:
                 content_placeholder = shape
-                print(f"Debug - Found content placeholder: type={shape.placeholder_format.type}, idx={shape.placeholder_format.idx}")
+                logger.debug("Found content placeholder: type=%s, idx=%s", shape.placeholder_format.type, shape.placeholder_format.idx)
                 break
         
         # Add content if placeholder exists
@@ -521,7 +785,7 @@ class PPTGenerator:
                             slide.shapes._spTree.remove(textbox._element)
                     except Exception:
                         pass
-                print("Debug - Successfully added content to slide")
+                logger.debug("Successfully added content to slide")
 
                 # Aggressively remove ALL unused placeholders (empty text) except the ones we filled.
                 for shp in list(slide.shapes):
@@ -556,15 +820,22 @@ class PPTGenerator:
                     if empty:
                         slide.shapes._spTree.remove(shp._element)
             except Exception as e:
-                print(f"Debug - Error adding content to placeholder: {str(e)}")
+                logger.debug("Error adding content to placeholder: %s", e)
         else:
             error_msg = "No suitable content placeholder found in the selected template"
-            print(f"Debug - {error_msg}")
+            logger.debug("%s", error_msg)
             raise ValueError(error_msg)
 
 
     def generate_title(self, description: str) -> str:
         """Generate an intelligent, professional title from the user's description"""
+        if self.deadline is not None and not self.deadline.allows('title', self.TITLE_EXPECTED_SECONDS, reserve=RENDER_RESERVE_SECONDS):
+            self.skipped_stages.append('title')
+            return description
+        with timed('title', self.stage_timings):
+            return self._generate_title(description)
+
+    def _generate_title(self, description: str) -> str:
         try:
             system_prompt = """You are a professional presentation title generator. Your task is to create a polished, 
             engaging title from a given description. The title should be:
@@ -577,7 +848,7 @@ class PPTGenerator:
 
             user_prompt = f"Create a professional presentation title from this description: {description}"
 
-            response = self.client.chat.completions.create(
+            response = self._chat(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -588,15 +859,185 @@ class PPTGenerator:
             )
 
             title = response.choices[0].message.content.strip()
-            print(f"Debug - Generated title: {title}")
+            logger.debug("Generated title: %s", title)
             return title
 
         except Exception as e:
-            print(f"Warning: Could not generate title: {str(e)}. Using description as fallback.")
+            logger.warning("Could not generate title: %s. Using description as fallback.", e)
             return description
 
     def generate_slide_content(self, prompt: str, num_slides: int, retries: int = 1) -> List[Dict]:
-        """Generate slide content using GPT-3.5"""
+        """Generate slide content using GPT-3.5, or reuse a cached generation for the prompt"""
+        self.num_slides = num_slides
+        if self.content_cache is not None:
+            try:
+                hit = self.content_cache.lookup(prompt, num_slides, allow_near=self.allow_near_duplicates,
+                                                allow_exact=self.allow_exact_reuse)
+            except Exception as e:
+                logger.warning("Content cache lookup failed: %s", e)
+                hit = None
+            if hit is not None:
+                self.content_entry, self.content_similarity = hit
+                self.content_source = 'exact' if self.content_similarity >= 1.0 else 'near'
+                return self.content_entry.slides
+
+        slides = self._generate_content(prompt, num_slides, retries)
+        if self.content_cache is not None:
+            try:
+                self.content_entry = self.content_cache.store(prompt, num_slides, slides, self.model_used)
+            except Exception as e:
+                logger.warning("Could not store generated content: %s", e)
+        return slides
+
+    def _generate_content(self, prompt: str, num_slides: int, retries: int) -> List[Dict]:
+        with timed('content', self.stage_timings):
+            if num_slides >= self.OUTLINE_MIN_SLIDES:
+                try:
+                    return self._generate_outlined_content(prompt, num_slides)
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    logger.warning("Outline-first generation failed (%s); falling back to single request", e)
+            return self._generate_slide_content(prompt, num_slides, retries)
+
+    # ------------------------------------------------------------------
+    # Outline-first generation for large decks
+    # ------------------------------------------------------------------
+    def _generate_outlined_content(self, prompt: str, num_slides: int) -> List[Dict]:
+        """Generate a title outline with one cheap call, then expand slide batches in parallel.
+
+        Each expansion call only carries a handful of slides, so the per-call token cap no longer
+        limits deck size and wall time grows with the slowest batch rather than the slide count.
+        """
+        with timed('outline', self.stage_timings):
+            outline = self._generate_outline(prompt, num_slides)
+
+        batch_size = max(1, self.OUTLINE_BATCH_SIZE)
+        batches = [outline[i:i + batch_size] for i in range(0, len(outline), batch_size)]
+        workers = max(1, min(self.OUTLINE_MAX_CONCURRENCY, len(batches)))
+        logger.debug("Expanding %s outline titles in %s batches (%s workers)", len(outline), len(batches), workers)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='slide-expand') as pool:
+            expanded = list(pool.map(lambda batch: self._expand_outline_batch(prompt, outline, batch), batches))
+
+        # Merge in outline order; every outline title appears exactly once
+        slides = []
+        for batch in expanded:
+            slides.extend(batch)
+        return slides
+
+    def _generate_outline(self, prompt: str, num_slides: int) -> List[str]:
+        """Return exactly ``num_slides`` unique slide titles: Agenda first, Conclusion last"""
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are a presentation outline generator. Return a JSON object with exactly this structure:\n"
+                    "{\"titles\": [\"string\"]}"
+                    "\nThe FIRST title must be 'Agenda' and the LAST must be 'Conclusion'. All titles must be unique, "
+                    "concise (max 8 words) and follow a logical narrative. Do not include any other text."
+                )
+            },
+            {
+                "role": "user",
+                "content": f"Create exactly {num_slides} unique slide titles for a presentation about: {prompt}"
+            }
+        ]
+        titles: List[str] = []
+        seen = set()
+        for _ in range(2):
+            response = self._complete_json(messages, max_tokens=40 + num_slides * 20, temperature=0.5)
+            try:
+                data = repair_json(response.choices[0].message.content)
+            except ValueError:
+                data = {}
+            for title in data.get('titles', []) if isinstance(data, dict) else []:
+                key = str(title).strip().lower()
+                if key and key not in seen:
+                    seen.add(key)
+                    titles.append(str(title).strip())
+            if len(titles) >= num_slides:
+                break
+        if len(titles) < num_slides:
+            raise ValueError(f"outline returned {len(titles)} of {num_slides} titles")
+
+        titles = titles[:num_slides]
+        # Keep the Agenda/Conclusion bookends in place even if the model reordered them
+        conclusion = next((t for t in titles if t.lower() in ('conclusion', 'outro')), None)
+        if conclusion and titles[-1] != conclusion:
+            titles.remove(conclusion)
+            titles.append(conclusion)
+        agenda = next((t for t in titles if t.lower() == 'agenda'), None)
+        if agenda and titles[0] != agenda:
+            titles.remove(agenda)
+            titles.insert(0, agenda)
+        return titles
+
+    def _expand_outline_batch(self, prompt: str, outline: List[str], batch: List[str], retries: int = 1) -> List[Dict]:
+        """Write bullet content for ``batch`` (a slice of ``outline``), keyed back to the outline titles"""
+        numbered_outline = "\n".join(f"{i + 1}. {t}" for i, t in enumerate(outline))
+        requested = "\n".join(f"- {t}" for t in batch)
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are a presentation content generator. Generate a JSON object with exactly this structure:\n"
+                    "{\"slides\": [{\"title\": \"string\", \"content\": [\"string\"]}]}"
+                    "\nWrite slides ONLY for the requested titles, in the given order, copying each title exactly. "
+                    "'content' is an array of 6 strings. " + BULLET_RULES +
+                    "\nThe Agenda slide lists the main sections; the Conclusion slide summarizes key takeaways. "
+                    "Do not repeat material that belongs to other slides of the outline. "
+                    "Do NOT wrap the JSON in code fences or backticks. Return only the JSON."
+                )
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Presentation topic: {prompt}\n"
+                    f"Full outline for context:\n{numbered_outline}\n\n"
+                    f"Write exactly {len(batch)} slides for these titles:\n{requested}"
+                )
+            }
+        ]
+        prompt_tokens = estimate_messages_tokens(messages)
+        # Never below the fixed per-batch allowance batches were sized with before the budget was learned
+        max_tokens = token_budget.budget_for(len(batch), prompt_tokens, minimum=100 + len(batch) * 250)
+        response = self._complete_json(messages, max_tokens)
+        returned = recover_slides(response.choices[0].message.content) or []
+        self._learn_token_budget(response, len(returned), len(batch), max_tokens, prompt_tokens)
+
+        by_title = {}
+        for slide in returned:
+            if isinstance(slide, dict) and isinstance(slide.get('content'), list) and slide.get('title'):
+                by_title.setdefault(str(slide['title']).strip().lower(), slide)
+
+        slides = []
+        missing = []
+        for position, title in enumerate(batch):
+            slide = by_title.get(title.lower())
+            if slide is None and len(returned) == len(batch) and isinstance(returned[position], dict) \
+                    and isinstance(returned[position].get('content'), list):
+                # Model rephrased the title but kept the order: trust the position
+                slide = returned[position]
+            if slide is None:
+                missing.append(title)
+                continue
+            slides.append({
+                "title": title,
+                "content": "\n".join(str(point).strip() for point in slide['content'])
+            })
+
+        if missing:
+            if retries <= 0:
+                raise ValueError(f"expansion missing slides: {', '.join(missing)}")
+            with self._telemetry_lock:
+                self.retry_count += 1
+            recovered = {s['title']: s for s in self._expand_outline_batch(prompt, outline, missing, retries - 1)}
+            merged = {s['title']: s for s in slides}
+            merged.update(recovered)
+            slides = [merged[title] for title in batch]
+        return slides
+
+    def _generate_slide_content(self, prompt: str, num_slides: int, retries: int) -> List[Dict]:
         try:
             messages = [
                 {
@@ -626,249 +1067,408 @@ class PPTGenerator:
                 )
                 }
             ]
-            
-            # Dynamically allocate token budget: ~150 tokens per slide capped to 3500
-            max_token_budget = min(3500, num_slides * 150)
-            try:
-                # Prefer a model version that supports enforced JSON responses
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo-1106",
-                    messages=messages,
-                    temperature=0.7,
-                    max_tokens=max_token_budget,
-                    response_format={"type": "json_object"}
-                )
-            except Exception:
-                # Fallback to classic model without enforced response format
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=messages,
-                    temperature=0.7,
-                    max_tokens=max_token_budget
-                )
-        
-            # Extract and parse the response
-            response_text = response.choices[0].message.content
-            print(f"Debug - OpenAI Response: {response_text}")
-            response_data = json.loads(response_text)
-            
-            if not isinstance(response_data, dict) or 'slides' not in response_data:
-                raise ValueError("Invalid response format from GPT. Expected object with 'slides' array.")
-            
-            slides_data = response_data['slides']
-            print(f"Debug - Number of slides in response: {len(slides_data)}")
-            
-            if not isinstance(slides_data, list):
-                raise ValueError("Invalid 'slides' format. Expected array.")
-            
-            # Ensure we have the right number of slides and format the content
-            if len(slides_data) < num_slides:
-                # Not enough slides – allow retry if available
-                raise ValueError("INSUFFICIENT_SLIDES")
-
-            slides = []
-            seen_titles = set()
 
-            for slide in slides_data:
-                if not isinstance(slide, dict) or 'title' not in slide or 'content' not in slide:
-                    raise ValueError("Invalid slide format. Expected object with 'title' and 'content'.")
-                
-                if not isinstance(slide['content'], list):
-                    raise ValueError("Invalid content format. Expected array of strings.")
-                
-                if slide['title'] in seen_titles:
-                    continue  # Skip duplicate titles
-                
-                seen_titles.add(slide['title'])
-                
-                # Join content without bullet points - PowerPoint will add them automatically
-                formatted_content = "\n".join(point.strip() for point in slide['content'])
-                slides.append({
-                    "title": slide['title'],
-                    "content": formatted_content
-                })
-                print(f"Debug - Added slide: {slide['title']}")
-                
-                if len(slides) == num_slides:
-                    break
-
-            if len(slides) < num_slides:
-                raise ValueError("INSUFFICIENT_SLIDES_PARSED")
-                
-            return slides
+            slides: List[Dict] = []
+            attempts_left = retries
+            while True:
+                if not slides:
+                    # Nothing usable yet: ask for the whole deck
+                    # Size max_tokens from observed completion tokens per slide
+                    prompt_tokens = estimate_messages_tokens(messages)
+                    max_token_budget = token_budget.budget_for(num_slides, prompt_tokens)
+                    response = self._complete_json(messages, max_token_budget)
+                    slides = self._parse_slides(response.choices[0].message.content, num_slides)
+                    self._learn_token_budget(response, len(slides), num_slides, max_token_budget, prompt_tokens)
+                else:
+                    # Keep what we have and only ask for the slides that are still missing
+                    slides = self._fill_missing_slides(prompt, slides, num_slides)
+                logger.debug("Parsed %s of %s slides", len(slides), num_slides)
+
+                if len(slides) >= num_slides:
+                    return slides[:num_slides]
+                if attempts_left <= 0:
+                    raise ValueError("INSUFFICIENT_SLIDES")
+                attempts_left -= 1
+                with self._telemetry_lock:
+                    self.retry_count += 1
+                logger.debug("Retry for %s missing slides. Attempts remaining: %s", num_slides - len(slides), attempts_left)
+        except DeadlineExceeded:
+            raise
         except ValueError as e:
-            # If error indicates insufficient slides and we have retries left, retry once
-            if str(e) in ["INSUFFICIENT_SLIDES", "INSUFFICIENT_SLIDES_PARSED"] and retries > 0:
-                print("Debug - Retry due to insufficient slides. Attempts remaining:", retries)
-                return self.generate_slide_content(prompt, num_slides, retries - 1)
             # Convert to user-friendly message
-            if str(e) in ["INSUFFICIENT_SLIDES", "INSUFFICIENT_SLIDES_PARSED"]:
+            if str(e) == "INSUFFICIENT_SLIDES":
                 raise Exception("The AI couldn’t generate all slides, please try again or request fewer.")
             raise Exception(f"Error in response format: {str(e)}")
-        except json.JSONDecodeError as e:
-            # Attempt to extract JSON fragment and retry parsing once
+        except Exception as e:
+            raise Exception(f"Error generating content: {str(e)}")
+
+    def _parse_slides(self, response_text: str, limit: int, exclude: Optional[set] = None) -> List[Dict]:
+        """Extract up to ``limit`` well-formed, uniquely titled slides from a completion.
+
+        Malformed slides are skipped rather than failing the whole response, so callers can keep
+        the valid ones and request only what is missing. Titles in ``exclude`` (lower-cased) are
+        treated as duplicates. Unparseable output yields an empty list.
+        """
+        logger.debug("OpenAI Response: %s", response_text)
+        try:
+            response_data = json.loads(response_text)
+            slides_data = response_data.get('slides') if isinstance(response_data, dict) else None
+        except (json.JSONDecodeError, TypeError):
+            # Repair fences, stray quotes, trailing commas and truncation locally instead of re-calling the API
+            slides_data = recover_slides(response_text)
+            JSON_REPAIRS.labels(outcome='recovered' if slides_data else 'failed').inc()
+            logger.debug("Repaired malformed completion: %s slide objects recovered", len(slides_data or []))
+        if not isinstance(slides_data, list):
+            return []
+
+        seen_titles = set(exclude or ())
+        slides = []
+        for slide in slides_data:
+            if not isinstance(slide, dict) or not slide.get('title') or not isinstance(slide.get('content'), list):
+                continue
+            title = str(slide['title']).strip()
+            if title.lower() in seen_titles:
+                continue  # Skip duplicate titles
+            seen_titles.add(title.lower())
+
+            # Join content without bullet points - PowerPoint will add them automatically
+            formatted_content = "\n".join(str(point).strip() for point in slide['content'])
+            slides.append({
+                "title": title,
+                "content": formatted_content
+            })
+            if len(slides) == limit:
+                break
+        return slides
+
+    def _fill_missing_slides(self, prompt: str, slides: List[Dict], num_slides: int) -> List[Dict]:
+        """Request only the slides missing from ``slides`` and merge them in before the closing slide"""
+        missing = num_slides - len(slides)
+        has_conclusion = slides[-1]['title'].strip().lower() in ('conclusion', 'outro')
+        existing_titles = "\n".join(f"- {s['title']}" for s in slides)
+        closing_rule = (
+            "None of them may be an Agenda or Conclusion slide."
+            if has_conclusion else
+            "The LAST of them must be a 'Conclusion' slide summarizing key takeaways."
+        )
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are a presentation content generator. Generate a JSON object with exactly this structure:\n"
+                    "{\"slides\": [{\"title\": \"string\", \"content\": [\"string\"]}]}"
+                    "\n'content' is an array of 6 strings. " + BULLET_RULES +
+                    "\nDo NOT wrap the JSON in code fences or backticks. Return only the JSON."
+                )
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"A presentation about: {prompt} already has these slides:\n{existing_titles}\n\n"
+                    f"Create exactly {missing} additional unique slides that cover topics not yet covered. "
+                    f"Do not reuse any of the titles above. {closing_rule}"
+                )
+            }
+        ]
+        prompt_tokens = estimate_messages_tokens(messages)
+        max_tokens = token_budget.budget_for(missing, prompt_tokens)
+        response = self._complete_json(messages, max_tokens)
+        exclude = {s['title'].lower() for s in slides} | {'agenda'}
+        if has_conclusion:
+            exclude |= {'conclusion', 'outro'}
+        new_slides = self._parse_slides(response.choices[0].message.content, missing, exclude)
+        self._learn_token_budget(response, len(new_slides), missing, max_tokens, prompt_tokens)
+        logger.debug("Recovered %s of %s missing slides", len(new_slides), missing)
+
+        if has_conclusion:
+            return slides[:-1] + new_slides + slides[-1:]
+        return slides + new_slides
+
+    def regenerate_slide(self, prompt: str, slides: List[Dict], index: int, instructions: Optional[str] = None,
+                         retries: int = 1) -> Dict:
+        """Rewrite ``slides[index]`` with one small completion, using the other titles as context"""
+        self.num_slides = 1
+        current = slides[index]
+        numbered_outline = "\n".join(f"{i + 1}. {s['title']}" for i, s in enumerate(slides))
+        other_titles = {s['title'].strip().lower() for i, s in enumerate(slides) if i != index}
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are a presentation content generator. Generate a JSON object with exactly this structure:\n"
+                    "{\"slides\": [{\"title\": \"string\", \"content\": [\"string\"]}]}"
+                    "\nRewrite ONLY the requested slide as a single slide. Keep its title unless the instructions "
+                    "ask for a new one, and never reuse another slide's title. "
+                    "'content' is an array of 6 strings. " + BULLET_RULES +
+                    "\nDo not repeat material that belongs to other slides of the outline. "
+                    "Do NOT wrap the JSON in code fences or backticks. Return only the JSON."
+                )
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Presentation topic: {prompt}\n"
+                    f"Full outline for context:\n{numbered_outline}\n\n"
+                    f"Current slide {index + 1} to improve:\nTitle: {current['title']}\n{current['content']}"
+                    + (f"\n\nInstructions: {instructions}" if instructions else "")
+                )
+            }
+        ]
+        with timed('content', self.stage_timings):
+            response = self._complete_json(messages, token_budget.budget_for(1, estimate_messages_tokens(messages)))
+        regenerated = self._parse_slides(response.choices[0].message.content, 1, exclude=other_titles)
+        if regenerated:
+            return regenerated[0]
+        if retries <= 0:
+            raise ValueError("The AI did not return a usable slide")
+        self.retry_count += 1
+        return self.regenerate_slide(prompt, slides, index, instructions, retries - 1)
+
+    def render_slide_parts(self, slide_content: Dict, template_style: str, slide_index: int,
+                           include_image: bool = False):
+        """Render one content slide, styled as 0-based deck position ``slide_index``, into ``template_style``.
+
+        Returns ``(slide XML, rels XML, media)``, where ``media`` maps the part names of the pictures the
+        slide shows to their bytes (empty unless ``include_image`` and an image could be generated).
+        """
+        prs = self._load_template(template_style)
+        with timed('render', self.stage_timings):
+            self._add_content_slide(prs, slide_content['title'], slide_content['content'], slide_index)
+        slide = prs.slides[0]
+        if include_image and self.deadline is not None and not self.deadline.allows(
+                'image', self._expected_image_seconds(), reserve=RENDER_RESERVE_SECONDS):
+            self.skipped_stages.append('images')
+            include_image = False
+        if include_image:
             try:
-                start = response_text.find('{')
-                end = response_text.rfind('}')
-                if start != -1 and end != -1 and end > start:
-                    cleaned = response_text[start:end+1]
-                    response_data = json.loads(cleaned)
-                    slides_data = response_data.get('slides', [])
-                    print("Debug - Recovered JSON after cleanup")
-                    # proceed as usual below by reusing parsed slides_data
-                    if not isinstance(slides_data, list):
-                        raise ValueError("Invalid 'slides' format. Expected array.")
-                    # rest of loop duplicated but simplified
-                    slides = []
-                    seen_titles = set()
-                    for slide in slides_data:
-                        if not isinstance(slide, dict) or 'title' not in slide or 'content' not in slide:
-                            continue
-                        if not isinstance(slide['content'], list):
-                            continue
-                        if slide['title'] in seen_titles:
-                            continue
-                        seen_titles.add(slide['title'])
-                        formatted_content = "\n".join(point.strip() for point in slide['content'])
-                        slides.append({"title": slide['title'], "content": formatted_content})
-                        if len(slides) == num_slides:
-                            break
-                    if len(slides) == num_slides:
-                        return slides
+                img_path = self._generate_image(f"{slide_content['title']} illustrative image",
+                                                self._picture_size(prs, slide))
+                if img_path:
+                    self._add_image_to_slide(prs, slide, img_path)
+            except Exception as e:
+                logger.warning("Could not add image to slide: %s", e)
+        # Serialize straight from the slide part rather than re-reading a saved package
+        part = slide.part
+        media = {rel.target_part.partname.lstrip('/'): rel.target_part.blob
+                 for rel in part.rels if not rel.is_external and rel.reltype == RT.IMAGE}
+        return part.blob, part.rels.xml, media
+
+    def _load_template(self, template_style: str) -> Presentation:
+        """Open ``template_style`` with its sample slides removed"""
+        template_path = self.get_template_path(template_style)
+        if not os.path.exists(template_path):
+            raise ValueError(f"Template file not found: {template_path}")
+        self.template_path = template_path
+        with timed('template_load', self.stage_timings):
+            try:
+                prs = Presentation(BytesIO(_template_bytes(template_path)))
+                # Remove any existing slides while preserving the template
+                self._remove_all_slides(prs)
+            except Exception as e:
+                logger.warning("Could not load template %s. Using blank presentation. Error: %s", template_path, e)
+                prs = Presentation()
+        return prs
+
+    def _add_image_to_slide(self, prs: Presentation, slide, img_path: str) -> None:
+        """Place an image on a content slide, preferring a picture placeholder and shrinking text to make room"""
+        # Try to insert into a dedicated picture placeholder if present
+        pic_placeholder = None
+        for shp in slide.placeholders:
+            try:
+                if shp.placeholder_format.type == PP_PLACEHOLDER.PICTURE:
+                    pic_placeholder = shp
+                    break
             except Exception:
                 pass
-            # fallback retry if enabled
-            if retries > 0:
-                print(f"Debug - JSON parsing failed ({e}). Retrying... Attempts remaining: {retries}")
-                return self.generate_slide_content(prompt, num_slides, retries - 1)
-            raise Exception(f"Error parsing GPT response: {str(e)}")
-            if retries > 0:
-                print(f"Debug - JSON parsing failed ({e}). Retrying... Attempts remaining: {retries}")
-                return self.generate_slide_content(prompt, num_slides, retries - 1)
-            raise Exception(f"Error parsing GPT response: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Error generating content: {str(e)}")
+
+        # Insert the image and capture the resulting shape reference
+        if pic_placeholder:
+            pic_shape = pic_placeholder.insert_picture(img_path)
+        else:
+            # Fallback: place on right half, respecting slide margins
+            pic_width = Inches(4)
+            left = prs.slide_width - pic_width - Inches(0.5)
+            top = Inches(1.0)  # start a bit higher to leave more space for bottom border
+            pic_shape = slide.shapes.add_picture(img_path, left, top, width=pic_width)
+
+        # ------------------------------------------------------------------
+        # Post-adjustment: ensure the image does NOT overlap the bottom line
+        # ------------------------------------------------------------------
+        bottom_margin = Inches(0.5)
+        max_height = prs.slide_height - bottom_margin - pic_shape.top
+        if pic_shape.height > max_height:
+            ratio = max_height / pic_shape.height
+            pic_shape.height = int(pic_shape.height * ratio)
+            pic_shape.width = int(pic_shape.width * ratio)
+
+        # Recalculate left bound / width after possible resize
+        left = pic_shape.left
+        pic_width = pic_shape.width
+
+        # Reduce width of text-containing shapes to avoid overlap
+        available_width = left - Inches(0.3)
+        for shp in slide.shapes:
+            # Skip pictures
+            if shp.shape_type == 13:  # MSO_SHAPE_TYPE.PICTURE
+                continue
+            if hasattr(shp, "text_frame") and shp.text_frame is not None:
+                # Adjust width if current right edge goes beyond image left OR if placeholder is very narrow
+                # Determine available horizontal space for this shape
+                max_width_allowed = available_width - shp.left
+                min_width_needed = Inches(4)
+
+                if max_width_allowed <= Inches(1):
+                    continue  # No space to change
+
+                # If shape is wider than allowed, shrink; if narrower than reasonable, grow (if space)
+                if shp.left + shp.width > available_width:
+                    # shrink to fit but not below min reasonable width
+                    shp.width = max(min_width_needed, max_width_allowed)
+                elif shp.width < min_width_needed and max_width_allowed >= min_width_needed:
+                    # expand to a comfortable width
+                    shp.width = min_width_needed
+        logger.debug("Image added to slide")
+
+    def _expected_image_seconds(self) -> float:
+        """Average image time so far in this generation, or the provider's estimate before the first one"""
+        if self.images_requested:
+            return self.stage_timings.get('image', 0.0) / self.images_requested
+        return get_image_provider(self.image_provider_name()).expected_seconds
+
+    def _picture_size(self, prs: Presentation, slide) -> tuple:
+        """Pixel size matching where _add_image_to_slide will place the picture on ``slide``"""
+        width = height = None
+        for shp in slide.placeholders:
+            try:
+                if shp.placeholder_format.type == PP_PLACEHOLDER.PICTURE:
+                    width, height = shp.width, shp.height
+                    break
+            except Exception:
+                pass
+        if not width or not height:
+            # Same box as the fallback placement: 4" wide on the right, from 1" down to the bottom margin
+            width, height = Inches(4), prs.slide_height - Inches(1.5)
+        scale = self.IMAGE_MAX_PIXELS / max(width, height)
+        return max(64, int(width * scale)), max(64, int(height * scale))
 
     def create_presentation(self,
                     title: str,
                     presenter: str,
                     slides_content: List[Dict],
-                    template_style: str = "Aesthetic",
+                    template_style: str = DEFAULT_TEMPLATE_STYLE,
                     include_images: bool = False) -> str:
         """Create PowerPoint presentation using a selected template style"""
-        # Generate an intelligent title from the input description
-        presentation_title = self.generate_title(title)
-        # Load template
-        template_path = self.get_template_path(template_style)
-        if not os.path.exists(template_path):
-            raise ValueError(f"Template file not found: {template_path}")
-        try:
-            prs = Presentation(template_path)
-            # Remove any existing slides while preserving the template
-            self._remove_all_slides(prs)
-        except Exception as e:
-            print(f"Warning: Could not load template {template_path}. Using blank presentation. Error: {str(e)}")
-            prs = Presentation()
+        # Generate an intelligent title from the input description (cached content already has one)
+        if self.content_entry is not None and self.content_entry.presentation_title and self.content_source != 'llm':
+            presentation_title = self.content_entry.presentation_title
+        else:
+            presentation_title = self.generate_title(title)
+            if self.content_cache is not None and 'title' not in self.skipped_stages:
+                try:
+                    self.content_cache.set_title(self.content_entry, presentation_title)
+                except Exception as e:
+                    logger.warning("Could not store presentation title: %s", e)
+        self.presentation_title = presentation_title
+        return self.render_presentation(presentation_title, presenter, slides_content, template_style,
+                                        include_images, filename=f"{sanitize_filename(title)}.pptx")
+
+    def render_presentation(self,
+                            presentation_title: str,
+                            presenter: str,
+                            slides_content: List[Dict],
+                            template_style: str = DEFAULT_TEMPLATE_STYLE,
+                            include_images: bool = False,
+                            filename: Optional[str] = None) -> str:
+        """Render already generated content into a template and save it; makes no LLM calls except for images"""
+        prs = self._build_presentation(presentation_title, presenter, slides_content, template_style, include_images)
+
+        # Get the absolute path to the generated directory
+        generated_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'generated'))
+        
+        # Ensure output directory exists
+        os.makedirs(generated_dir, exist_ok=True)
+
+        filename = filename or f"{sanitize_filename(presentation_title)}.pptx"
+        output_path = os.path.join(generated_dir, filename)
+
+        with timed('save', self.stage_timings):
+            prs.save(output_path)
+        return output_path
+
+    def render_to_bytes(self, presentation_title: str, presenter: str, slides_content: List[Dict],
+                        template_style: str = DEFAULT_TEMPLATE_STYLE) -> bytes:
+        """Render content into a template in memory (no images, nothing written to disk)"""
+        prs = self._build_presentation(presentation_title, presenter, slides_content, template_style)
+        buffer = BytesIO()
+        with timed('save', self.stage_timings):
+            prs.save(buffer)
+        return buffer.getvalue()
+
+    def _build_presentation(self, presentation_title: str, presenter: str, slides_content: List[Dict],
+                            template_style: str, include_images: bool = False) -> Presentation:
+        prs = self._load_template(template_style)
 
         # Add slides
-        print(f"Debug - Adding title slide with generated title: {presentation_title}")
+        images_before = self.stage_timings.get('image', 0.0)
+        render_start = time.perf_counter()
+        logger.debug("Adding title slide with generated title: %s", presentation_title)
         self._add_title_slide(prs, presentation_title, presenter)
         
-        print(f"Debug - Number of content slides to add: {len(slides_content)}")
+        logger.debug("Number of content slides to add: %s", len(slides_content))
         for slide_content in slides_content:
             # Add content slide first
-            print(f"Debug - Adding content slide: {slide_content['title']}")
+            logger.debug("Adding content slide: %s", slide_content['title'])
             self._add_content_slide(prs, slide_content['title'], slide_content['content'])
 
-            # Optionally add an image generated by DALL·E 3
+            # Optionally add an image generated by DALL·E 3, as long as one more still fits the deadline
+            if include_images and self.deadline is not None and not self.deadline.allows(
+                    'image', self._expected_image_seconds(), reserve=RENDER_RESERVE_SECONDS):
+                self.skipped_stages.append('images')
+                include_images = False
             if include_images:
                 try:
                     img_prompt = f"{slide_content['title']} illustrative image"
-                    img_path = self._generate_image(img_prompt)
+                    img_path = self._generate_image(img_prompt, self._picture_size(prs, prs.slides[-1]))
                     if img_path:
                         # Add the picture roughly on the right half of the slide
-                        slide = prs.slides[-1]
-                        # Try to insert into a dedicated picture placeholder if present
-                        pic_placeholder = None
-                        for shp in slide.placeholders:
-                            try:
-                                if shp.placeholder_format.type == PP_PLACEHOLDER.PICTURE:
-                                    pic_placeholder = shp
-                                    break
-                            except Exception:
-                                pass
-
-                        # Insert the image and capture the resulting shape reference
-                        if pic_placeholder:
-                            pic_shape = pic_placeholder.insert_picture(img_path)
-                        else:
-                            # Fallback: place on right half, respecting slide margins
-                            pic_width = Inches(4)
-                            left = prs.slide_width - pic_width - Inches(0.5)
-                            top = Inches(1.0)  # start a bit higher to leave more space for bottom border
-                            pic_shape = slide.shapes.add_picture(img_path, left, top, width=pic_width)
-
-                        # ------------------------------------------------------------------
-                        # Post-adjustment: ensure the image does NOT overlap the bottom line
-                        # ------------------------------------------------------------------
-                        bottom_margin = Inches(0.5)
-                        max_height = prs.slide_height - bottom_margin - pic_shape.top
-                        if pic_shape.height > max_height:
-                            ratio = max_height / pic_shape.height
-                            pic_shape.height = int(pic_shape.height * ratio)
-                            pic_shape.width = int(pic_shape.width * ratio)
-
-                        # Recalculate left bound / width after possible resize
-                        left = pic_shape.left
-                        pic_width = pic_shape.width
-
-                        # Reduce width of text-containing shapes to avoid overlap
-                        available_width = left - Inches(0.3)
-                        for shp in slide.shapes:
-                            # Skip pictures
-                            if shp.shape_type == 13:  # MSO_SHAPE_TYPE.PICTURE
-                                continue
-                            if hasattr(shp, "text_frame") and shp.text_frame is not None:
-                                # Adjust width if current right edge goes beyond image left OR if placeholder is very narrow
-                                # Determine available horizontal space for this shape
-                                max_width_allowed = available_width - shp.left
-                                min_width_needed = Inches(4)
-
-                                if max_width_allowed <= Inches(1):
-                                    continue  # No space to change
-
-                                # If shape is wider than allowed, shrink; if narrower than reasonable, grow (if space)
-                                if shp.left + shp.width > available_width:
-                                    # shrink to fit but not below min reasonable width
-                                    shp.width = max(min_width_needed, max_width_allowed)
-                                elif shp.width < min_width_needed and max_width_allowed >= min_width_needed:
-                                    # expand to a comfortable width
-                                    shp.width = min_width_needed
-                        print("Debug - Image added to slide")
+                        self._add_image_to_slide(prs, prs.slides[-1], img_path)
                 except Exception as e:
-                    print(f"Warning - Could not add image to slide: {str(e)}")
-
-
-
-        # Get the absolute path to the generated directory
-        generated_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'generated'))
-        
-        # Ensure output directory exists
-        os.makedirs(generated_dir, exist_ok=True)
-
-        # Clean filename - more restrictive sanitization
-        def sanitize_filename(s: str, max_length: int = 50) -> str:
-            # Replace any non-alphanumeric chars with underscore
-            safe = ''.join(c if c.isalnum() else '_' for c in s)
-            # Remove repeated underscores
-            while '__' in safe:
-                safe = safe.replace('__', '_')
-            # Trim to max length and remove trailing underscores
-            safe = safe[:max_length].rstrip('_')
-            return safe or 'presentation'  # Fallback if empty
-        
-        filename = f"{sanitize_filename(title)}.pptx"
-        output_path = os.path.join(generated_dir, filename)
-
-        prs.save(output_path)
-        return output_path
+                    logger.warning("Could not add image to slide: %s", e)
+        # Slide building time, excluding the image generation spans nested inside the loop
+        render_elapsed = time.perf_counter() - render_start - (self.stage_timings.get('image', 0.0) - images_before)
+        observe_stage('render', render_elapsed, self.stage_timings)
+        return prs
+
+
+MAX_RENDER_SLIDES = int(os.getenv('MAX_RENDER_SLIDES', 100))
+
+
+def normalize_slides(slides) -> List[Dict]:
+    """Validate ``[{title, content}]`` slides; ``content`` may be a string or a list of bullets"""
+    if not isinstance(slides, list) or not slides:
+        raise ValueError("slides must be a non-empty list")
+    if len(slides) > MAX_RENDER_SLIDES:
+        raise ValueError(f"at most {MAX_RENDER_SLIDES} slides can be rendered")
+    normalized = []
+    for position, slide in enumerate(slides, start=1):
+        if not isinstance(slide, dict) or not str(slide.get('title') or '').strip():
+            raise ValueError(f"slide {position} needs a title")
+        content = slide.get('content') or ''
+        if isinstance(content, list):
+            content = "\n".join(str(point).strip() for point in content)
+        elif not isinstance(content, str):
+            raise ValueError(f"slide {position} content must be a string or a list of strings")
+        normalized.append({'title': str(slide['title']).strip(), 'content': content})
+    return normalized
+
+
+def render_deck(title: str, presenter: str, slides: List[Dict], template_style: str = DEFAULT_TEMPLATE_STYLE) -> bytes:
+    """Render structured slides into a branded .pptx and return its bytes.
+
+    Rendering half of ``create_presentation`` only: no OpenAI client, no title generation, no
+    images and no database access. Raises ValueError for invalid slides or an unknown template.
+    """
+    generator = PPTGenerator(offline=True)
+    if not generator.has_template(template_style):
+        raise ValueError(f"Unknown template style: {template_style}")
+    return generator.render_to_bytes(title, presenter, normalize_slides(slides), template_style)
@@ -0,0 +1,159 @@
+import os
+import re
+import posixpath
+import tempfile
+import zipfile
+import logging
+from collections import Counter
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+NS = {
+    'p': 'http://schemas.openxmlformats.org/presentationml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+}
+_R_ID = '{%s}id' % NS['r']
+CONTENT_TYPES = 'http://schemas.openxmlformats.org/package/2006/content-types'
+IMAGE_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/image'
+
+
+def rels_name(part_name: str) -> str:
+    """``ppt/slides/slide3.xml`` -> ``ppt/slides/_rels/slide3.xml.rels``"""
+    folder, name = posixpath.split(part_name)
+    return posixpath.join(folder, '_rels', name + '.rels')
+
+
+def rel_targets(rels_xml: bytes, part_name: str) -> Dict[str, str]:
+    """Map relationship ids to absolute part names for a part's internal relationships."""
+    folder = posixpath.dirname(part_name)
+    targets = {}
+    for rel in ET.fromstring(rels_xml).findall('rel:Relationship', NS):
+        if rel.get('TargetMode') == 'External':
+            continue
+        targets[rel.get('Id')] = posixpath.normpath(posixpath.join(folder, rel.get('Target')))
+    return targets
+
+
+def slide_part_names(zf: zipfile.ZipFile) -> List[str]:
+    """Slide part names in presentation order (from presentation.xml's sldIdLst)."""
+    presentation = ET.fromstring(zf.read('ppt/presentation.xml'))
+    targets = rel_targets(zf.read('ppt/_rels/presentation.xml.rels'), 'ppt/presentation.xml')
+    return [targets[sld.get(_R_ID)] for sld in presentation.findall('p:sldIdLst/p:sldId', NS)]
+
+
+def slide_has_image(pptx, position: int) -> bool:
+    """Whether the slide at 0-based ``position`` shows a picture."""
+    _, _, rels_xml = read_slide(pptx, position)
+    return any(rel.get('Type') == IMAGE_REL for rel in ET.fromstring(rels_xml).findall('rel:Relationship', NS))
+
+
+def read_slide(pptx, position: int) -> Tuple[str, bytes, bytes]:
+    """``(part name, slide XML, slide rels XML)`` of the slide at 0-based ``position``."""
+    with zipfile.ZipFile(pptx) as zf:
+        part = slide_part_names(zf)[position]
+        return part, zf.read(part), zf.read(rels_name(part))
+
+
+def patch_slide(path: str, position: int, slide_xml: bytes, slide_rels: bytes,
+                output_path: Optional[str] = None, media: Optional[Dict[str, bytes]] = None) -> str:
+    """Replace the slide at 0-based ``position`` of the .pptx at ``path`` with new XML parts.
+
+    Every other zip entry is copied through unchanged. ``media`` holds new parts the slide
+    relates to (e.g. its picture), keyed by their name in the package the slide was rendered
+    in; each is added under a free name and ``slide_rels`` is retargeted, while pictures only
+    the old slide used are dropped. Any other relationship must resolve to a part already in
+    the package (same template layouts) and the package must not repeat an entry name;
+    otherwise ValueError is raised and the caller should re-render the deck instead. The
+    result is written atomically to ``output_path`` (default: in place).
+    """
+    output_path = output_path or path
+    with zipfile.ZipFile(path) as zin:
+        names = zin.namelist()
+        duplicates = sorted(name for name, count in Counter(names).items() if count > 1)
+        if duplicates:
+            # Which copy a reader sees is undefined, so the patch could silently target the wrong one
+            raise ValueError(f"deck has duplicate zip entries: {', '.join(duplicates)}")
+        parts = slide_part_names(zin)
+        if not 0 <= position < len(parts):
+            raise IndexError(f"slide {position + 1} out of range (deck has {len(parts)})")
+        part = parts[position]
+        names = set(names)
+        added, slide_rels = _place_media(zin, names, part, slide_rels, media or {})
+        missing = [t for t in rel_targets(slide_rels, part).values() if t not in names and t not in added]
+        if missing:
+            raise ValueError(f"patched slide references parts missing from the deck: {', '.join(missing)}")
+        dropped = _unshared_images(zin, part) if rels_name(part) in names else set()
+
+        replacements = {part: slide_xml, rels_name(part): slide_rels, **added}
+        fd, tmp_path = tempfile.mkstemp(suffix='.pptx', dir=os.path.dirname(os.path.abspath(output_path)))
+        try:
+            with os.fdopen(fd, 'wb') as fh, zipfile.ZipFile(fh, 'w', zipfile.ZIP_DEFLATED) as zout:
+                for info in zin.infolist():
+                    if info.filename in dropped:
+                        continue
+                    data = replacements.pop(info.filename, None)
+                    zout.writestr(info, data if data is not None else zin.read(info))
+                for name, data in replacements.items():
+                    # A slide that had no rels part before, or newly added media
+                    zout.writestr(name, data)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    logger.debug("Patched %s in %s", part, output_path)
+    return output_path
+
+
+def _place_media(zin: zipfile.ZipFile, names: set, part: str, slide_rels: bytes,
+                 media: Dict[str, bytes]) -> Tuple[Dict[str, bytes], bytes]:
+    """Pick free deck names for the slide's new ``media`` parts; returns ``(added parts, retargeted rels)``."""
+    if not media:
+        return {}, slide_rels
+    folder = posixpath.dirname(part)
+    defaults = _default_extensions(zin)
+    added = {}
+    for rel in ET.fromstring(slide_rels).findall('rel:Relationship', NS):
+        target = rel.get('Target')
+        source_name = posixpath.normpath(posixpath.join(folder, target))
+        if rel.get('TargetMode') == 'External' or source_name not in media:
+            continue
+        stem, ext = posixpath.splitext(source_name)
+        if ext[1:].lower() not in defaults:
+            raise ValueError(f"deck has no content type for {ext} parts")
+        stem = re.sub(r'\d+$', '', stem)
+        n = 1
+        while f"{stem}{n}{ext}" in names or f"{stem}{n}{ext}" in added:
+            n += 1
+        name = f"{stem}{n}{ext}"
+        added[name] = media[source_name]
+        new_target = posixpath.relpath(name, folder)
+        slide_rels = slide_rels.replace(f'Target="{target}"'.encode(), f'Target="{new_target}"'.encode())
+    return added, slide_rels
+
+
+def _default_extensions(zin: zipfile.ZipFile) -> set:
+    """Lower-cased file extensions the package declares a default content type for."""
+    types = ET.fromstring(zin.read('[Content_Types].xml'))
+    return {el.get('Extension').lower() for el in types.findall('{%s}Default' % CONTENT_TYPES)}
+
+
+def _unshared_images(zin: zipfile.ZipFile, part: str) -> set:
+    """Pictures of slide ``part`` that no other part of the package relates to."""
+    def images(rels_part: str) -> set:
+        source = posixpath.join(posixpath.dirname(posixpath.dirname(rels_part)),
+                                posixpath.basename(rels_part)[:-len('.rels')])
+        return {posixpath.normpath(posixpath.join(posixpath.dirname(source), rel.get('Target')))
+                for rel in ET.fromstring(zin.read(rels_part)).findall('rel:Relationship', NS)
+                if rel.get('Type') == IMAGE_REL and rel.get('TargetMode') != 'External'}
+
+    own = images(rels_name(part))
+    if not own:
+        return set()
+    for name in zin.namelist():
+        if name.endswith('.rels') and name != rels_name(part) and '/_rels/' in '/' + name:
+            own -= images(name)
+    return own
@@ -0,0 +1,170 @@
+import os
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+from app.utils.deadline import DeadlineExceeded
+from app.utils.metrics import RATE_LIMIT_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+CHAT_REQUESTS = 'chat_requests'
+CHAT_TOKENS = 'chat_tokens'
+IMAGE_REQUESTS = 'image_requests'
+
+# Longest single sleep while queued, so penalties and refills are re-read promptly
+_MAX_SLEEP = 1.0
+
+
+class RateLimitTimeout(DeadlineExceeded):
+    """Raised when a caller could not get capacity before its timeout (its request deadline)."""
+
+
+class TokenBucketLimiter:
+    """Token buckets persisted in a local SQLite file so every gunicorn worker on the node shares them.
+
+    ``buckets`` maps a name to ``(capacity, refill_per_second)``. ``acquire`` takes from one or
+    more buckets atomically and blocks (queues) until all of them have capacity; ``penalize``
+    pauses a bucket, e.g. for the ``retry-after`` of a 429.
+    """
+
+    def __init__(self, path: str, buckets: Dict[str, Tuple[float, float]]):
+        self.path = path
+        self.buckets = buckets
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, blocked_until REAL NOT NULL DEFAULT 0)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _try_take(self, costs: Dict[str, float]) -> float:
+        """Take ``costs`` if every bucket can cover them; otherwise return seconds to wait."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            state = {}
+            wait = 0.0
+            for name, amount in costs.items():
+                capacity, rate = self.buckets[name]
+                row = conn.execute("SELECT tokens, updated, blocked_until FROM buckets WHERE name = ?", (name,)).fetchone()
+                tokens, updated, blocked_until = row if row else (capacity, now, 0.0)
+                tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+                state[name] = (tokens, blocked_until)
+                # Requests larger than the bucket (e.g. a huge TPM cost) wait for a full bucket
+                amount = min(amount, capacity)
+                if now < blocked_until:
+                    wait = max(wait, blocked_until - now)
+                elif tokens < amount:
+                    wait = max(wait, (amount - tokens) / rate)
+            for name, amount in costs.items():
+                tokens, blocked_until = state[name]
+                if not wait:
+                    tokens -= min(amount, self.buckets[name][0])
+                conn.execute(
+                    "INSERT INTO buckets (name, tokens, updated, blocked_until) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                    (name, tokens, now, blocked_until),
+                )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def acquire(self, costs: Dict[str, float], timeout: Optional[float] = None) -> float:
+        """Block until ``costs`` can be taken from their buckets; return the seconds spent queued."""
+        costs = {name: amount for name, amount in costs.items() if name in self.buckets and amount > 0}
+        if not costs:
+            return 0.0
+        start = time.monotonic()
+        while True:
+            wait = self._try_take(costs)
+            waited = time.monotonic() - start
+            if not wait:
+                for name in costs:
+                    RATE_LIMIT_WAIT_SECONDS.labels(bucket=name).observe(waited)
+                if waited > 1:
+                    logger.info("Queued %.1fs for OpenAI capacity (%s)", waited, ', '.join(costs))
+                return waited
+            if timeout is not None and waited + wait > timeout:
+                raise RateLimitTimeout(f"OpenAI capacity not available within {timeout:.0f}s")
+            time.sleep(min(wait, _MAX_SLEEP))
+
+    def penalize(self, bucket: str, seconds: float) -> None:
+        """Stop handing out ``bucket`` capacity for ``seconds`` (all processes) and drain it."""
+        if bucket not in self.buckets:
+            return
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO buckets (name, tokens, updated, blocked_until) VALUES (?, 0, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET tokens = 0, updated = excluded.updated, "
+                "blocked_until = MAX(blocked_until, excluded.blocked_until)",
+                (bucket, now, now + seconds),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.warning("OpenAI rate limited; pausing %s for %.1fs", bucket, seconds)
+
+
+def retry_after_seconds(error, default: float = 2.0) -> Optional[float]:
+    """Seconds to back off for a 429 error (from its ``retry-after`` header), or None if not a 429."""
+    if getattr(error, 'status_code', None) != 429:
+        return None
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    for header in ('retry-after', 'retry-after-ms'):
+        value = headers.get(header)
+        if value:
+            try:
+                seconds = float(value)
+                return seconds / 1000.0 if header == 'retry-after-ms' else seconds
+            except ValueError:
+                continue
+    return default
+
+
+_limiter: Optional[TokenBucketLimiter] = None
+_limiter_lock = threading.Lock()
+_limiter_configured = False
+
+
+def get_rate_limiter() -> Optional[TokenBucketLimiter]:
+    """Process-wide limiter built from OPENAI_CHAT_RPM / OPENAI_CHAT_TPM / OPENAI_IMAGE_RPM.
+
+    Returns None (no limiting) when none of them is set.
+    """
+    global _limiter, _limiter_configured
+    if _limiter_configured:
+        return _limiter
+    with _limiter_lock:
+        if not _limiter_configured:
+            buckets = {}
+            for name, env in ((CHAT_REQUESTS, 'OPENAI_CHAT_RPM'), (CHAT_TOKENS, 'OPENAI_CHAT_TPM'),
+                              (IMAGE_REQUESTS, 'OPENAI_IMAGE_RPM')):
+                per_minute = float(os.getenv(env) or 0)
+                if per_minute > 0:
+                    buckets[name] = (per_minute, per_minute / 60.0)
+            if buckets:
+                path = os.getenv('RATE_LIMIT_DB') or os.path.join(tempfile.gettempdir(), 'pptjet_openai_ratelimit.sqlite')
+                _limiter = TokenBucketLimiter(path, buckets)
+                logger.info("OpenAI rate limiter enabled (%s) at %s", ', '.join(buckets), path)
+            _limiter_configured = True
+    return _limiter
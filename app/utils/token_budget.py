@@ -0,0 +1,168 @@
+import math
+import os
+import re
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Fallback per-slide completion allowance until enough real generations have been observed; generous
+# on purpose (six bullets with elaboration sentences run 200+ tokens), since a short guess truncates
+DEFAULT_TOKENS_PER_SLIDE = int(os.getenv('TOKEN_BUDGET_DEFAULT_PER_SLIDE', 250))
+# After a truncation the per-slide allowance grows at least this much over the learned percentile
+TRUNCATION_GROWTH = 1.5
+# A truncation's lower bound stops counting after this many clean (not truncated) completions
+BOUND_EXPIRY_OBSERVATIONS = int(os.getenv('TOKEN_BUDGET_BOUND_EXPIRY', 20))
+# JSON wrapper ({"slides": [...]}) and stop-token overhead per completion
+COMPLETION_OVERHEAD_TOKENS = 40
+# Chat models in use accept 16K tokens of context
+DEFAULT_CONTEXT_WINDOW = 16385
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token count for ``text`` without a tokenizer dependency.
+
+    Counts words and punctuation, charging long words extra the way BPE splits them; within
+    ~10% of tiktoken on English prose and JSON, which is enough to size ``max_tokens``.
+    """
+    if not text:
+        return 0
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        tokens += 1 if len(piece) <= 6 else math.ceil(len(piece) / 4)
+    return tokens
+
+
+def estimate_messages_tokens(messages: List[Dict]) -> int:
+    """Token estimate for a chat ``messages`` list including per-message framing."""
+    return sum(estimate_tokens(m.get('content') or '') + 4 for m in messages) + 3
+
+
+class TokenBudget:
+    """Learns completion tokens per slide from recent generations and sizes ``max_tokens`` from it.
+
+    Completions that finished normally (``finish_reason == 'stop'``) give exact samples. A
+    truncated completion only shows that slides need more than it got, so it sets a lower bound
+    of at least ``TRUNCATION_GROWTH`` times the learned percentile; without that a deployment
+    whose slides outgrow the cold-start guess would truncate forever and never learn. Bounds
+    expire after ``BOUND_EXPIRY_OBSERVATIONS`` clean completions, and truncations at the
+    ``max_tokens`` ceiling are ignored (a bigger allowance could not have been granted). The
+    budget for a request is the larger of the percentile and the live bounds, times the slide
+    count, plus headroom.
+    """
+
+    def __init__(self, percentile: float = None, headroom: float = None, window: int = None,
+                 min_samples: int = None, max_tokens: int = None):
+        self.percentile = percentile or float(os.getenv('TOKEN_BUDGET_PERCENTILE', 95))
+        self.headroom = headroom or float(os.getenv('TOKEN_BUDGET_HEADROOM', 1.1))
+        self.min_samples = min_samples or int(os.getenv('TOKEN_BUDGET_MIN_SAMPLES', 20))
+        self.max_tokens = max_tokens or int(os.getenv('TOKEN_BUDGET_MAX', 4096))
+        self._samples = deque(maxlen=window or int(os.getenv('TOKEN_BUDGET_WINDOW', 500)))
+        # [tokens per slide, clean observations left] per live truncation lower bound
+        self._bounds: List[list] = []
+        self._lock = threading.Lock()
+        self._seeded = False
+
+    def observe(self, completion_tokens: int, num_slides: int) -> None:
+        """Record a completion that produced ``num_slides`` slides without truncation."""
+        if not completion_tokens or not num_slides:
+            return
+        with self._lock:
+            self._samples.append(max(0, completion_tokens - COMPLETION_OVERHEAD_TOKENS) / num_slides)
+            for bound in self._bounds:
+                bound[1] -= 1
+            self._bounds = [bound for bound in self._bounds if bound[1] > 0]
+
+    def observe_truncated(self, completion_tokens: int, slides_parsed: int, slides_requested: int,
+                          max_tokens: int, prompt_tokens: int = 0, context_window: int = DEFAULT_CONTEXT_WINDOW) -> None:
+        """Record a completion cut off at ``max_tokens`` after ``slides_parsed`` of ``slides_requested`` slides."""
+        if not completion_tokens or not slides_requested:
+            return
+        if max_tokens >= self.ceiling(prompt_tokens, context_window) or completion_tokens < max_tokens:
+            # Cut off by the ceiling (or a lower model output cap), not by the learned allowance
+            return
+        # The cut-off slide is not counted, so this is below what a full slide needs
+        observed = max(0, completion_tokens - COMPLETION_OVERHEAD_TOKENS) / max(1, slides_parsed or slides_requested)
+        # Grow from the percentile, not from earlier bounds, so repeated truncations do not compound
+        bound = max(observed, self._percentile() * TRUNCATION_GROWTH)
+        with self._lock:
+            self._bounds.append([bound, BOUND_EXPIRY_OBSERVATIONS])
+        logger.info("Token budget raised to at least %.0f tokens/slide after a truncated completion", bound)
+
+    def _percentile(self) -> float:
+        """Learned tokens per slide from clean completions (the default until enough are seen)."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return DEFAULT_TOKENS_PER_SLIDE
+        rank = max(1, math.ceil(self.percentile / 100.0 * len(samples)))
+        return samples[rank - 1]
+
+    def tokens_per_slide(self) -> float:
+        with self._lock:
+            lower_bound = max((bound for bound, _ in self._bounds), default=0.0)
+        return max(self._percentile(), lower_bound)
+
+    def ceiling(self, prompt_tokens: int = 0, context_window: int = DEFAULT_CONTEXT_WINDOW) -> int:
+        """Largest ``max_tokens`` ever granted: TOKEN_BUDGET_MAX, or what fits after the prompt."""
+        return min(self.max_tokens, context_window - prompt_tokens - 16)
+
+    def budget_for(self, num_slides: int, prompt_tokens: int = 0,
+                   context_window: int = DEFAULT_CONTEXT_WINDOW, minimum: int = 0) -> int:
+        """``max_tokens`` for a completion that should contain ``num_slides`` slides, at least ``minimum``."""
+        budget = math.ceil(num_slides * self.tokens_per_slide() * self.headroom) + COMPLETION_OVERHEAD_TOKENS
+        budget = max(budget, minimum)
+        # Never ask for more than the model can return after the prompt
+        return max(64, min(budget, self.ceiling(prompt_tokens, context_window)))
+
+    def seed(self, rows) -> None:
+        """Pre-fill samples from ``(completion_tokens, num_slides)`` pairs of past generations."""
+        with self._lock:
+            for completion_tokens, num_slides in rows:
+                if completion_tokens and num_slides:
+                    self._samples.append(max(0, completion_tokens - COMPLETION_OVERHEAD_TOKENS) / num_slides)
+            self._seeded = True
+
+    def seed_from_history(self, limit: int = 200) -> None:
+        """Seed once per process from recent ``GenerationStats`` rows (needs an app context).
+
+        Uses the tokens of slide-writing calls only (not the title or outline calls) from
+        first-attempt, freshly generated decks; retries inflate the count and cache hits have none.
+        """
+        if self._seeded:
+            return
+        from app.generation_stats import GenerationStats
+        try:
+            rows = (GenerationStats.query
+                    .with_entities(GenerationStats.slide_completion_tokens, GenerationStats.num_slides)
+                    .filter(GenerationStats.retry_count == 0, GenerationStats.content_source == 'llm',
+                            GenerationStats.slide_completion_tokens.isnot(None))
+                    .order_by(GenerationStats.created_at.desc())
+                    .limit(limit)
+                    .all())
+        except Exception as e:
+            logger.warning("Could not seed token budget from generation stats: %s", e)
+            rows = []
+        self.seed(rows)
+        logger.debug("Token budget seeded with %s samples, p%s=%.1f tokens/slide",
+                     len(rows), self.percentile, self.tokens_per_slide())
+
+    @property
+    def sample_count(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+
+# Shared per process so every request learns from the previous ones
+token_budget = TokenBudget()
+
+
+def finish_reason(response) -> Optional[str]:
+    try:
+        return response.choices[0].finish_reason
+    except (AttributeError, IndexError):
+        return None
@@ -0,0 +1,195 @@
+"""Offline benchmark for the content generation and rendering pipeline.
+
+Drives ``PPTGenerator.generate_slide_content`` and ``create_presentation``
+against an in-process stub OpenAI client (see ``fake_openai.StubOpenAI``) for
+every template in ``app/static/presentations/custom_styles``, several slide
+counts, with and without images. Reports wall time, CPU time, peak Python
+memory and output size per case, and writes the results to JSON so runs from
+different commits can be compared.
+
+Usage::
+
+    python bench/benchmark_pipeline.py --output bench_results.json
+    python bench/benchmark_pipeline.py --templates Business Verdant --slides 5 40 --repeat 3
+    python bench/benchmark_pipeline.py --output new.json --compare old.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.utils.ppt_generator import PPTGenerator  # noqa: E402
+from bench.fake_openai import StubOpenAI  # noqa: E402
+
+STYLES_DIR = os.path.join(PROJECT_ROOT, 'app', 'static', 'presentations', 'custom_styles')
+DEFAULT_SLIDES = [5, 10, 20, 40]
+
+
+def available_templates():
+    return sorted(os.path.splitext(f)[0] for f in os.listdir(STYLES_DIR) if f.endswith('.pptx'))
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def run_once(template, num_slides, include_images, measure_memory=False):
+    """Run content generation + rendering once and return timings for this case."""
+    generator = PPTGenerator(client=StubOpenAI())
+    title = f"bench {template} {num_slides} {'img' if include_images else 'txt'}"
+
+    if measure_memory:
+        tracemalloc.start()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+
+    slides = generator.generate_slide_content(title, num_slides)
+    content_wall = time.perf_counter() - wall_start
+
+    path = generator.create_presentation(
+        title=title,
+        presenter='Benchmark',
+        slides_content=slides,
+        template_style=template,
+        include_images=include_images,
+    )
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    peak = None
+    if measure_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    size = os.path.getsize(path)
+    os.remove(path)
+    return {
+        'wall_s': wall,
+        'cpu_s': cpu,
+        'content_wall_s': content_wall,
+        'stages_s': dict(generator.stage_timings),
+        'peak_mem_bytes': peak,
+        'output_bytes': size,
+    }
+
+
+def run_case(template, num_slides, include_images, repeat, measure_memory):
+    runs = [run_once(template, num_slides, include_images) for _ in range(repeat)]
+    result = {
+        'template': template,
+        'num_slides': num_slides,
+        'include_images': include_images,
+        'repeat': repeat,
+        'wall_s': statistics.median(r['wall_s'] for r in runs),
+        'cpu_s': statistics.median(r['cpu_s'] for r in runs),
+        'content_wall_s': statistics.median(r['content_wall_s'] for r in runs),
+        'stages_s': {
+            stage: statistics.median(r['stages_s'].get(stage, 0.0) for r in runs)
+            for stage in runs[0]['stages_s']
+        },
+        'output_bytes': runs[-1]['output_bytes'],
+        'peak_mem_bytes': None,
+    }
+    if measure_memory:
+        # tracemalloc slows allocation-heavy code a lot, so memory gets its own untimed pass
+        result['peak_mem_bytes'] = run_once(template, num_slides, include_images, measure_memory=True)['peak_mem_bytes']
+    return result
+
+
+def _case_key(r):
+    return (r['template'], r['num_slides'], r['include_images'])
+
+
+def compare(results, baseline_path, threshold):
+    """Print per-case wall/CPU/memory deltas against a previous results file; return regressions."""
+    with open(baseline_path) as f:
+        baseline = {_case_key(r): r for r in json.load(f)['results']}
+    regressions = []
+    print(f"\n{'case':<40} {'wall Δ%':>9} {'cpu Δ%':>9} {'mem Δ%':>9} {'size Δ%':>9}")
+    for r in results:
+        old = baseline.get(_case_key(r))
+        if not old:
+            continue
+
+        def delta(field):
+            if not old.get(field) or r.get(field) is None:
+                return None
+            return (r[field] - old[field]) / old[field] * 100
+
+        deltas = {f: delta(f) for f in ('wall_s', 'cpu_s', 'peak_mem_bytes', 'output_bytes')}
+        name = f"{r['template']}/{r['num_slides']}/{'img' if r['include_images'] else 'txt'}"
+        print(f"{name:<40} " + ' '.join(f"{d:>+9.1f}" if d is not None else f"{'n/a':>9}" for d in deltas.values()))
+        if deltas['wall_s'] is not None and deltas['wall_s'] > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--templates', nargs='*', default=None, help='Template names (default: every file in custom_styles)')
+    parser.add_argument('--slides', nargs='*', type=int, default=DEFAULT_SLIDES)
+    parser.add_argument('--images', choices=['both', 'on', 'off'], default='both')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='Previous results JSON to diff against')
+    parser.add_argument('--regression-threshold', type=float, default=10.0, help='Wall time increase (%%) that fails --compare')
+    args = parser.parse_args()
+
+    templates = args.templates or available_templates()
+    image_modes = {'both': [False, True], 'on': [True], 'off': [False]}[args.images]
+
+    results = []
+    for template in templates:
+        for num_slides in args.slides:
+            for include_images in image_modes:
+                try:
+                    result = run_case(template, num_slides, include_images, args.repeat, not args.no_memory)
+                except Exception as e:
+                    # Keep going: a failing case is a result too, and the rest of the suite still runs
+                    results.append({'template': template, 'num_slides': num_slides,
+                                    'include_images': include_images, 'repeat': args.repeat, 'error': str(e)})
+                    print(f"{template:<16} slides={num_slides:<3} images={str(include_images):<5} FAILED: {e}")
+                    continue
+                results.append(result)
+                mem = f"{result['peak_mem_bytes'] / 1e6:.1f}MB" if result['peak_mem_bytes'] else 'n/a'
+                print(f"{template:<16} slides={num_slides:<3} images={str(include_images):<5} "
+                      f"wall={result['wall_s']:.3f}s cpu={result['cpu_s']:.3f}s mem={mem} size={result['output_bytes'] / 1e3:.0f}KB")
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    failed = [r for r in results if 'error' in r]
+    print(f"\nWrote {len(results)} cases to {args.output}" + (f" ({len(failed)} failed)" if failed else ''))
+
+    if args.compare:
+        regressions = compare([r for r in results if 'error' not in r], args.compare, args.regression_threshold)
+        if regressions:
+            print(f"\nWall-time regressions over {args.regression_threshold}%: {', '.join(regressions)}")
+            sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Deterministic stand-ins for the OpenAI API used by the benchmarks and load tests.
+
+``synthesize_chat`` / ``synthesize_image_png`` build plausible responses for the
+prompts ``PPTGenerator`` sends, and ``StubOpenAI`` wraps them in an in-process
+object with the same shape as ``openai.OpenAI`` (``chat.completions.create`` and
+``images.generate``), so the pipeline can run with no network access.
+"""
+import base64
+import json
+import re
+import struct
+import zlib
+from types import SimpleNamespace
+
+# About the size of a real bullet with its elaboration sentence (~20 tokens)
+_BULLET = "Point {n} - A concise elaboration that explains why this point matters"
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _requested_slide_count(text: str) -> int:
+    match = re.search(r'exactly (\d+)', text)
+    return int(match.group(1)) if match else 5
+
+
+def _slide_title(index: int, count: int) -> str:
+    if index == 0:
+        return 'Agenda'
+    if index == count - 1 and count > 1:
+        return 'Conclusion'
+    return f'Topic {index}: Key Aspect {index}'
+
+
+def synthesize_chat(request: dict) -> dict:
+    """Return the content string and token usage for a chat completion request."""
+    messages = request.get('messages', [])
+    user_text = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+    json_mode = (request.get('response_format') or {}).get('type') == 'json_object'
+    wants_json = json_mode or 'JSON' in ' '.join(m.get('content', '') for m in messages)
+
+    system_text = next((m['content'] for m in messages if m.get('role') == 'system'), '')
+    requested_titles = re.findall(r'^- (.+)$', user_text.split('for these titles:')[-1], re.M) \
+        if 'for these titles:' in user_text else []
+
+    if wants_json and '"titles"' in system_text:
+        # Outline request (outline-first generation for large decks)
+        count = _requested_slide_count(user_text)
+        titles = [_slide_title(i, count) for i in range(count)]
+        content = json.dumps({'titles': titles})
+    elif wants_json:
+        count = _requested_slide_count(user_text)
+        if requested_titles:
+            titles = requested_titles
+        elif 'additional unique slides' in user_text:
+            # Partial retry: only the missing slides, none reusing existing titles
+            titles = [f'Additional Topic {i + 1}' for i in range(count)]
+        else:
+            titles = [_slide_title(i, count) for i in range(count)]
+        slides = [{'title': title, 'content': [_BULLET.format(n=n + 1) for n in range(6)]}
+                  for title in titles]
+        content = json.dumps({'slides': slides})
+    else:
+        content = 'A Benchmark Presentation: Insights and Outcomes'
+
+    prompt_tokens = sum(_estimate_tokens(m.get('content', '')) for m in messages)
+    completion_tokens = _estimate_tokens(content)
+    max_tokens = request.get('max_tokens')
+    finish_reason = 'stop'
+    if max_tokens and completion_tokens > max_tokens:
+        # Mimic the provider truncating output at max_tokens
+        content = content[:max_tokens * 4]
+        completion_tokens = max_tokens
+        finish_reason = 'length'
+    return {
+        'content': content,
+        'finish_reason': finish_reason,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+    }
+
+
+def synthesize_image_png(size: int = 256, seed: str = '') -> bytes:
+    """Build a small solid-colour PNG (colour derived from ``seed``) without any imaging library."""
+    digest = zlib.crc32(seed.encode('utf-8'))
+    rgb = bytes(((digest >> shift) & 0xFF) for shift in (16, 8, 0))
+    row = b'\x00' + rgb * size
+    raw = zlib.compress(row * size, 9)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', raw) + chunk(b'IEND', b'')
+
+
+def _chat_response(request: dict):
+    result = synthesize_chat(request)
+    return SimpleNamespace(
+        model=request.get('model'),
+        choices=[SimpleNamespace(
+            message=SimpleNamespace(content=result['content']),
+            finish_reason=result['finish_reason'],
+        )],
+        usage=SimpleNamespace(
+            prompt_tokens=result['prompt_tokens'],
+            completion_tokens=result['completion_tokens'],
+            total_tokens=result['prompt_tokens'] + result['completion_tokens'],
+        ),
+    )
+
+
+class StubOpenAI:
+    """In-process object shaped like ``openai.OpenAI`` for the calls PPTGenerator makes."""
+
+    def __init__(self):
+        self.calls = {'chat': 0, 'images': 0}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_chat))
+        self.images = SimpleNamespace(generate=self._generate_image)
+
+    def _create_chat(self, **kwargs):
+        self.calls['chat'] += 1
+        return _chat_response(kwargs)
+
+    def _generate_image(self, **kwargs):
+        self.calls['images'] += 1
+        png = synthesize_image_png(seed=kwargs.get('prompt', ''))
+        return SimpleNamespace(data=[SimpleNamespace(url=None, b64_json=base64.b64encode(png).decode('ascii'))])
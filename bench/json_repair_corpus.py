@@ -0,0 +1,75 @@
+"""Replay a corpus of malformed slide-content completions through the JSON repair parser.
+
+Each entry is a real-world failure shape seen from the chat models (code fences,
+prose around the JSON, trailing commas, stray quotes in bullets, truncation at
+``max_tokens``) with the number of complete slides that must be recovered. Add
+new entries whenever a response slips through to a re-call in production logs.
+
+Usage::
+
+    python bench/json_repair_corpus.py            # summary, non-zero exit on any miss
+    python bench/json_repair_corpus.py --verbose  # print recovered titles per entry
+"""
+import argparse
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.utils.json_repair import recover_slides  # noqa: E402
+
+_SLIDE = '{{"title": "{title}", "content": ["Scope - What the topic covers", "Impact - Why it matters today"]}}'
+_DECK = '{"slides": [' + ', '.join(_SLIDE.format(title=t) for t in ('Agenda', 'Origins', 'Growth', 'Conclusion')) + ']}'
+
+# (name, completion text, complete slides expected)
+CORPUS = [
+    ('valid', _DECK, 4),
+    ('json_fence', '```json\n' + _DECK + '\n```', 4),
+    ('bare_fence', '```\n' + _DECK + '\n```', 4),
+    ('leading_prose', 'Sure! Here is the presentation:\n\n' + _DECK, 4),
+    ('trailing_prose', _DECK + '\n\nLet me know if you need changes.', 4),
+    ('trailing_commas', _DECK.replace('"]}', '",]},').replace('},]}', '}]}').replace(']}, {', ']},, {'), 4),
+    ('missing_comma_between_slides', _DECK.replace('}, {', '} {'), 4),
+    ('unescaped_quotes',
+     '{"slides": [{"title": "Agenda", "content": ["The "Big Five" - Five forces shaping the market", '
+     '"Quote - As they say, "less is more", in design"]}]}', 1),
+    ('raw_newline_in_bullet', '{"slides": [{"title": "Agenda", "content": ["Line one\nline two - Wrapped"]}]}', 1),
+    ('python_literals', '{"slides": [{"title": "Agenda", "content": ["A - B"], "final": False, "notes": None}]}', 1),
+    ('truncated_in_bullet', _DECK[:_DECK.index('Impact', _DECK.index('Growth'))], 2),
+    ('truncated_in_key', _DECK[:_DECK.index('"content"', _DECK.index('Growth')) + 5], 2),
+    ('truncated_after_comma', _DECK[:_DECK.index('{"title": "Growth"')], 2),
+    ('truncated_in_escape', _DECK[:_DECK.index('Growth') + 3] + '\\', 2),
+    ('truncated_before_slides', '{"slides": [', 0),
+    ('bare_array', '[' + ', '.join(_SLIDE.format(title=t) for t in ('Agenda', 'Conclusion')) + ']', 2),
+    ('refusal', "I'm sorry, but I can't help with that request.", 0),
+]
+
+
+def _complete(slide):
+    return isinstance(slide, dict) and slide.get('title') and isinstance(slide.get('content'), list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    misses = []
+    for name, text, expected in CORPUS:
+        slides = [s for s in (recover_slides(text) or []) if _complete(s)]
+        ok = len(slides) == expected
+        if not ok:
+            misses.append(name)
+        line = f"{'ok ' if ok else 'MISS'} {name:<32} recovered={len(slides)} expected={expected}"
+        if args.verbose:
+            line += f"  {[s['title'] for s in slides]}"
+        print(line)
+
+    print(f"\n{len(CORPUS) - len(misses)}/{len(CORPUS)} corpus entries recovered as expected")
+    return 1 if misses else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
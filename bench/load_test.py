@@ -0,0 +1,242 @@
+"""Stepped-concurrency load test for the Flask app, used to size workers and instances.
+
+Each virtual user logs in through ``/login/test`` (requires ``LOGIN_TEST_MODE=1``
+on the server), then loops: ``POST /generate`` with a random slide count and
+template, follows ``download_page`` and downloads the file via
+``download_file``. Every step holds a fixed concurrency for a fixed duration and
+reports throughput, latency percentiles and error rates; the step after which
+throughput stops growing is flagged as the saturation point.
+
+Against a running server::
+
+    python bench/load_test.py --base-url http://127.0.0.1:8000 --steps 1 2 4 8 16
+
+Or let the harness start ``gunicorn wsgi:app`` for each worker configuration
+(pair it with ``bench/openai_standin.py`` to keep runs offline and deterministic)::
+
+    python bench/openai_standin.py --chat-latency lognormal:2,0.4 &
+    python bench/load_test.py --serve 2:sync 4:sync 4:gthread:4 --openai-base-url http://127.0.0.1:8765/v1
+"""
+import argparse
+import json
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOWNLOAD_LINK = re.compile(r'href="([^"]*/download/file/[^"]+)"')
+DEFAULT_TEMPLATES = ['Business', 'Verdant', 'Simple', 'Creative', 'Vintage', 'Clean and Neat']
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(-(-pct * len(ordered) // 100)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class StepRecorder:
+    """Thread-safe collection of per-request samples for one concurrency step."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generate = []
+        self.download = []
+        self.end_to_end = []
+        self.errors = {}
+        self.attempts = 0
+
+    def ok(self, generate_s, download_s, total_s):
+        with self.lock:
+            self.attempts += 1
+            self.generate.append(generate_s)
+            self.download.append(download_s)
+            self.end_to_end.append(total_s)
+
+    def error(self, kind):
+        with self.lock:
+            self.attempts += 1
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def summary(self, concurrency, elapsed):
+        def ms(v):
+            return round(v * 1000) if v is not None else None
+        completed = len(self.end_to_end)
+        failed = sum(self.errors.values())
+        return {
+            'concurrency': concurrency,
+            'duration_s': round(elapsed, 1),
+            'completed': completed,
+            'failed': failed,
+            'error_rate': round(failed / self.attempts, 4) if self.attempts else 0.0,
+            'errors': dict(self.errors),
+            'decks_per_min': round(completed / elapsed * 60, 2) if elapsed else 0.0,
+            'generate_ms': {f'p{p}': ms(percentile(self.generate, p)) for p in (50, 90, 95, 99)},
+            'download_ms': {f'p{p}': ms(percentile(self.download, p)) for p in (50, 95)},
+            'end_to_end_ms': {f'p{p}': ms(percentile(self.end_to_end, p)) for p in (50, 90, 95, 99)},
+        }
+
+
+def virtual_user(index, args, stop_at, recorder, rng_seed):
+    rng = random.Random(rng_seed)
+    session = requests.Session()
+    login = session.post(f"{args.base_url}/login/test",
+                         json={'email': f"loadtest-{index}@example.com", 'unlimited': True},
+                         timeout=30)
+    if login.status_code != 200:
+        recorder.error(f"login_{login.status_code}")
+        return
+
+    while time.time() < stop_at:
+        num_slides = rng.choice(args.slides)
+        payload = {
+            'title': f"Load test deck {index}",
+            'presenter': 'Load Tester',
+            'prompt': rng.choice(args.prompts),
+            'num_slides': num_slides,
+            'template_style': rng.choice(args.templates),
+            'include_images': rng.random() < args.images_ratio,
+        }
+        start = time.perf_counter()
+        try:
+            resp = session.post(f"{args.base_url}/generate", json=payload, timeout=args.request_timeout)
+            generate_s = time.perf_counter() - start
+            if resp.status_code != 200:
+                recorder.error(f"generate_{resp.status_code}")
+                continue
+            page = session.get(f"{args.base_url}{resp.json()['download_url']}", timeout=30)
+            match = DOWNLOAD_LINK.search(page.text)
+            if page.status_code != 200 or not match:
+                recorder.error(f"download_page_{page.status_code}")
+                continue
+            download_start = time.perf_counter()
+            link = match.group(1)
+            file_resp = session.get(link if link.startswith('http') else f"{args.base_url}{link}", timeout=60)
+            if file_resp.status_code != 200 or not file_resp.content:
+                recorder.error(f"download_file_{file_resp.status_code}")
+                continue
+            recorder.ok(generate_s, time.perf_counter() - download_start, time.perf_counter() - start)
+        except requests.Timeout:
+            recorder.error('timeout')
+        except requests.RequestException as e:
+            recorder.error(type(e).__name__)
+
+
+def run_steps(args):
+    results = []
+    for step, concurrency in enumerate(args.steps):
+        recorder = StepRecorder()
+        started = time.time()
+        stop_at = started + args.step_duration
+        threads = [
+            threading.Thread(target=virtual_user, args=(step * 1000 + i, args, stop_at, recorder, args.seed + step * 1000 + i), daemon=True)
+            for i in range(concurrency)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(args.step_duration + args.request_timeout + 30)
+        summary = recorder.summary(concurrency, time.time() - started)
+        results.append(summary)
+        print(f"  concurrency={concurrency:<3} decks/min={summary['decks_per_min']:<7} "
+              f"p50={summary['end_to_end_ms']['p50']}ms p95={summary['end_to_end_ms']['p95']}ms "
+              f"errors={summary['error_rate'] * 100:.1f}%")
+    return results
+
+
+def find_saturation(results, min_gain):
+    """First concurrency level whose throughput gain over the previous step is below ``min_gain``."""
+    for previous, current in zip(results, results[1:]):
+        if previous['decks_per_min'] and (current['decks_per_min'] - previous['decks_per_min']) / previous['decks_per_min'] < min_gain:
+            return previous['concurrency']
+    return None
+
+
+def start_gunicorn(spec, args):
+    """Start ``gunicorn wsgi:app`` for a ``WORKERS:CLASS[:THREADS]`` spec and wait until it answers."""
+    parts = spec.split(':')
+    workers, worker_class = parts[0], parts[1] if len(parts) > 1 else 'sync'
+    cmd = ['gunicorn', 'wsgi:app', '--workers', workers, '--worker-class', worker_class,
+           '--bind', args.bind, '--timeout', str(int(args.request_timeout))]
+    if len(parts) > 2:
+        cmd += ['--threads', parts[2]]
+    env = dict(os.environ, LOGIN_TEST_MODE='1', FLASK_ENV='development', ENVIRONMENT='loadtest')
+    if args.openai_base_url:
+        env['OPENAI_BASE_URL'] = args.openai_base_url
+        env.setdefault('OPENAI_API_KEY', 'sk-loadtest')
+    if args.database_url:
+        env['DATABASE_URL'] = args.database_url
+    proc = subprocess.Popen(cmd, cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            requests.get(f"{args.base_url}/robots.txt", timeout=2)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError(f"gunicorn did not start for {spec}")
+
+
+def stop_gunicorn(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--steps', nargs='*', type=int, default=[1, 2, 4, 8, 16])
+    parser.add_argument('--step-duration', type=float, default=60.0)
+    parser.add_argument('--slides', nargs='*', type=int, default=[5, 8, 10, 15, 20])
+    parser.add_argument('--templates', nargs='*', default=DEFAULT_TEMPLATES)
+    parser.add_argument('--prompts', nargs='*', default=[
+        'The history of ancient Rome', 'Introduction to machine learning', 'Quarterly sales review',
+        'Climate change and renewable energy', 'Onboarding guide for new engineers',
+    ])
+    parser.add_argument('--images-ratio', type=float, default=0.0, help='Fraction of requests with include_images')
+    parser.add_argument('--request-timeout', type=float, default=180.0)
+    parser.add_argument('--serve', nargs='*', default=None, metavar='WORKERS:CLASS[:THREADS]',
+                        help='Start gunicorn wsgi:app for each configuration in turn')
+    parser.add_argument('--bind', default='127.0.0.1:8000')
+    parser.add_argument('--openai-base-url', help='OPENAI_BASE_URL for servers started with --serve')
+    parser.add_argument('--database-url', help='DATABASE_URL for servers started with --serve')
+    parser.add_argument('--saturation-gain', type=float, default=0.05, help='Throughput gain below which a step counts as saturated')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='load_test_results.json')
+    args = parser.parse_args()
+    args.base_url = f"http://{args.bind}" if args.serve else args.base_url.rstrip('/')
+
+    runs = []
+    for spec in (args.serve or [None]):
+        label = spec or 'external'
+        print(f"Server: {label}")
+        proc = start_gunicorn(spec, args) if spec else None
+        try:
+            steps = run_steps(args)
+        finally:
+            if proc:
+                stop_gunicorn(proc)
+        saturation = find_saturation(steps, args.saturation_gain)
+        print(f"  saturation at concurrency: {saturation if saturation else 'not reached'}")
+        runs.append({'server': label, 'steps': steps, 'saturation_concurrency': saturation})
+
+    with open(args.output, 'w') as f:
+        json.dump({'timestamp': datetime.utcnow().isoformat() + 'Z', 'config': vars(args), 'runs': runs}, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,420 @@
+"""Local OpenAI-compatible stand-in server for deterministic end-to-end load tests.
+
+Implements the subset of the API PPTJet uses:
+
+- ``POST /v1/chat/completions`` (including ``response_format=json_object`` and ``stream=true``)
+- ``POST /v1/images/generations`` returning URLs served by this process (``GET /images/<id>.png``)
+
+with configurable latency distributions, error injection (429 with
+``retry-after``, 500, malformed JSON content) and a record/replay mode that
+captures real OpenAI responses into a JSONL cassette and serves them back.
+
+Point the app at it with ``OPENAI_BASE_URL=http://127.0.0.1:8765/v1``.
+
+Usage::
+
+    # Synthetic responses, ~1.5s median chat latency, 2% rate limiting
+    python bench/openai_standin.py --chat-latency lognormal:1.5,0.4 --error-429 0.02
+
+    # Record real traffic, then replay it offline
+    python bench/openai_standin.py --mode record --upstream https://api.openai.com/v1 --cassette run.jsonl
+    python bench/openai_standin.py --mode replay --cassette run.jsonl
+"""
+import argparse
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from bench.fake_openai import synthesize_chat, synthesize_image_png  # noqa: E402
+
+# Request fields that identify a call for replay purposes (sampling params are ignored)
+CASSETTE_KEY_FIELDS = ('model', 'messages', 'response_format', 'prompt', 'size', 'n')
+
+
+class LatencyDistribution:
+    """Parse and sample ``fixed:S``, ``uniform:LO,HI`` or ``lognormal:MEDIAN,SIGMA`` (seconds)."""
+
+    def __init__(self, spec: str, rng: random.Random):
+        kind, _, params = spec.partition(':')
+        self.kind = kind
+        self.params = [float(p) for p in params.split(',') if p] if params else []
+        self.rng = rng
+        if kind not in ('fixed', 'uniform', 'lognormal', 'none'):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self) -> float:
+        if self.kind == 'none':
+            return 0.0
+        if self.kind == 'fixed':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return self.rng.uniform(self.params[0], self.params[1])
+        median, sigma = self.params
+        return self.rng.lognormvariate(math.log(median), sigma)
+
+
+class Cassette:
+    """Append-only JSONL store of recorded responses keyed by a hash of the request."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        # Several recordings of the same request are replayed round-robin
+                        self.entries.setdefault(entry['key'], []).append(entry)
+        self._cursor = {}
+
+    @staticmethod
+    def key_for(endpoint: str, body: dict) -> str:
+        relevant = {k: body.get(k) for k in CASSETTE_KEY_FIELDS if k in body}
+        canonical = json.dumps([endpoint, relevant], sort_keys=True)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def lookup(self, key: str):
+        with self.lock:
+            entries = self.entries.get(key)
+            if not entries:
+                return None
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return entries[index % len(entries)]
+
+    def record(self, entry: dict) -> None:
+        with self.lock:
+            self.entries.setdefault(entry['key'], []).append(entry)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+
+class StandInState:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.rng_lock = threading.Lock()
+        self.chat_latency = LatencyDistribution(args.chat_latency, self.rng)
+        self.image_latency = LatencyDistribution(args.image_latency, self.rng)
+        self.cassette = Cassette(args.cassette) if args.cassette else None
+        self.images = {}
+        self.stats = {'chat': 0, 'images': 0, '429': 0, '500': 0, 'malformed': 0, 'replay_hits': 0, 'replay_misses': 0}
+        self.stats_lock = threading.Lock()
+
+    def roll(self, rate: float) -> bool:
+        with self.rng_lock:
+            return rate > 0 and self.rng.random() < rate
+
+    def sample(self, distribution: LatencyDistribution) -> float:
+        with self.rng_lock:
+            return distribution.sample()
+
+    def count(self, name: str) -> None:
+        with self.stats_lock:
+            self.stats[name] += 1
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state: StandInState = None
+
+    def log_message(self, format, *args):
+        if self.state.args.verbose:
+            super().log_message(format, *args)
+
+    # ------------------
+    # Helpers
+    # ------------------
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _inject_error(self) -> bool:
+        args = self.state.args
+        if self.state.roll(args.error_429):
+            self.state.count('429')
+            self._send_json(429, {'error': {'message': 'Rate limit reached (stand-in)', 'type': 'requests', 'code': 'rate_limit_exceeded'}},
+                            headers={'retry-after': str(args.retry_after)})
+            return True
+        if self.state.roll(args.error_500):
+            self.state.count('500')
+            self._send_json(500, {'error': {'message': 'The server had an error (stand-in)', 'type': 'server_error'}})
+            return True
+        return False
+
+    def _forward(self, endpoint: str, body: dict):
+        """Send the request to the real upstream API; returns (status, payload, latency)."""
+        args = self.state.args
+        request = urllib.request.Request(
+            f"{args.upstream.rstrip('/')}/{endpoint}",
+            data=json.dumps(dict(body, stream=False)).encode('utf-8'),
+            headers={'Content-Type': 'application/json', 'Authorization': f"Bearer {args.api_key}"},
+            method='POST',
+        )
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=args.upstream_timeout) as resp:
+                payload = json.loads(resp.read())
+                status = resp.status
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, json.loads(e.read() or b'{}')
+        return status, payload, time.perf_counter() - start
+
+    # ------------------
+    # Routing
+    # ------------------
+
+    def do_GET(self):
+        if self.path.startswith('/images/'):
+            image_id = self.path.rsplit('/', 1)[-1].split('.')[0]
+            png = self.state.images.get(image_id)
+            if png is None:
+                self._send_json(404, {'error': {'message': 'Unknown image'}})
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(png)))
+            self.end_headers()
+            self.wfile.write(png)
+        elif self.path.rstrip('/') in ('/v1/models', '/models'):
+            self._send_json(200, {'object': 'list', 'data': [{'id': m, 'object': 'model'} for m in ('gpt-3.5-turbo', 'gpt-3.5-turbo-1106', 'dall-e-3')]})
+        elif self.path == '/_stats':
+            self._send_json(200, self.state.stats)
+        else:
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+    def do_POST(self):
+        path = self.path.split('?')[0].rstrip('/')
+        if path.endswith('/chat/completions'):
+            self._chat_completions(self._read_json())
+        elif path.endswith('/images/generations'):
+            self._image_generations(self._read_json())
+        else:
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+    # ------------------
+    # Chat completions
+    # ------------------
+
+    def _chat_completions(self, body: dict) -> None:
+        self.state.count('chat')
+        mode = self.state.args.mode
+        key = Cassette.key_for('chat/completions', body)
+        latency = None
+        payload = None
+
+        if mode == 'replay':
+            entry = self.state.cassette.lookup(key)
+            if entry:
+                self.state.count('replay_hits')
+                payload = entry['response']
+                if self.state.args.replay_latency == 'recorded':
+                    latency = entry.get('latency_s', 0.0)
+            else:
+                self.state.count('replay_misses')
+                if self.state.args.strict:
+                    self._send_json(404, {'error': {'message': 'No recording for this request'}})
+                    return
+        elif mode == 'record':
+            status, payload, latency = self._forward('chat/completions', body)
+            if status != 200:
+                self._send_json(status, payload)
+                return
+            self.state.cassette.record({'key': key, 'endpoint': 'chat/completions', 'request': body, 'response': payload, 'latency_s': latency})
+            latency = 0.0  # already paid the real latency
+
+        if mode != 'record' and self._inject_error():
+            return
+
+        if payload is None:
+            result = synthesize_chat(body)
+            payload = {
+                'id': f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': body.get('model', 'gpt-3.5-turbo'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': result['content']},
+                    'finish_reason': result['finish_reason'],
+                }],
+                'usage': {
+                    'prompt_tokens': result['prompt_tokens'],
+                    'completion_tokens': result['completion_tokens'],
+                    'total_tokens': result['prompt_tokens'] + result['completion_tokens'],
+                },
+            }
+
+        if mode != 'record' and self.state.roll(self.state.args.malformed):
+            self.state.count('malformed')
+            content = payload['choices'][0]['message']['content'] or ''
+            # Cut the JSON mid-object the way a truncated or garbled completion looks
+            payload = json.loads(json.dumps(payload))
+            payload['choices'][0]['message']['content'] = content[:max(1, int(len(content) * 0.7))]
+
+        if latency is None:
+            latency = self.state.sample(self.state.chat_latency)
+        time.sleep(latency)
+
+        if body.get('stream'):
+            self._stream_chat(payload)
+        else:
+            self._send_json(200, payload)
+
+    def _stream_chat(self, payload: dict) -> None:
+        """Replay a completed response as server-sent ``chat.completion.chunk`` events."""
+        content = payload['choices'][0]['message']['content'] or ''
+        base = {'id': payload['id'], 'object': 'chat.completion.chunk', 'created': payload['created'], 'model': payload['model']}
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+        def emit(delta, finish_reason=None):
+            chunk = dict(base, choices=[{'index': 0, 'delta': delta, 'finish_reason': finish_reason}])
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        emit({'role': 'assistant', 'content': ''})
+        step = self.state.args.stream_chunk_chars
+        for i in range(0, len(content), step):
+            emit({'content': content[i:i + step]})
+            if self.state.args.stream_chunk_delay:
+                time.sleep(self.state.args.stream_chunk_delay)
+        emit({}, payload['choices'][0].get('finish_reason', 'stop'))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    # ------------------
+    # Images
+    # ------------------
+
+    def _image_generations(self, body: dict) -> None:
+        self.state.count('images')
+        mode = self.state.args.mode
+        key = Cassette.key_for('images/generations', body)
+        png = None
+        latency = None
+
+        if mode == 'replay':
+            entry = self.state.cassette.lookup(key)
+            if entry:
+                self.state.count('replay_hits')
+                png = base64.b64decode(entry['png_b64'])
+                if self.state.args.replay_latency == 'recorded':
+                    latency = entry.get('latency_s', 0.0)
+            else:
+                self.state.count('replay_misses')
+                if self.state.args.strict:
+                    self._send_json(404, {'error': {'message': 'No recording for this request'}})
+                    return
+        elif mode == 'record':
+            status, payload, latency = self._forward('images/generations', body)
+            if status != 200:
+                self._send_json(status, payload)
+                return
+            image = payload['data'][0]
+            if image.get('b64_json'):
+                png = base64.b64decode(image['b64_json'])
+            else:
+                with urllib.request.urlopen(image['url'], timeout=self.state.args.upstream_timeout) as resp:
+                    png = resp.read()
+            self.state.cassette.record({'key': key, 'endpoint': 'images/generations', 'request': body,
+                                        'png_b64': base64.b64encode(png).decode('ascii'), 'latency_s': latency})
+            latency = 0.0
+
+        if mode != 'record' and self._inject_error():
+            return
+
+        if png is None:
+            png = synthesize_image_png(size=self.state.args.image_size, seed=body.get('prompt', ''))
+        if latency is None:
+            latency = self.state.sample(self.state.image_latency)
+        time.sleep(latency)
+
+        if body.get('response_format') == 'b64_json':
+            data = {'b64_json': base64.b64encode(png).decode('ascii')}
+        else:
+            image_id = uuid.uuid4().hex
+            self.state.images[image_id] = png
+            host, port = self.server.server_address[:2]
+            data = {'url': f"http://{self.headers.get('Host') or f'{host}:{port}'}/images/{image_id}.png"}
+        self._send_json(200, {'created': int(time.time()), 'data': [dict(data, revised_prompt=body.get('prompt'))]})
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--mode', choices=['synthetic', 'record', 'replay'], default='synthetic')
+    parser.add_argument('--cassette', help='JSONL file for record/replay')
+    parser.add_argument('--strict', action='store_true', help='In replay mode, 404 on requests that were never recorded')
+    parser.add_argument('--replay-latency', choices=['recorded', 'distribution'], default='recorded')
+    parser.add_argument('--upstream', default='https://api.openai.com/v1')
+    parser.add_argument('--api-key', default=os.environ.get('OPENAI_API_KEY'))
+    parser.add_argument('--upstream-timeout', type=float, default=120.0)
+    parser.add_argument('--chat-latency', default='lognormal:1.5,0.4', help='fixed:S | uniform:LO,HI | lognormal:MEDIAN,SIGMA | none')
+    parser.add_argument('--image-latency', default='lognormal:8,0.3')
+    parser.add_argument('--error-429', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--error-500', type=float, default=0.0, help='Fraction of requests answered with 500')
+    parser.add_argument('--malformed', type=float, default=0.0, help='Fraction of chat responses with truncated JSON content')
+    parser.add_argument('--retry-after', type=float, default=2.0, help='retry-after header (seconds) on injected 429s')
+    parser.add_argument('--stream-chunk-chars', type=int, default=40)
+    parser.add_argument('--stream-chunk-delay', type=float, default=0.0)
+    parser.add_argument('--image-size', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--verbose', action='store_true')
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.mode in ('record', 'replay') and not args.cassette:
+        sys.exit('--cassette is required for record/replay mode')
+    if args.mode == 'record' and not args.api_key:
+        sys.exit('--api-key (or OPENAI_API_KEY) is required for record mode')
+
+    StandInHandler.state = StandInState(args)
+    server = ThreadingHTTPServer((args.host, args.port), StandInHandler)
+    server.daemon_threads = True
+    print(f"OpenAI stand-in ({args.mode}) listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(StandInHandler.state.stats))
+
+
+if __name__ == '__main__':
+    main()
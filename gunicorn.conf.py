@@ -0,0 +1,12 @@
+# Picked up automatically by `gunicorn wsgi:app` from the project root.
+import os
+
+# Keep above GENERATION_DEADLINE_SECONDS so slow generations return a partial deck instead of being killed
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+
+def child_exit(server, worker):
+    # Drop a dead worker's live gauges from the shared Prometheus multiprocess directory
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
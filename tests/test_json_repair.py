@@ -0,0 +1,52 @@
+import pytest
+
+from app.utils.json_repair import recover_slides, repair_json
+
+
+def test_valid_json_is_returned_unchanged():
+    assert repair_json('{"slides": [{"title": "x", "content": ["a"]}]}') == {
+        'slides': [{'title': 'x', 'content': ['a']}]
+    }
+
+
+def test_missing_comma_between_array_strings():
+    assert repair_json('["a" "b"]') == ['a', 'b']
+
+
+def test_missing_comma_between_strings_across_lines():
+    assert repair_json('["a"\n  "b",\n  "c"]') == ['a', 'b', 'c']
+
+
+def test_missing_comma_before_next_key():
+    assert repair_json('{"slides":[{"title":"x" "content":["a"]}]}') == {
+        'slides': [{'title': 'x', 'content': ['a']}]
+    }
+
+
+def test_missing_comma_before_object_and_array():
+    assert repair_json('[{"a": 1} {"b": 2}]') == [{'a': 1}, {'b': 2}]
+    assert repair_json('["a" {"b": 2} ["c"]]') == ['a', {'b': 2}, ['c']]
+
+
+def test_unescaped_quotes_inside_a_bullet_are_kept():
+    assert repair_json('["He said "hi" to me", "b"]') == ['He said "hi" to me', 'b']
+
+
+def test_code_fences_trailing_commas_and_python_literals():
+    text = '```json\n{"ok": True, "items": [1, 2,], "none": None,}\n```'
+    assert repair_json(text) == {'ok': True, 'items': [1, 2], 'none': None}
+
+
+def test_truncated_output_keeps_complete_slides_only():
+    text = '{"slides": [{"title": "one", "content": ["a", "b"]}, {"title": "two", "content": ["c"'
+    assert recover_slides(text) == [{'title': 'one', 'content': ['a', 'b']}]
+
+
+def test_missing_comma_between_bullets_is_recovered_as_separate_bullets():
+    text = '{"slides": [{"title": "one", "content": ["Point A - why" "Point B - how"]}]}'
+    assert recover_slides(text) == [{'title': 'one', 'content': ['Point A - why', 'Point B - how']}]
+
+
+def test_nothing_recoverable_raises():
+    with pytest.raises(ValueError):
+        repair_json('I cannot help with that.')